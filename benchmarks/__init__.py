@@ -0,0 +1,5 @@
+""" Throughput benchmarks of inflow, run against a local stand-in for the
+InfluxDB HTTP API.
+
+Run them using ``python -m benchmarks``, which writes the results as JSON, so
+the results of releases can be compared. """
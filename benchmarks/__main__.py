@@ -0,0 +1,88 @@
+""" Runs the benchmarks, and writes their results as JSON. """
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+
+from datetime import datetime
+
+from .scenarios import SCENARIOS
+
+
+def get_version():
+    """ Returns the installed version of inflow, if it's installed. """
+    try:
+        from importlib.metadata import version
+        return version('inflow')
+    except Exception:
+        pass
+
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution('inflow').version
+    except Exception:
+        return None
+
+
+def format_metrics(metrics):
+    return ', '.join('{}={:.6g}'.format(k, v) if isinstance(v, float)
+                     else '{}={}'.format(k, v)
+                     for k, v in sorted(metrics.items()))
+
+
+def run(names, scale=1.0, log=sys.stderr):
+    """ Runs the given scenarios, and returns the report. """
+    report = {
+        'inflow': get_version(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpus': multiprocessing.cpu_count(),
+        'started': datetime.utcnow().isoformat() + 'Z',
+        'scale': scale,
+        'results': []
+    }
+
+    for name in names:
+        for params, metrics in SCENARIOS[name](scale):
+            report['results'].append({'scenario': name, 'params': params,
+                                      'metrics': metrics})
+            if log is not None:
+                log.write('{} {}: {}\n'.format(name, json.dumps(params),
+                                               format_metrics(metrics)))
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Runs the inflow benchmarks.')
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help='the scenarios to run, all by default: '
+                        '{}'.format(', '.join(SCENARIOS)))
+    parser.add_argument('-o', '--output',
+                        help='the file to write the JSON results to, '
+                        'instead of stdout')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiplies the amount of work of every '
+                        'scenario')
+    args = parser.parse_args(argv)
+
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error('unknown scenario: ' + ', '.join(unknown))
+
+    report = run(args.scenarios or list(SCENARIOS), args.scale)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+""" The benchmark scenarios.
+
+Every scenario is a generator, which yields a ``(params, metrics)`` tuple for
+every variant it measures. The ``scale`` multiplies the amount of work, so a
+small scale gives a quick smoke test.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+
+from inflow import (Client, Connection, Measurement, ProcessPoolWriter,
+                    RetryPolicy, SeriesTemplate)
+from inflow.connection import parse_query_response
+from inflow.load import Loader
+from inflow.serializer import serialize_batch
+
+from .server import BenchmarkServer, query_csv_response, query_response
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2 can't trace memory allocations.
+    tracemalloc = None
+
+__all__ = ['SCENARIOS']
+
+SCENARIOS = OrderedDict()
+""" All scenarios, by name. """
+
+# Python 2 lacks a high resolution clock, and a clock of the CPU time of the
+# process.
+clock = getattr(time, 'perf_counter', time.time)
+cpu_clock = getattr(time, 'process_time', None) or time.clock
+
+
+def scenario(func):
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+def scaled(amount, scale):
+    return max(int(amount * scale), 1)
+
+
+def throughput(count, elapsed, unit='points'):
+    return {
+        unit: count,
+        'seconds': elapsed,
+        '{}_per_second'.format(unit): count / elapsed if elapsed else 0.0
+    }
+
+
+def measurements(count, fields=3):
+    values = {'field_{}'.format(i): i * 1.5 for i in range(fields)}
+    return [Measurement('cpu load', tags={'host': 'server01', 'region': 'eu'},
+                        timestamp=1476107241 + i, **values)
+            for i in range(count)]
+
+
+class Response(object):
+    """ The parts of a requests response that parsing uses. """
+
+    def __init__(self, content, content_type='application/json'):
+        self.content = content
+        self.headers = {'Content-Type': content_type}
+
+
+def traced(func):
+    """ Calls a function while tracing memory allocations. Returns the
+    seconds it took, and the amount of memory in MB it allocated at its peak
+    and still holds afterwards. """
+    tracemalloc.start()
+    start = clock()
+    func()
+    elapsed = clock() - start
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak / 1024.0 / 1024.0, size / 1024.0 / 1024.0
+
+
+@scenario
+def import_time(scale):
+    """ Imports inflow in a fresh interpreter, keeping the fastest of a few
+    runs. """
+    runs = scaled(5, scale)
+
+    for code in ('import inflow', 'from inflow import Measurement',
+                 'from inflow import Client'):
+        script = ('import time; start = time.time(); {}; '
+                  'print(time.time() - start)'.format(code))
+        elapsed = min(float(subprocess.check_output([sys.executable, '-c',
+                                                     script]))
+                      for _ in range(runs))
+
+        yield {'code': code}, {'seconds': elapsed}
+
+
+@scenario
+def to_line(scale):
+    """ Serializes measurements one by one. """
+    count = scaled(50000, scale)
+
+    for fields in (1, 10):
+        batch = measurements(count, fields)
+
+        start = clock()
+        for m in batch:
+            m.to_line()
+
+        yield {'fields': fields}, throughput(count, clock() - start)
+
+
+@scenario
+def serialize(scale):
+    """ Serializes a batch of measurements, points or template points, with
+    a growing amount of fields. """
+    count = scaled(50000, scale)
+
+    for fields in (1, 3, 50):
+        keys = ['field_{}'.format(i) for i in range(fields)]
+        template = SeriesTemplate('cpu load',
+                                  {'host': 'server01', 'region': 'eu'}, keys)
+        values = [i * 1.5 for i in range(fields)]
+
+        batches = OrderedDict([
+            ('measurement', measurements(count, fields)),
+            ('point', [m.to_point() for m in measurements(count, fields)]),
+            ('template', [template.point(values, 1476107241 + i)
+                          for i in range(count)])
+        ])
+
+        for kind, batch in batches.items():
+            start = clock()
+            serialize_batch(batch)
+            yield ({'kind': kind, 'fields': fields},
+                   throughput(count, clock() - start))
+
+
+@scenario
+def pooled_writes(scale):
+    """ Writes single points, reusing a pooled connection or opening a new
+    connection for every write. """
+    count = scaled(1000, scale)
+
+    for keep_alive in (False, True):
+        with BenchmarkServer() as server:
+            client = Client(server.uri, keep_alive=keep_alive)
+
+            start = clock()
+            for i in range(count):
+                client.write('temperature', value=21.3,
+                             timestamp=1476107241 + i)
+            metrics = throughput(count, clock() - start)
+
+            client.close()
+            assert server.stats['points'] == count
+
+        yield {'keep_alive': keep_alive}, metrics
+
+
+@scenario
+def buffer_memory(scale):
+    """ Measures the memory every point takes while it's buffered in a
+    session, compared to keeping the measurements themselves. """
+    if tracemalloc is None:
+        return
+
+    count = scaled(20000, scale)
+    session = Client('http://localhost:8086/benchmark').session()
+
+    for buffer in ('measurements', 'session'):
+        kept = []
+
+        def fill():
+            for i in range(count):
+                measurement = Measurement('cpu', tags={'host': 'server01'},
+                                          timestamp=1476107241 + i,
+                                          idle=90.5, user=2.5)
+                if buffer == 'session':
+                    session.write(measurement)
+                else:
+                    kept.append(measurement)
+
+        _, _, size = traced(fill)
+        yield ({'buffer': buffer},
+               {'points': count,
+                'bytes_per_point': size * 1024 * 1024 / count})
+
+
+@scenario
+def session_commit(scale):
+    """ Writes points through a session, committing every ``batch_size``
+    points. """
+    count = scaled(50000, scale)
+    batch = measurements(count)
+
+    for batch_size in (100, 1000, 10000):
+        for incremental in (False, True):
+            with BenchmarkServer() as server:
+                client = Client(server.uri)
+                session = client.session(batch_size, incremental=incremental)
+
+                start = clock()
+                for m in batch:
+                    session.write(m)
+                session.commit()
+                metrics = throughput(count, clock() - start)
+
+                client.close()
+                metrics.update(requests=server.stats['writes'],
+                               bytes=server.stats['bytes_received'])
+                assert server.stats['points'] == count
+
+            yield ({'batch_size': batch_size, 'incremental': incremental},
+                   metrics)
+
+
+@scenario
+def commit_memory(scale):
+    """ Measures how long the commit of a large session blocks, and the
+    memory it needs on top of the buffered points. """
+    if tracemalloc is None:
+        return
+
+    count = scaled(50000, scale)
+
+    for incremental in (False, True):
+        with BenchmarkServer(validate=False) as server:
+            client = Client(server.uri)
+            session = client.session(incremental=incremental)
+            for i in range(count):
+                session.write('cpu', tags={'host': 'server01'},
+                              timestamp=1476107241 + i, idle=90.5, user=2.5)
+
+            elapsed, peak, _ = traced(session.commit)
+
+            client.close()
+            assert server.stats['points'] == count
+
+        yield ({'incremental': incremental},
+               {'points': count, 'seconds': elapsed, 'peak_mb': peak})
+
+
+@scenario
+def parse_query(scale):
+    """ Decodes and parses a large query response, as JSON or CSV. """
+    for rows in (scaled(1000, scale), scaled(100000, scale)):
+        responses = OrderedDict([
+            ('default', Response(query_response(rows))),
+            ('json', Response(query_response(rows))),
+            ('csv', Response(query_csv_response(rows), 'application/csv'))
+        ])
+
+        for format in ('dicts', 'columns'):
+            for decoder, response in responses.items():
+                # The stdlib decoder shows the gain of a faster JSON library.
+                decode = ((lambda body: json.loads(body.decode('utf-8')))
+                          if decoder == 'json' else None)
+
+                start = clock()
+                parse_query_response(response, format, decode)
+                yield ({'rows': rows, 'format': format, 'decoder': decoder},
+                       throughput(rows, clock() - start, 'rows'))
+
+
+@scenario
+def query_stream(scale):
+    """ Streams a large chunked query response. """
+    rows = scaled(100000, scale)
+
+    with BenchmarkServer(rows=rows) as server:
+        client = Client(server.uri)
+
+        for chunk_size in (1000, 10000):
+            start = clock()
+            received = sum(len(s['values']) for s in client.query_iter(
+                'SELECT * FROM temperature', chunk_size=chunk_size))
+            assert received == rows
+
+            yield ({'rows': rows, 'chunk_size': chunk_size},
+                   throughput(rows, clock() - start, 'rows'))
+
+        client.close()
+
+
+def generate_measurements(count):
+    """ Produces measurements in a worker process of a ProcessPoolWriter. """
+    return measurements(count, 10)
+
+
+@scenario
+def process_pool(scale):
+    """ Serializes and writes measurements using a growing amount of worker
+    processes. The measurements are either made in this process, and packed
+    and sent to the workers, or made by the workers. The CPU time spent in
+    this process limits how far the workers can scale. """
+    count = scaled(50000, scale)
+    chunk_size = 5000
+
+    for processes in (1, 2, 4):
+        for source in ('measurements', 'map'):
+            batch = measurements(count, 10) if source == 'measurements' else []
+
+            with BenchmarkServer(validate=False) as server:
+                writer = ProcessPoolWriter(server.uri, processes=processes,
+                                           chunk_size=chunk_size)
+
+                start = clock()
+                cpu_start = cpu_clock()
+                if source == 'measurements':
+                    writer.write_iter(batch)
+                else:
+                    writer.map(generate_measurements,
+                               [chunk_size] * (count // chunk_size))
+                writer.flush()
+                metrics = throughput(server.stats['points'], clock() - start)
+                metrics['parent_cpu_seconds'] = cpu_clock() - cpu_start
+
+                writer.close()
+
+            yield {'processes': processes, 'source': source}, metrics
+
+
+@scenario
+def concurrency(scale):
+    """ Writes batches from several threads sharing a client, to a server
+    that takes 5ms to respond. """
+    writes = scaled(400, scale)
+    batch = measurements(100)
+
+    for threads in (1, 4, 16):
+        with BenchmarkServer(latency=0.005) as server:
+            client = Client(server.uri, pool_size=threads)
+
+            def write():
+                for _ in range(writes // threads):
+                    client.write(batch)
+
+            workers = [threading.Thread(target=write) for _ in range(threads)]
+
+            start = clock()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = clock() - start
+
+            client.close()
+            metrics = throughput(server.stats['points'], elapsed)
+            metrics.update(throughput(server.stats['writes'], elapsed,
+                                      'requests'))
+
+        yield {'threads': threads, 'latency': 0.005}, metrics
+
+
+@scenario
+def errors(scale):
+    """ Writes batches to a server failing a fraction of the requests, which
+    are retried. """
+    writes = scaled(500, scale)
+    batch = measurements(100)
+
+    for error_rate in (0.0, 0.1, 0.3):
+        with BenchmarkServer(error_rate=error_rate) as server:
+            client = Client(server.uri, retry_policy=RetryPolicy(
+                retries=10, backoff=0.001, max_backoff=0.01))
+
+            failed = 0
+            start = clock()
+            for _ in range(writes):
+                try:
+                    client.write(batch)
+                except Exception:
+                    failed += 1
+            elapsed = clock() - start
+
+            client.close()
+            metrics = throughput(server.stats['points'], elapsed)
+            metrics.update(requests=server.stats['requests'],
+                           errors=server.stats['errors'], failed=failed)
+
+        yield {'error_rate': error_rate}, metrics
+
+
+@scenario
+def load(scale):
+    """ Loads line protocol and CSV files, with several batches in flight,
+    to a server that takes 5ms to respond. """
+    count = scaled(200000, scale)
+    directory = tempfile.mkdtemp()
+
+    files = OrderedDict([
+        ('line', os.path.join(directory, 'data.txt')),
+        ('csv', os.path.join(directory, 'data.csv'))
+    ])
+
+    try:
+        with open(files['line'], 'w') as f:
+            for i in range(count):
+                f.write('cpu,host=server{} value={}.5,load={}i {}\n'.format(
+                    i % 100, i, i % 10, 1476107241 + i))
+
+        with open(files['csv'], 'w') as f:
+            f.write('time,host,value,load\n')
+            for i in range(count):
+                f.write('{},server{},{}.5,{}\n'.format(
+                    1476107241 + i, i % 100, i, i % 10))
+
+        for format, path in files.items():
+            for concurrency in (1, 4):
+                with BenchmarkServer(latency=0.005, validate=False) as server:
+                    connection = Connection(server.uri,
+                                            pool_size=concurrency)
+                    loader = Loader(connection, concurrency=concurrency)
+
+                    start = clock()
+                    loader.load(path, measurement='cpu', tags=['host'])
+                    metrics = throughput(count, clock() - start)
+
+                    connection.close()
+                    metrics.update(requests=server.stats['writes'])
+                    assert server.stats['points'] == count
+
+                yield ({'format': format, 'concurrency': concurrency,
+                        'latency': 0.005}, metrics)
+    finally:
+        shutil.rmtree(directory)
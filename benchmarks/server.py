@@ -0,0 +1,343 @@
+""" A local stand-in for the InfluxDB HTTP API, used by the benchmarks and
+the tests.
+
+The server accepts writes on ``/write``, validating every line of line
+protocol the way InfluxDB does, and answers ``/query`` with a canned result
+of a configurable amount of rows for every statement, as JSON or CSV, chunked
+when asked to. It can delay every response, and fail a fraction of the
+requests, to measure how the client behaves on a slow or flaky network, or
+fail specific requests, to test how the client handles errors.
+"""
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from six.moves.socketserver import ThreadingMixIn
+from six.moves.urllib.parse import urlparse, parse_qs
+
+__all__ = ['BenchmarkServer', 'parse_lines', 'query_response',
+           'query_csv_response']
+
+# Matches a valid line of line protocol, capturing its measurement name.
+NAME = r'(?:[^,\s\\]|\\.)+'
+KEY = r'(?:[^,=\s\\]|\\.)+'
+FIELD_VALUE = (r'(?:"(?:[^"\\]|\\.)*"|-?\d+[iu]|'
+               r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|'
+               r't|T|true|True|TRUE|f|F|false|False|FALSE)')
+LINE_PATTERN = re.compile(
+    r'({name})(?:,{key}={key})* {key}={value}(?:,{key}={value})*'
+    r'(?: -?\d+)?$'.format(name=NAME, key=KEY, value=FIELD_VALUE))
+
+# The columns of the canned query result.
+COLUMNS = ['time', 'value', 'humidity', 'location']
+
+
+def parse_lines(body):
+    """ Validates line protocol. Returns the amount of valid points, and the
+    first invalid line, or None. """
+    points = 0
+    invalid = None
+
+    for line in body.split('\n'):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        if LINE_PATTERN.match(line) is None:
+            if invalid is None:
+                invalid = line
+            continue
+
+        points += 1
+
+    return points, invalid
+
+
+def query_rows(rows, offset=0):
+    return [[1476107241 + i, 21.3 + i * 0.5, 50 + i % 50, 'groningen']
+            for i in range(offset, offset + rows)]
+
+
+def query_response(rows, statements=1):
+    """ Returns the JSON body of a response holding a result of the given
+    amount of rows for every statement. """
+    series = [{
+        'name': 'temperature',
+        'columns': COLUMNS,
+        'values': query_rows(rows)
+    }]
+    return json.dumps({'results': [
+        {'statement_id': i, 'series': series} for i in range(statements)
+    ]}).encode('utf-8')
+
+
+def query_csv_response(rows):
+    """ Returns the CSV body of a result holding the given amount of rows. """
+    lines = ['name,tags,' + ','.join(COLUMNS)] + [
+        'temperature,,' + ','.join(str(v) for v in row)
+        for row in query_rows(rows)
+    ]
+    return ('\r\n'.join(lines) + '\r\n').encode('utf-8')
+
+
+class BenchmarkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Buffering the response sends its headers and body in one packet, which
+    # avoids waiting for a delayed ACK of the headers.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+
+        return body
+
+    def respond(self, status, body=b'', headers=None,
+                content_type='application/json'):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def respond_error(self, status, message, headers=None):
+        self.respond(status, json.dumps({'error': message}).encode('utf-8'),
+                     headers)
+
+    def do_GET(self):
+        self.handle_request(b'')
+
+    def do_POST(self):
+        self.handle_request(self.read_body())
+
+    def handle_request(self, body):
+        server = self.server
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        server.count('requests')
+        server.count('bytes_received', len(body))
+        server.enter()
+
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+        finally:
+            server.leave()
+
+        if url.path == '/ping':
+            return self.respond(204)
+
+        status = server.take_failure()
+        if status is not None:
+            server.count('errors')
+            headers = ({'Retry-After': server.retry_after}
+                       if server.retry_after is not None else None)
+            return self.respond_error(status, 'injected error', headers)
+
+        if url.path == '/write':
+            return self.handle_write(body)
+        if url.path == '/query':
+            # Queries that change data are posted as a form.
+            if body:
+                params.update((k, v[0]) for k, v in
+                              parse_qs(body.decode('utf-8')).items())
+            return self.handle_query(params)
+
+        self.respond_error(404, 'not found')
+
+    def handle_write(self, body):
+        server = self.server
+        server.count('writes')
+
+        if server.reject is not None and server.reject in body:
+            return self.respond_error(400, 'rejected')
+
+        if server.max_body_size is not None and\
+                len(body) > server.max_body_size:
+            return self.respond_error(413, 'request entity too large')
+
+        if server.validate:
+            points, invalid = parse_lines(body.decode('utf-8'))
+        else:
+            points, invalid = body.count(b'\n') + 1, None
+
+        server.count('points', points)
+
+        if invalid is not None:
+            return self.respond_error(
+                400, 'partial write: unable to parse {!r}'.format(invalid))
+
+        self.respond(204)
+
+    def handle_query(self, params):
+        server = self.server
+        server.count('queries')
+
+        if self.headers.get('Accept') == 'application/csv':
+            return self.respond(200, query_csv_response(server.rows),
+                                content_type='application/csv')
+
+        statements = len(params.get('q', '').split(';'))
+        if params.get('chunked') != 'true':
+            return self.respond(200, server.query_body if statements == 1
+                                else query_response(server.rows, statements))
+
+        chunk_size = int(params.get('chunk_size') or 10000)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for offset in range(0, server.rows, chunk_size):
+            rows = min(chunk_size, server.rows - offset)
+            series = {'name': 'temperature', 'columns': COLUMNS,
+                      'values': query_rows(rows, offset)}
+            if offset + rows < server.rows:
+                series['partial'] = True
+
+            data = json.dumps({'results': [{'statement_id': 0,
+                                            'series': [series]}]})
+            self.write_chunk(data.encode('utf-8') + b'\n')
+
+        self.write_chunk(b'')
+
+    def write_chunk(self, data):
+        self.wfile.write('{:x}\r\n'.format(len(data)).encode('ascii'))
+        self.wfile.write(data + b'\r\n')
+
+
+class BenchmarkServer(ThreadingMixIn, HTTPServer):
+    """ Emulates the ``/write``, ``/query`` and ``/ping`` endpoints.
+
+    Every response is delayed by ``latency`` seconds, and a fraction
+    ``error_rate`` of the writes and queries fails with ``error_status``.
+    Set ``status`` to fail every request with that status code, or only the
+    next ``failures`` requests, with a ``retry_after`` header when set.
+    Queries return ``rows`` rows. Writes holding an invalid line are rejected
+    with a 400, like InfluxDB does, unless ``validate`` is disabled, which
+    only counts the lines. Writes holding the ``reject`` bytes, or larger
+    than ``max_body_size`` bytes, are rejected too.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, error_rate=0,
+                 error_status=503, rows=1000, validate=True,
+                 database='benchmark'):
+        HTTPServer.__init__(self, (host, port), BenchmarkHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.validate = validate
+        self.database = database
+        self.rows = rows
+        self.status = None
+        self.failures = None
+        self.retry_after = None
+        self.reject = None
+        self.max_body_size = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.reset()
+
+    @property
+    def uri(self):
+        host, port = self.server_address[:2]
+        return 'http://{}:{}/{}'.format(host, port, self.database)
+
+    @property
+    def points(self):
+        """ The amount of points written. """
+        return self.stats['points']
+
+    @property
+    def requests(self):
+        """ The amount of requests received. """
+        return self.stats['requests']
+
+    @property
+    def rows(self):
+        return self._rows
+
+    @rows.setter
+    def rows(self, rows):
+        self._rows = rows
+        self.query_body = query_response(rows)
+
+    def reset(self):
+        """ Resets all counters. """
+        with self.lock:
+            self.stats = dict(requests=0, writes=0, queries=0, points=0,
+                              errors=0, bytes_received=0)
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def take_failure(self):
+        """ Returns the status code the current request should fail with, or
+        None. """
+        with self.lock:
+            if self.status is not None and self.failures != 0:
+                if self.failures:
+                    self.failures -= 1
+                return self.status
+
+        if self.error_rate and random.random() < self.error_rate:
+            return self.error_status
+
+        return None
+
+    def __enter__(self):
+        thread = threading.Thread(target=self.serve_forever, args=(0.01,))
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Runs a stand-in for the InfluxDB HTTP API.')
+    parser.add_argument('--port', type=int, default=8086)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--rows', type=int, default=1000)
+    args = parser.parse_args()
+
+    server = BenchmarkServer(port=args.port, latency=args.latency,
+                             error_rate=args.error_rate, rows=args.rows)
+    print('Listening on {}'.format(server.uri))
+    server.serve_forever()
@@ -1,5 +1,55 @@
-from .client import Client  # noqa
-from .measurement import Measurement  # noqa
-from .connection import Connection  # noqa
-from .session import Session  # noqa
+import sys
+
+from importlib import import_module
+
 from .exceptions import *  # noqa
+from .exceptions import __all__ as exception_names
+
+# The module every public class is imported from. Importing the HTTP stack
+# and the optional extras takes long, so on Python 3.7+ a class is only
+# imported when it's first used.
+CLASSES = {
+    'Client': 'client',
+    'Measurement': 'measurement',
+    'Point': 'measurement',
+    'Connection': 'connection',
+    'Session': 'session',
+    'BackgroundWriter': 'background',
+    'Series': 'series',
+    'SeriesTemplate': 'template',
+    'Spool': 'spool',
+    'ProcessPoolWriter': 'processes',
+    'RetryPolicy': 'retry',
+    'Hooks': 'hooks',
+    'StatsCollector': 'hooks',
+    'QueryCache': 'cache',
+    'ShardedClient': 'sharding',
+    'AsyncClient': 'aio',
+    'AsyncConnection': 'aio',
+    'AsyncSession': 'aio'
+}
+
+__all__ = list(CLASSES) + exception_names
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        try:
+            module = CLASSES[name]
+        except KeyError:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(
+                __name__, name))
+
+        value = globals()[name] = getattr(
+            import_module('.' + module, __name__), name)
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(CLASSES))
+else:
+    for name, module in CLASSES.items():
+        try:
+            globals()[name] = getattr(import_module('.' + module, __name__),
+                                      name)
+        except SyntaxError:
+            # Python 2 and Python < 3.5 have no async support.
+            __all__.remove(name)
@@ -0,0 +1,306 @@
+""" Asyncio versions of the client, connection and session.
+
+These need Python 3.5+ and the ``aiohttp`` package, which can be installed
+using ``pip install inflow[async]``.
+"""
+import asyncio
+from functools import partial
+
+from .cache import MISSING
+from .connection import (Connection, get_method, parse_query_data,
+                         WRITE_EXCEPTIONS, QUERY_EXCEPTIONS)
+from .decoders import decode_json, get_decoder
+from .exceptions import PartialWriteException, WriteFailedException
+from .measurement import to_point
+from .retry import parse_retry_after, split_lines
+from .write import WriteMixin
+
+__all__ = ['AsyncClient', 'AsyncConnection', 'AsyncSession']
+
+
+def not_supported(method):
+    return NotImplementedError('The async connection doesn\'t support {}, '
+                               'use the synchronous Connection for '
+                               'it.'.format(method))
+
+
+class AsyncConnection(Connection):
+    """ Represents an asynchronous connection to an InfluxDB instance.
+
+    Requests share a pool of at most ``pool_size`` connections, and no more
+    than ``max_in_flight`` requests are sent at the same time. Other requests
+    wait until one of them finishes.
+    """
+
+    def __init__(self, uri, precision='s', retention_policy=None, timeout=None,
+                 pool_size=10, keep_alive=True, max_in_flight=10, **kwargs):
+        if kwargs.get('spool') is not None:
+            raise ValueError('The async connection doesn\'t support '
+                             'spooling.')
+
+        Connection.__init__(self, uri, precision, retention_policy, timeout,
+                            pool_size=pool_size, keep_alive=keep_alive,
+                            **kwargs)
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.max_in_flight = max_in_flight
+        self.semaphore = None
+
+    def create_http(self, pool_size, keep_alive, retries):
+        # An aiohttp session must be created inside a running event loop, so
+        # it's created on the first request instead.
+        return None
+
+    def get_http(self):
+        """ Returns the HTTP session, creating it when needed. """
+        if self.http is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError('The async client requires aiohttp, install '
+                                  'it using: pip install inflow[async]')
+
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                force_close=not self.keep_alive
+            )
+            self.http = aiohttp.ClientSession(
+                connector=connector,
+                auth=(aiohttp.BasicAuth(*self.auth)
+                      if self.auth is not None
+                      else None),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self.semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        return self.http
+
+    async def write(self, measurement, retention_policy=None):
+        """ Write a single measurement to the InfluxDB API. """
+        await self.write_lines(self.serialize_observed(measurement),
+                               retention_policy)
+
+    async def write_lines(self, data, retention_policy=None):
+        """ Write already serialized line protocol to the InfluxDB API,
+        retrying and splitting it according to the retry policy. """
+        try:
+            if self.retry_policy is None:
+                return await self.post_write(data, retention_policy)
+
+            failures = []
+            await self.send_batch(data, retention_policy, failures)
+
+            if failures:
+                raise PartialWriteException(failures)
+        finally:
+            if self.query_cache is not None:
+                self.query_cache.invalidate_lines(data)
+
+    async def send_batch(self, data, retention_policy, failures):
+        """ Writes a batch, splitting it in two when it's rejected, and adds
+        the parts that failed by themselves to ``failures``. """
+        try:
+            await self.retry_write(data, retention_policy)
+        except WriteFailedException as e:
+            if not self.retry_policy.should_split(e):
+                raise
+
+            halves = split_lines(data)
+            if halves is None:
+                failures.append((data, e))
+                return
+
+            for half in halves:
+                await self.send_batch(half, retention_policy, failures)
+
+    async def retry_write(self, data, retention_policy):
+        """ Sends a write request, retrying it while it fails with transient
+        errors, like :meth:`RetryPolicy.call` does. """
+        attempts = self.retry_policy.attempts(
+            partial(self.notify, 'on_retry') if self.hooks else None)
+
+        while True:
+            try:
+                return await self.post_write(data, retention_policy)
+            except Exception as e:
+                delay = attempts.failed(e)
+
+            await asyncio.sleep(delay)
+
+    async def post_write(self, data, retention_policy=None):
+        """ Sends a write request with the given line protocol. """
+        http = self.get_http()
+        body, headers = self.encode_write(data)
+
+        async with self.semaphore:
+            with self.observe_write(data, retention_policy):
+                async with http.post(self.get_write_url(retention_policy),
+                                     data=body, headers=headers) as rv:
+                    exception = WRITE_EXCEPTIONS.get(rv.status)
+                    if exception is not None:
+                        try:
+                            error = await rv.json(content_type=None)
+                        except ValueError:
+                            error = await rv.text()
+
+                        raise exception(error, rv.status, parse_retry_after(
+                            rv.headers.get('Retry-After')))
+
+    async def query(self, query, epoch=None, format='dicts', cache_ttl=None):
+        """ Execute a query on InfluxDB. """
+        key = self.get_cache_key(query, epoch, format, cache_ttl)
+        if key is not None:
+            result = self.query_cache.get(key)
+            if result is not MISSING:
+                return result
+
+        if not self.coalesce_queries or get_method(query) != 'get':
+            return await self.send_query(query, epoch, format, key, cache_ttl)
+
+        # Concurrent identical queries await the same task. It's shielded, so
+        # a cancelled caller doesn't cancel the request of the others.
+        flight_key = (query, epoch, format)
+        flight = self.flights.get(flight_key)
+        if flight is None:
+            flight = self.flights[flight_key] = asyncio.ensure_future(
+                self.send_query(query, epoch, format, key, cache_ttl))
+            flight.add_done_callback(
+                lambda _: self.flights.pop(flight_key, None))
+        else:
+            self.notify('on_coalesce', query)
+
+        return await asyncio.shield(flight)
+
+    async def send_query(self, query, epoch=None, format='dicts',
+                         cache_key=None, cache_ttl=None):
+        """ Sends a query request, and caches its result under the given
+        key. """
+        http = self.get_http()
+        method = get_method(query).upper()
+        generation = (self.query_cache.generation
+                      if cache_key is not None else None)
+
+        async with self.semaphore:
+            with self.observe_query(query):
+                async with http.request(method,
+                                        self.get_query_url(query, epoch),
+                                        headers=self.format_headers) as rv:
+                    body = await rv.read()
+
+                exception = QUERY_EXCEPTIONS.get(rv.status)
+                if exception is not None:
+                    try:
+                        error = decode_json(body)
+                    except ValueError:
+                        error = body.decode('utf-8', 'replace')
+
+                    raise exception(error, rv.status)
+
+        decoder = self.query_decoder or get_decoder(rv.content_type)
+        result = parse_query_data(decoder(body), format)
+        if cache_key is not None:
+            self.query_cache.set(cache_key, result, len(body), cache_ttl,
+                                 generation)
+
+        return result
+
+    # The other request methods of the synchronous connection use requests,
+    # so they aren't available asynchronously.
+    def query_many(self, *args, **kwargs):
+        raise not_supported('query_many')
+
+    def query_iter(self, *args, **kwargs):
+        raise not_supported('query_iter')
+
+    def query_range(self, *args, **kwargs):
+        raise not_supported('query_range')
+
+    def query_range_iter(self, *args, **kwargs):
+        raise not_supported('query_range_iter')
+
+    def replay_spool(self):
+        raise not_supported('replay_spool')
+
+    async def close(self):
+        """ Closes all pooled HTTP connections. """
+        if self.http is not None:
+            await self.http.close()
+            self.http = None
+
+
+class AsyncSession(WriteMixin):
+    """ Accumulates measurements, like :class:`~inflow.Session`, but writes
+    them asynchronously. Both ``write`` and ``commit`` must be awaited. """
+
+    def __init__(self, connection, autocommit_every=None,
+                 retention_policy=None):
+        self.connection = connection
+        """ The connection where the measurements will be written to. """
+
+        self.autocommit_every = autocommit_every
+        """ When set to a number, this session will autocommit whenever the
+        amount of cached measurements exceeds this number. """
+
+        self.retention_policy = retention_policy
+        """ The retention policy this session should write to. Overrides the
+        connection's retention policy. """
+
+        self.measurements = []
+        """ Contains all uncommitted measurements. """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.commit()
+
+    async def write_func(self, measurement, **kwargs):
+        if type(measurement) is list:
+            self.measurements.extend([to_point(m) for m in measurement])
+        else:
+            self.measurements.append(to_point(measurement))
+
+        if self.autocommit_every is not None:
+            if len(self.measurements) >= self.autocommit_every:
+                await self.commit()
+
+    async def commit(self):
+        """ Write out all cached measurements at once. """
+        measurements, self.measurements = self.measurements, []
+        await self.connection.write(measurements,
+                                    retention_policy=self.retention_policy)
+
+
+class AsyncClient(WriteMixin):
+    """ The asynchronous InfluxDB client. Its ``write`` and ``query`` methods
+    take the same arguments as those of :class:`~inflow.Client`, but return
+    coroutines. Any other keyword arguments are passed on to the
+    :class:`AsyncConnection`. """
+
+    def __init__(self, uri, precision='s', retention_policy=None, timeout=None,
+                 pool_size=10, keep_alive=True, max_in_flight=10, **kwargs):
+        self.connection = AsyncConnection(uri, precision, retention_policy,
+                                          timeout, pool_size=pool_size,
+                                          keep_alive=keep_alive,
+                                          max_in_flight=max_in_flight,
+                                          **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def write_func(self, measurement, **kwargs):
+        return self.connection.write(measurement, **kwargs)
+
+    def session(self, autocommit_every=None, retention_policy=None):
+        return AsyncSession(self.connection, autocommit_every,
+                            retention_policy)
+
+    def query(self, query, epoch=None, format='dicts', cache_ttl=None):
+        return self.connection.query(query, epoch, format, cache_ttl)
+
+    async def close(self):
+        """ Closes the pooled HTTP connections of this client. """
+        await self.connection.close()
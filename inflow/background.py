@@ -0,0 +1,228 @@
+import logging
+import threading
+
+from collections import deque
+from time import time
+
+from .exceptions import QueueFullException
+from .write import WriteMixin
+
+__all__ = ['BackgroundWriter']
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ['block', 'drop_oldest', 'raise']
+
+
+class BackgroundWriter(WriteMixin):
+    """ Writes measurements to InfluxDB from a background thread.
+
+    Calls to ``write`` only put measurements on a bounded queue. A worker
+    thread takes them from the queue, serializes them and posts them to
+    InfluxDB in batches. A batch is written as soon as it holds
+    ``batch_size`` points, ``batch_bytes`` bytes of line protocol, or when its
+    oldest point has been waiting for ``max_age`` seconds.
+    """
+
+    def __init__(self, connection, batch_size=5000, batch_bytes=None,
+                 max_age=1.0, queue_size=10000, overflow='block',
+                 retention_policy=None, on_error=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('Invalid overflow policy provided, must be one '
+                             'of block, drop_oldest or raise.')
+
+        self.connection = connection
+        """ The connection where the measurements will be written to. """
+
+        self.batch_size = batch_size
+        """ The maximum amount of points written in a single request. """
+
+        self.batch_bytes = batch_bytes
+        """ When set to a number, a batch is written as soon as its line
+        protocol exceeds this amount of bytes. """
+
+        self.max_age = max_age
+        """ The maximum amount of seconds a point waits before it's written. """
+
+        self.queue_size = queue_size
+        """ The maximum amount of points waiting to be serialized. """
+
+        self.overflow = overflow
+        """ What to do when writing to a full queue: ``block`` until there is
+        room, ``drop_oldest`` queued point, or ``raise`` a
+        :class:`~inflow.QueueFullException`. """
+
+        self.retention_policy = retention_policy
+        """ The retention policy this writer should write to. Overrides the
+        connection's retention policy. """
+
+        self.on_error = on_error
+        """ Called with the exception and the lines of a batch that couldn't
+        be written, or a list holding a measurement that couldn't be
+        serialized. When not set, errors are logged. """
+
+        self.dropped = 0
+        """ The amount of points dropped because the queue was full. """
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.flush_requested = 0
+        self.flushed = 0
+        self.closed = False
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __enter__(self, *args, **kwargs):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def write_func(self, measurement, **kwargs):
+        measurements = (measurement if type(measurement) is list
+                        else [measurement])
+
+        with self.condition:
+            if self.closed:
+                raise ValueError('Can\'t write to a closed background writer.')
+
+            # Raise before queueing any of the measurements, so a list is
+            # either queued completely or not at all.
+            if self.overflow == 'raise' and\
+                    len(self.queue) + len(measurements) > self.queue_size:
+                raise QueueFullException('Background writer queue is full.')
+
+            for m in measurements:
+                self.put(m)
+
+            self.condition.notify_all()
+
+    def put(self, measurement):
+        """ Puts a measurement on the queue, applying the overflow policy when
+        the queue is full. Must be called while holding the condition. """
+        if len(self.queue) >= self.queue_size:
+            if self.overflow == 'raise':
+                raise QueueFullException('Background writer queue is full.')
+            elif self.overflow == 'drop_oldest':
+                self.queue.popleft()
+                self.dropped += 1
+            else:
+                while len(self.queue) >= self.queue_size:
+                    self.condition.notify_all()
+                    self.condition.wait()
+
+        self.queue.append(measurement)
+
+    def flush(self):
+        """ Blocks until all measurements written before this call have been
+        sent to InfluxDB. """
+        with self.condition:
+            self.flush_requested += 1
+            requested = self.flush_requested
+            self.condition.notify_all()
+
+            while self.flushed < requested and self.thread.is_alive():
+                self.condition.wait()
+
+    commit = flush
+
+    def close(self):
+        """ Writes all queued measurements and stops the worker thread. """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        self.thread.join()
+
+    def take(self, deadline):
+        """ Waits until there are queued measurements, a flush or close is
+        requested, or the deadline of the current batch passes. Returns the
+        measurements taken from the queue. """
+        with self.condition:
+            while not self.queue and not self.closed and\
+                    self.flushed == self.flush_requested:
+                timeout = None if deadline is None else deadline - time()
+                if timeout is not None and timeout <= 0:
+                    break
+                self.condition.wait(timeout)
+
+            taken = [self.queue.popleft()
+                     for _ in range(min(len(self.queue), self.batch_size))]
+            self.condition.notify_all()
+
+            return taken
+
+    def report(self, error, items):
+        """ Passes an error to ``on_error``, or logs it. Must be called while
+        handling the error. """
+        if self.on_error is None:
+            logger.exception('Failed to write %d points to InfluxDB.',
+                             len(items))
+            return
+
+        # Errors of the callback are logged, so they don't stop the worker.
+        try:
+            self.on_error(error, items)
+        except Exception:
+            logger.exception('The on_error callback failed.')
+
+    def send(self, lines):
+        """ Writes a batch of lines, reporting instead of raising errors. """
+        try:
+            self.connection.write_lines('\n'.join(lines),
+                                        retention_policy=self.retention_policy)
+        except Exception as e:
+            self.report(e, lines)
+
+    def serialize(self, measurement):
+        """ Returns the line of a measurement, or None when it can't be
+        serialized. """
+        try:
+            return measurement.to_line(self.connection.precision)
+        except Exception as e:
+            self.report(e, [measurement])
+
+    def run(self):
+        lines = []
+        size = 0
+        deadline = None
+
+        while True:
+            for measurement in self.take(deadline):
+                line = self.serialize(measurement)
+                if line is None:
+                    continue
+
+                lines.append(line)
+                size += len(line.encode('utf-8')) + 1
+
+                if deadline is None:
+                    deadline = time() + self.max_age
+
+                full = len(lines) >= self.batch_size
+                if self.batch_bytes is not None:
+                    full = full or size >= self.batch_bytes
+
+                if full:
+                    self.send(lines)
+                    lines, size, deadline = [], 0, None
+
+            with self.condition:
+                drained = not self.queue
+                requested = self.flush_requested
+                closed = self.closed
+
+            flushing = drained and (closed or requested > self.flushed)
+            if lines and (flushing or time() >= deadline):
+                self.send(lines)
+                lines, size, deadline = [], 0, None
+
+            if drained and not lines:
+                with self.condition:
+                    self.flushed = requested
+                    self.condition.notify_all()
+
+                if closed:
+                    return
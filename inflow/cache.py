@@ -0,0 +1,224 @@
+""" Caching query results in memory. """
+import re
+import threading
+import time
+
+from collections import OrderedDict, deque
+
+__all__ = ['QueryCache', 'query_measurements', 'line_measurements']
+
+# Returned by QueryCache.get when a query isn't cached.
+MISSING = object()
+
+# Python 2 lacks a monotonic clock.
+clock = getattr(time, 'monotonic', time.time)
+
+# Matches the measurements following a FROM clause, which are optionally
+# quoted, and prefixed by a database and retention policy.
+SOURCE = r'(?:"(?:[^"\\]|\\.)*"|[\w:-]+|\.)+'
+FROM_PATTERN = re.compile(r'\bFROM\s+({0}(?:\s*,\s*{0})*)'.format(SOURCE),
+                          re.IGNORECASE)
+SOURCE_PATTERN = re.compile(SOURCE)
+IDENTIFIER_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"|([\w:-]+)')
+REGEX_PATTERN = re.compile(r'\bFROM\s+(?:{0}\s*,\s*)*(?:{0})?/'.format(SOURCE),
+                           re.IGNORECASE)
+
+# Matches the escaped measurement name at the start of every line of line
+# protocol.
+LINE_PATTERN = re.compile(r'^(?:[^,\s\\]|\\.)+', re.MULTILINE)
+BINARY_LINE_PATTERN = re.compile(LINE_PATTERN.pattern.encode('ascii'),
+                                 re.MULTILINE)
+
+# The amount of recent writes remembered to detect stale query results.
+MAX_WRITES = 1000
+
+
+def query_measurements(query):
+    """ Returns the names of the measurements a query reads from, or None
+    when they can't be determined, for example when a regular expression
+    selects the measurements. """
+    if REGEX_PATTERN.search(query):
+        return None
+
+    measurements = set()
+    for match in FROM_PATTERN.finditer(query):
+        for source in SOURCE_PATTERN.findall(match.group(1)):
+            # The measurement is the last part of db.rp.measurement.
+            quoted, plain = IDENTIFIER_PATTERN.findall(source)[-1]
+            measurements.add(quoted.replace('\\"', '"') if quoted else plain)
+
+    return measurements or None
+
+
+def line_measurements(data):
+    """ Returns the names of the measurements written in line protocol. """
+    if isinstance(data, (bytes, bytearray)):
+        names = set(BINARY_LINE_PATTERN.findall(data))
+        names = set(name.decode('utf-8') for name in names)
+    else:
+        names = set(LINE_PATTERN.findall(data))
+
+    return set(name.replace('\\,', ',').replace('\\ ', ' ')
+               for name in names)
+
+
+class QueryCache(object):
+    """ Keeps the results of read queries in memory, for ``ttl`` seconds.
+
+    The cache holds at most ``max_entries`` results, and at most
+    ``max_bytes`` bytes of responses. When it's full, the least recently
+    used results are evicted. With ``invalidate_on_write`` enabled, writing
+    to a measurement evicts all cached queries reading from it.
+
+    Cached results are shared between all callers, so they must not be
+    modified. Every write bumps the ``generation``, and a result of a query
+    sent before a write to one of its measurements isn't cached, as it might
+    be stale.
+    """
+
+    def __init__(self, ttl=60, max_entries=1000, max_bytes=None,
+                 invalidate_on_write=False):
+        self.ttl = ttl
+        """ The default amount of seconds a result is cached. """
+
+        self.max_entries = max_entries
+        """ The maximum amount of cached results. """
+
+        self.max_bytes = max_bytes
+        """ The maximum size in bytes of all cached responses together. """
+
+        self.invalidate_on_write = invalidate_on_write
+        """ Whether writes evict the queries reading the measurements
+        written to. """
+
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.bytes = 0
+        """ The size in bytes of all cached responses together. """
+
+        self.hits = 0
+        """ The amount of queries answered from the cache. """
+
+        self.misses = 0
+        """ The amount of queries that weren't cached. """
+
+        self.evictions = 0
+        """ The amount of results evicted because the cache was full. """
+
+        self.invalidations = 0
+        """ The amount of results evicted by writes. """
+
+        self.generation = 0
+        """ The amount of writes that invalidated results. """
+
+        self.writes = deque(maxlen=MAX_WRITES)
+        """ The generation and measurements of the most recent writes. """
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_rate(self):
+        """ The fraction of queries answered from the cache. """
+        total = self.hits + self.misses
+        return self.hits / float(total) if total else 0.0
+
+    def get(self, key):
+        """ Returns the cached result, or ``MISSING``. """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+
+            if entry is None or entry[0] <= clock():
+                if entry is not None:
+                    self.bytes -= entry[2]
+
+                self.misses += 1
+                return MISSING
+
+            # Moving the entry to the end marks it as most recently used.
+            self.entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, result, size=0, ttl=None, generation=None):
+        """ Caches a result. The key holds the query text, which is used to
+        find the measurements it reads from. The ``generation`` is the one the
+        query was sent in, so results of queries overtaken by a write aren't
+        cached. """
+        ttl = self.ttl if ttl is None else ttl
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        measurements = (query_measurements(key[1])
+                        if self.invalidate_on_write else None)
+
+        with self.lock:
+            if generation is not None and\
+                    self.is_stale(generation, measurements):
+                return
+
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+
+            self.entries[key] = (clock() + ttl, result, size, measurements)
+            self.bytes += size
+
+            while self.is_full():
+                _, entry = self.entries.popitem(last=False)
+                self.bytes -= entry[2]
+                self.evictions += 1
+
+    def is_full(self):
+        if len(self.entries) > self.max_entries:
+            return True
+
+        return self.max_bytes is not None and self.bytes > self.max_bytes
+
+    def is_stale(self, generation, measurements):
+        """ Returns whether a measurement read by a query sent in the given
+        generation was written since. """
+        if generation == self.generation:
+            return False
+
+        # Writes older than the remembered ones might have been to any
+        # measurement.
+        if not self.writes or self.writes[0][0] > generation + 1:
+            return True
+
+        if measurements is None:
+            return True
+
+        return any(not measurements.isdisjoint(names)
+                   for g, names in self.writes if g > generation)
+
+    def clear(self):
+        """ Removes all cached results. """
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def invalidate_lines(self, data):
+        """ Removes the cached queries reading from any of the measurements
+        written in the given line protocol. Queries whose measurements
+        couldn't be determined are removed by every write. """
+        if not self.invalidate_on_write:
+            return
+
+        # Parsing the written measurements once, outside the lock, keeps
+        # queries from waiting on large writes.
+        written = line_measurements(data)
+
+        with self.lock:
+            self.generation += 1
+            self.writes.append((self.generation, written))
+
+            for key, entry in list(self.entries.items()):
+                measurements = entry[3]
+                if measurements is not None and\
+                        measurements.isdisjoint(written):
+                    continue
+
+                del self.entries[key]
+                self.bytes -= entry[2]
+                self.invalidations += 1
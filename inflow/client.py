@@ -1,4 +1,7 @@
+from .background import BackgroundWriter
+from .columns import column_lines, dataframe_lines
 from .connection import Connection
+from .ranges import DAY
 from .session import Session
 from .write import WriteMixin
 
@@ -8,14 +11,116 @@ __all__ = ['Client']
 class Client(WriteMixin):
     """ The InfluxDB client. """
 
-    def __init__(self, uri, precision='s', retention_policy=None, timeout=None):
-        self.connection = Connection(uri, precision, retention_policy, timeout)
+    def __init__(self, uri, precision='s', retention_policy=None, timeout=None,
+                 pool_size=10, keep_alive=True, retries=0,
+                 compress_writes=False, compress_level=6,
+                 compress_min_size=1024, compress_queries=True, spool=None,
+                 retry_policy=None, hooks=None, query_cache=None,
+                 coalesce_queries=False, query_format='json',
+                 query_decoder=None, replay_interval=10):
+        self.connection = Connection(uri, precision, retention_policy, timeout,
+                                     pool_size=pool_size,
+                                     keep_alive=keep_alive,
+                                     retries=retries,
+                                     compress_writes=compress_writes,
+                                     compress_level=compress_level,
+                                     compress_min_size=compress_min_size,
+                                     compress_queries=compress_queries,
+                                     spool=spool,
+                                     retry_policy=retry_policy,
+                                     hooks=hooks,
+                                     query_cache=query_cache,
+                                     coalesce_queries=coalesce_queries,
+                                     query_format=query_format,
+                                     query_decoder=query_decoder,
+                                     replay_interval=replay_interval)
 
     def write_func(self, measurement, **kwargs):
         return self.connection.write(measurement, **kwargs)
 
-    def session(self, autocommit_every=None, retention_policy=None):
-        return Session(self.connection, autocommit_every, retention_policy)
+    def session(self, autocommit_every=None, retention_policy=None,
+                background=False, **kwargs):
+        """ Creates a session that accumulates writes.
 
-    def query(self, query, epoch=None):
-        return self.connection.query(query, epoch)
+        With ``background`` set, a :class:`~inflow.BackgroundWriter` is
+        returned instead, which writes from a worker thread.
+        ``autocommit_every`` is used as its ``batch_size``, and
+        ``autocommit_bytes`` as its ``batch_bytes``. Any other keyword
+        arguments are passed on to the session or writer.
+        """
+        if background:
+            if autocommit_every is not None:
+                kwargs['batch_size'] = autocommit_every
+            if 'autocommit_bytes' in kwargs:
+                kwargs['batch_bytes'] = kwargs.pop('autocommit_bytes')
+
+            return BackgroundWriter(self.connection,
+                                    retention_policy=retention_policy,
+                                    **kwargs)
+
+        return Session(self.connection, autocommit_every, retention_policy,
+                       **kwargs)
+
+    def write_columns(self, name, timestamps, tags=None, retention_policy=None,
+                      epoch=None, chunk_size=5000, **fields):
+        """ Writes columns of values, like NumPy arrays, in chunks of
+        ``chunk_size`` points per request.
+
+        ``timestamps`` holds integer epoch timestamps in the ``epoch``
+        precision (the client's precision by default), datetimes or a NumPy
+        datetime64 array. Every keyword argument is a field, holding a value
+        per timestamp. Tags are either a single value for all points, or a
+        sequence of values.
+        """
+        for data in column_lines(name, timestamps, tags, fields,
+                                 self.connection.precision, epoch,
+                                 chunk_size):
+            self.connection.write_lines(data, retention_policy)
+
+    def write_dataframe(self, name, dataframe, tag_columns=None,
+                        field_columns=None, tags=None, retention_policy=None,
+                        epoch=None, chunk_size=5000):
+        """ Writes the rows of a pandas DataFrame indexed by time, in chunks of
+        ``chunk_size`` points per request. """
+        for data in dataframe_lines(name, dataframe, tag_columns,
+                                    field_columns, tags,
+                                    self.connection.precision, epoch,
+                                    chunk_size):
+            self.connection.write_lines(data, retention_policy)
+
+    def query(self, query, epoch=None, format='dicts', cache_ttl=None):
+        """ Executes a query. With ``format='columns'``, every series is
+        returned as a :class:`~inflow.Series` instead of a dict. With a query
+        cache, ``cache_ttl`` overrides how long the result is cached. """
+        return self.connection.query(query, epoch, format, cache_ttl)
+
+    def query_many(self, queries, epoch=None, format='dicts'):
+        """ Executes a list of queries in as few requests as possible, see
+        :meth:`Connection.query_many <inflow.Connection.query_many>`. """
+        return self.connection.query_many(queries, epoch, format)
+
+    def query_iter(self, query, epoch=None, chunk_size=10000, format='dicts'):
+        """ Streams the results of a query, see
+        :meth:`Connection.query_iter <inflow.Connection.query_iter>`. """
+        return self.connection.query_iter(query, epoch, chunk_size, format)
+
+    def query_range(self, template, start, end, window=DAY, epoch=None,
+                    format='dicts', workers=4, retry_policy=None):
+        """ Runs a query over a long time range in concurrent windows, see
+        :meth:`Connection.query_range <inflow.Connection.query_range>`. """
+        return self.connection.query_range(template, start, end, window,
+                                           epoch, format, workers,
+                                           retry_policy)
+
+    def query_range_iter(self, template, start, end, window=DAY, epoch=None,
+                         format='dicts', workers=4, retry_policy=None):
+        """ Streams the series of a windowed range query in order, see
+        :meth:`Connection.query_range_iter
+        <inflow.Connection.query_range_iter>`. """
+        return self.connection.query_range_iter(template, start, end, window,
+                                                epoch, format, workers,
+                                                retry_policy)
+
+    def close(self):
+        """ Closes the pooled HTTP connections of this client. """
+        self.connection.close()
@@ -0,0 +1,281 @@
+""" Serializes columns of values, like NumPy arrays or pandas DataFrames, to
+line protocol.
+
+When NumPy is installed, whole chunks of rows are formatted using vectorized
+string operations, so no Python objects are created per row until the lines
+are joined. Without NumPy, plain sequences are serialized row by row.
+"""
+import six
+
+from datetime import datetime
+from itertools import repeat
+
+from .measurement import NANOSECONDS, datetime_to_nanoseconds
+from .serializer import (escape_measurement, escape_key, escape_tag_value,
+                         format_value)
+
+np = False
+""" NumPy, which is imported on first use as importing it takes long, or
+None when it isn't installed. """
+
+__all__ = ['column_lines', 'dataframe_lines']
+
+# The NumPy datetime64 units matching InfluxDB's precisions.
+DATETIME64_UNITS = {
+    'ns': 'ns',
+    'u': 'us',
+    'ms': 'ms',
+    's': 's',
+    'm': 'm',
+    'h': 'h'
+}
+
+
+def load_numpy():
+    """ Imports NumPy, when it isn't imported yet. Returns it, or None when
+    it isn't installed. """
+    global np
+    if np is False:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+
+    return np
+
+
+def is_column(value):
+    """ Returns whether a tag value holds a value per row. """
+    return not isinstance(value, six.string_types) and\
+        hasattr(value, '__len__')
+
+
+def is_missing(value):
+    """ Returns whether a value is missing: None or NaN. """
+    return value is None or value != value
+
+
+def convert_epoch(timestamp, epoch, precision):
+    """ Converts integer timestamps (or arrays) between precisions. """
+    if epoch == precision:
+        return timestamp
+
+    return timestamp * NANOSECONDS[epoch] // NANOSECONDS[precision]
+
+
+def column_lines(name, timestamps, tags=None, fields=None, precision='s',
+                 epoch=None, chunk_size=5000):
+    """ Yields chunks of line protocol, holding at most ``chunk_size`` lines
+    each.
+
+    ``timestamps`` is a sequence of integer epoch timestamps in the ``epoch``
+    precision (which defaults to ``precision``), or of datetimes. Every tag
+    value is either a single value for all rows, or a sequence with a value
+    per row. Every field is a sequence with a value per row. Missing tag and
+    field values (``None`` and NaN) are left out of their row, and rows
+    without any field values are skipped.
+    """
+    tags = tags or {}
+    fields = fields or {}
+    epoch = epoch or precision
+
+    if not fields:
+        raise ValueError('Should specify at least one field.')
+
+    segments = tag_segments(escape_measurement(name), tags)
+    field_columns = [(escape_key(k), v) for k, v in fields.items()]
+
+    if load_numpy() is not None:
+        chunks = numpy_chunks
+    else:
+        chunks = python_chunks
+
+    for chunk in chunks(segments, timestamps, field_columns, precision,
+                        epoch, chunk_size):
+        if chunk:
+            yield chunk
+
+
+def tag_segments(prefix, tags):
+    """ Splits the measurement name and sorted tags of every line into
+    segments. Constant text is merged into strings, tags with a value per row
+    become ``(text, values)`` tuples, where the values follow the text. """
+    segments = [prefix]
+
+    for key, value in sorted([(escape_key(k), v) for k, v in tags.items()]):
+        if is_column(value):
+            segments.append((',' + key + '=', value))
+            segments.append('')
+        elif not is_missing(value):
+            segments[-1] += ',' + key + '=' + escape_tag_value(value)
+
+    return segments
+
+
+def dataframe_lines(name, dataframe, tag_columns=None, field_columns=None,
+                    tags=None, precision='s', epoch=None, chunk_size=5000):
+    """ Yields chunks of line protocol for the rows of a pandas DataFrame.
+
+    The timestamps are taken from the DataFrame's index, which should be a
+    DatetimeIndex or hold integer epoch timestamps. ``tag_columns`` are written
+    as tags, ``field_columns`` (all other columns by default) as fields.
+    """
+    tag_columns = tag_columns or []
+    if field_columns is None:
+        field_columns = [c for c in dataframe.columns if c not in tag_columns]
+
+    tags = dict(tags or {})
+    for column in tag_columns:
+        tags[column] = dataframe[column].values
+
+    fields = {column: dataframe[column].values for column in field_columns}
+
+    return column_lines(name, dataframe.index.values, tags, fields,
+                        precision, epoch, chunk_size)
+
+
+def numpy_chunks(segments, timestamps, field_columns, precision, epoch,
+                 chunk_size):
+    timestamps = numpy_timestamps(np.asarray(timestamps), precision, epoch)
+    segments = [(s[0], np.asarray(s[1])) if isinstance(s, tuple) else s
+                for s in segments]
+    field_columns = [(key, np.asarray(value)) for key, value in field_columns]
+
+    for start in range(0, len(timestamps), chunk_size):
+        end = start + chunk_size
+
+        lines = np.array(segments[0])
+        for segment in segments[1:]:
+            if isinstance(segment, tuple):
+                text, tag_values = segment[0], segment[1][start:end]
+                segment = np.char.add(text, numpy_escape_tags(tag_values))
+                missing = numpy_missing(tag_values)
+                if missing is not None:
+                    segment = np.where(missing, '', segment)
+            if len(segment):
+                lines = np.char.add(lines, segment)
+
+        values = None
+        for key, value in field_columns:
+            formatted, missing = numpy_format_values(value[start:end])
+            formatted = np.char.add(',' + key + '=', formatted)
+            if missing is not None:
+                formatted = np.where(missing, '', formatted)
+
+            values = (formatted if values is None
+                      else np.char.add(values, formatted))
+
+        # Every field starts with a comma, so strip the first one. Escaped
+        # keys never start with a comma, they start with a backslash.
+        values = np.char.lstrip(values, ',')
+
+        lines = np.char.add(lines, ' ')
+        lines = np.char.add(lines, values)
+        lines = np.char.add(lines, ' ')
+        lines = np.char.add(lines, timestamps[start:end].astype(str))
+
+        lines = lines[np.char.str_len(values) > 0]
+        yield '\n'.join(lines.tolist())
+
+
+def numpy_timestamps(timestamps, precision, epoch):
+    """ Converts an array of timestamps to integers in the given precision. """
+    if timestamps.dtype.kind == 'M':
+        unit = DATETIME64_UNITS[precision]
+        return timestamps.astype('datetime64[{}]'.format(unit))\
+            .astype(np.int64)
+    elif timestamps.dtype.kind in 'iu':
+        return convert_epoch(timestamps.astype(np.int64), epoch, precision)
+
+    return np.array([python_timestamp(t, precision, epoch)
+                     for t in timestamps], dtype=np.int64)
+
+
+def numpy_escape_tags(values):
+    values = values.astype(str)
+    for char in [',', '=', ' ']:
+        values = np.char.replace(values, char, '\\' + char)
+    return values
+
+
+def numpy_missing(values):
+    """ Returns a mask of the missing values (None and NaN) of an array, or
+    None when no values are missing. """
+    kind = values.dtype.kind
+
+    if kind == 'f':
+        missing = np.isnan(values)
+    elif kind == 'O':
+        # NaN is the only value that isn't equal to itself.
+        missing = np.equal(values, None) | (values != values)
+    else:
+        return None
+
+    return missing if missing.any() else None
+
+
+def numpy_format_values(values):
+    """ Formats an array of field values. Returns the formatted values, and a
+    mask of missing values (or None when no values are missing). """
+    kind = values.dtype.kind
+    missing = numpy_missing(values)
+
+    if kind in 'fiu':
+        return values.astype(str), missing
+    elif kind == 'b':
+        return np.where(values, 'True', 'False'), None
+    elif kind == 'O':
+        # Objects can be numbers or booleans mixed with missing values, so
+        # they're formatted one by one, like without NumPy.
+        return np.array(['' if is_missing(value) else format_value(value)
+                         for value in values], dtype=str), missing
+
+    values = np.char.replace(values.astype(str), '"', '\\"')
+    return np.char.add(np.char.add('"', values), '"'), missing
+
+
+def python_timestamp(timestamp, precision, epoch):
+    if isinstance(timestamp, datetime):
+        return datetime_to_nanoseconds(timestamp) // NANOSECONDS[precision]
+
+    return convert_epoch(int(timestamp), epoch, precision)
+
+
+def python_chunks(segments, timestamps, field_columns, precision, epoch,
+                  chunk_size):
+    # Segments alternate between constant text and tags with a value per row.
+    prefix = segments[0]
+    texts = [(segments[i][0], segments[i + 1])
+             for i in range(1, len(segments), 2)]
+    columns = [s[1] for s in segments[1::2]]
+    field_keys = [key for key, _ in field_columns]
+
+    rows = six.moves.zip(
+        timestamps,
+        six.moves.zip(*columns) if columns else repeat(()),
+        six.moves.zip(*[value for _, value in field_columns])
+    )
+
+    lines = []
+    for timestamp, tag_values, field_values in rows:
+        values = ','.join([
+            key + '=' + format_value(value)
+            for key, value in zip(field_keys, field_values)
+            if not is_missing(value)
+        ])
+        if not values:
+            continue
+
+        line = prefix + ''.join([
+            suffix if is_missing(value)
+            else text + escape_tag_value(value) + suffix
+            for (text, suffix), value in zip(texts, tag_values)
+        ])
+        lines.append('{} {} {}'.format(
+            line, values, python_timestamp(timestamp, precision, epoch)))
+
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines)
+            lines = []
+
+    yield '\n'.join(lines)
@@ -1,15 +1,73 @@
-from requests import post, get
+import threading
+import zlib
+import six
+
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from time import time
+
 from six.moves.urllib.parse import urlparse, quote_plus
 
+from .cache import MISSING
+from .decoders import CONTENT_TYPES, decode_json, get_decoder
+from .ranges import DAY, merge_series, window_queries
+from .retry import (RetryPolicy, is_transient_error, parse_retry_after,
+                    split_lines)
+from .serializer import serialize_batch
+from .series import Series
+from .spool import Replayer, Spool
 from .exceptions import (QueryFailedException, WriteFailedException,
                          DatabaseNotFoundException, UnauthorizedException,
-                         ForbiddenException)
+                         ForbiddenException, RequestTooLargeException,
+                         PartialWriteException)
 
 __all__ = ['Connection']
 
 # All these types of queries should issue a GET request.
 GET_QUERIES = ['SELECT', 'SHOW']
 
+# The formats query results can be returned in.
+QUERY_FORMATS = ['dicts', 'columns']
+
+# The maximum length of the statements joined by query_many, which keeps the
+# query string below the URL length most servers accept.
+MAX_QUERY_LENGTH = 4096
+
+# The error InfluxDB returns for the statements following a failed statement.
+NOT_EXECUTED = 'not executed'
+
+# The amount of bytes read from a streaming response at once.
+STREAM_BUFFER_SIZE = 64 * 1024
+
+# The headers sent with a compressed write.
+GZIP_HEADERS = {'Content-Encoding': 'gzip'}
+
+# Maps the status codes of failed requests to the exception that is raised.
+WRITE_EXCEPTIONS = {
+    400: WriteFailedException,
+    401: UnauthorizedException,
+    403: ForbiddenException,
+    404: DatabaseNotFoundException,
+    413: RequestTooLargeException,
+    429: WriteFailedException,
+    500: WriteFailedException,
+    502: WriteFailedException,
+    503: WriteFailedException,
+    504: WriteFailedException
+}
+
+QUERY_EXCEPTIONS = {
+    400: QueryFailedException,
+    401: UnauthorizedException,
+    403: ForbiddenException,
+    429: QueryFailedException,
+    500: QueryFailedException,
+    502: QueryFailedException,
+    503: QueryFailedException,
+    504: QueryFailedException
+}
+
 
 def get_method(query):
     """ Determines which method should be used to execute this query.
@@ -33,47 +91,213 @@ def get_method(query):
     if 'INTO' not in query:
         for word in GET_QUERIES:
             if word in query:
-                return get
+                return 'get'
+
+    return 'post'
+
+
+def parse_query_response(response, format='dicts', decoder=None):
+    """ Parses the query response and returns a list of response objects. The
+    body is decoded by ``decoder``, or the decoder of its content type. """
+    if decoder is None:
+        decoder = get_decoder(response.headers.get('Content-Type'))
+
+    return parse_query_data(decoder(response.content), format)
 
-    return post
 
+def parse_query_data(data, format='dicts'):
+    """ Parses the decoded JSON body of a query response.
+
+    With the ``dicts`` format, every series becomes a dict holding a list of
+    dicts, one for every row. With the ``columns`` format, every series
+    becomes a :class:`~inflow.Series`, which stores its values per column.
+    """
+    if format not in QUERY_FORMATS:
+        raise ValueError('Invalid format provided, must be one of dicts or '
+                         'columns.')
 
-def parse_query_response(response):
-    """ Parses the query response and returns a list of response objects. """
-    data = response.json()
     if 'results' not in data:
         return []
 
+    return parse_series(data['results'][0].get('series', []), format)
+
+
+def parse_series(series, format='dicts'):
+    """ Parses the series of a single statement's result. """
     retval = []
-    series = data['results'][0].get('series', [])
 
     for s in series:
-        parsed = dict(
+        columns = s['columns']
+        if 'time' in columns:
+            columns = ['timestamp' if c == 'time' else c for c in columns]
+
+        if format == 'columns':
+            retval.append(Series(s['name'], columns, s.get('values'),
+                                 tags=s.get('tags')))
+            continue
+
+        series = dict(
             name=s['name'],
-            values=[]
+            values=[dict(zip(columns, v)) for v in s.get('values', ())]
         )
+        # Queries using GROUP BY return a series for every group.
+        if 'tags' in s:
+            series['tags'] = s['tags']
+
+        retval.append(series)
+
+    return retval
 
-        try:
-            i = s['columns'].index('time')
-            s['columns'][i] = 'timestamp'
-        except ValueError:
-            pass
 
-        for v in s['values']:
-            parsed['values'].append({
-                key: value
-                for key, value in zip(s['columns'], v)
-            })
+def parse_statement_results(data, count, format='dicts'):
+    """ Parses the results of a request holding ``count`` statements. Returns
+    a list with the parsed series of every statement, or the
+    QueryFailedException of every failed statement. """
+    retval = [[] for _ in range(count)]
 
-        retval.append(parsed)
+    for i, result in enumerate(data.get('results', [])):
+        i = result.get('statement_id', i)
+
+        if 'error' in result:
+            retval[i] = QueryFailedException(result)
+        else:
+            retval[i] = parse_series(result.get('series', []), format)
 
     return retval
 
 
+def strip_statement(query):
+    """ Removes the trailing semicolons of a query, which would otherwise
+    add empty statements when queries are joined. """
+    return query.rstrip('; \t\r\n')
+
+
+def is_not_executed(result):
+    """ Returns whether a statement result is the error InfluxDB returns
+    for the statements following a failed statement. """
+    return isinstance(result, QueryFailedException) and\
+        isinstance(result.message, dict) and\
+        result.message.get('error') == NOT_EXECUTED
+
+
+def merge_statement_results(data, count, format='dicts'):
+    """ Returns the result of a single query that might hold several
+    statements: the first error, or the series of all statements. """
+    results = parse_statement_results(data, max(count, 1), format)
+
+    for result in results:
+        if isinstance(result, QueryFailedException):
+            return result
+
+    return [series for result in results for series in result]
+
+
+def batch_queries(queries, max_length):
+    """ Groups queries into batches, which are at most ``max_length``
+    characters long when joined. Longer queries get a batch of their own. """
+    batch = []
+    length = 0
+
+    for query in queries:
+        if batch and length + len(query) + 1 > max_length:
+            yield batch
+            batch = []
+            length = 0
+
+        batch.append(query)
+        length += len(query) + 1
+
+    if batch:
+        yield batch
+
+
+def get_error(response):
+    """ Returns the error of a failed request. InfluxDB returns a JSON error,
+    but proxies in front of it might not. """
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+def check_query_errors(data):
+    """ Raises a QueryFailedException when a query response that was
+    accepted by InfluxDB reports an error anyway. InfluxDB does this when an
+    error occurs after it started streaming a chunked response. """
+    if 'error' in data:
+        raise QueryFailedException(data)
+
+    for result in data.get('results', []):
+        if 'error' in result:
+            raise QueryFailedException(result)
+
+
+def gzip_compress(data, level=6):
+    """ Compresses bytes into the gzip format. """
+    # A wbits value of 16 + 15 makes zlib write a gzip header and trailer.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def create_http_session(pool_size=10, keep_alive=True, retries=0):
+    """ Creates the pooled HTTP session used by a connection.
+
+    ``retries`` is passed on to urllib3 and only covers failures to set up a
+    connection, it never resends a request that reached InfluxDB. When
+    ``keep_alive`` is disabled, every request asks the server to close the
+    connection afterwards.
+    """
+    # Importing requests takes long, so it's only imported when needed.
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                          max_retries=retries)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+
+    return session
+
+
+class Flight(object):
+    """ A query request in progress, which concurrent callers of the same
+    query wait for. """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        """ Waits until the request is done, and returns its result or
+        raises its exception. """
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+
+        return self.result
+
+
 class Connection:
-    """ Represents a connection to an InfluxDB instance. """
+    """ Represents a connection to an InfluxDB instance.
 
-    def __init__(self, uri, precision='s', retention_policy=None, timeout=None):
+    Every connection owns a pool of persistent HTTP connections, so
+    consecutive writes and queries reuse the same TCP (and TLS) connection
+    instead of doing a new handshake for every request. The pool can safely be
+    shared between threads; it holds at most ``pool_size`` idle connections.
+    """
+
+    def __init__(self, uri, precision='s', retention_policy=None, timeout=None,
+                 pool_size=10, keep_alive=True, retries=0,
+                 compress_writes=False, compress_level=6,
+                 compress_min_size=1024, compress_queries=True, spool=None,
+                 retry_policy=None, hooks=None, query_cache=None,
+                 coalesce_queries=False, query_format='json',
+                 query_decoder=None, replay_interval=10):
         parsed = urlparse(uri)
 
         if parsed.hostname is None or\
@@ -106,6 +330,78 @@ class Connection:
         self.retention_policy = retention_policy
         self.timeout = timeout
 
+        self.compress_writes = compress_writes
+        """ Whether to gzip the line protocol that is written. """
+
+        self.compress_level = compress_level
+        """ The gzip compression level, from 1 (fastest) to 9 (smallest). """
+
+        self.compress_min_size = compress_min_size
+        """ Writes smaller than this amount of bytes are never compressed, as
+        the gain is too small to be worth the effort. """
+
+        self.query_headers = {
+            'Accept-Encoding': 'gzip' if compress_queries else 'identity'
+        }
+        """ The headers sent with every query. """
+
+        if query_format not in CONTENT_TYPES:
+            raise ValueError('Invalid query format provided, must be one of '
+                             'json, msgpack or csv.')
+
+        # InfluxDB returns JSON unless asked for another format.
+        self.format_headers = self.query_headers
+        """ The headers of queries returning results in the ``query_format``,
+        which only ``query`` uses. The other query methods need JSON. """
+
+        if query_format != 'json':
+            self.format_headers = dict(self.query_headers,
+                                       Accept=CONTENT_TYPES[query_format])
+
+        self.query_decoder = query_decoder
+        """ When set, decodes the body of every ``query`` response, instead of
+        the decoder of its content type. """
+
+        if isinstance(spool, six.string_types):
+            spool = Spool(spool)
+
+        self.spool = spool
+        """ When set, writes that can't be sent are appended to this
+        :class:`~inflow.spool.Spool`, and sent later. """
+
+        self.retry_policy = retry_policy
+        """ When set, failed writes are retried and rejected batches are split
+        according to this :class:`~inflow.retry.RetryPolicy`. """
+
+        self.hooks = list(hooks or [])
+        """ The :class:`~inflow.hooks.Hooks` notified of every request. """
+
+        self.query_cache = query_cache
+        """ When set, the results of read queries are cached in this
+        :class:`~inflow.cache.QueryCache`. """
+
+        self.coalesce_queries = coalesce_queries
+        """ Whether concurrent identical read queries share a single
+        request. """
+
+        self.flights = {}
+        """ The :class:`Flight` of every read query that is in progress, by
+        query, epoch and format. """
+
+        self.flights_lock = threading.Lock()
+
+        self.http = self.create_http(pool_size, keep_alive, retries)
+
+        self.replayer = None
+        """ Replays the spool every ``replay_interval`` seconds. """
+
+        if spool is not None and replay_interval:
+            self.replayer = Replayer(spool, self.replay_spool, replay_interval)
+
+    def create_http(self, pool_size, keep_alive, retries):
+        """ Creates the HTTP transport used by this connection. """
+        return create_http_session(pool_size, keep_alive, retries)
+
     def get_write_url(self, retention_policy=None):
         """ Returns the url needed to write measurements to InfluxDB. """
         url = '{}/write?precision={}&db={}'.format(
@@ -121,8 +417,10 @@ class Connection:
 
         return url
 
-    def get_query_url(self, query, epoch):
-        """ Returns the url needed to query measurements from InfluxDB.  """
+    def get_query_url(self, query, epoch, chunk_size=None):
+        """ Returns the url needed to query measurements from InfluxDB. When a
+        ``chunk_size`` is given, InfluxDB streams the results in chunks of at
+        most that many rows. """
         url = '{}/query?db={}&q={}'.format(
             self.uri,
             self.db,
@@ -136,38 +434,415 @@ class Connection:
 
             url = '{}&epoch={}'.format(url, epoch)
 
+        if chunk_size is not None:
+            url = '{}&chunked=true&chunk_size={}'.format(url, chunk_size)
+
         return url
 
+    def serialize(self, measurement):
+        """ Serializes a measurement, or a list of them, to line protocol. """
+        if type(measurement) is list:
+            return serialize_batch(measurement, self.precision)
+
+        return measurement.to_line(self.precision)
+
+    def notify(self, event, *args):
+        """ Calls the given event of all hooks. """
+        for hook in self.hooks:
+            getattr(hook, event)(*args)
+
+    @contextmanager
+    def observe_write(self, data, retention_policy):
+        """ Notifies the hooks of a write request done in this context. """
+        if not self.hooks:
+            yield
+            return
+
+        self.notify('before_write', data, retention_policy)
+        start = time()
+        try:
+            yield
+        except Exception as e:
+            self.notify('after_write', data, retention_policy, time() - start,
+                        e)
+            raise
+
+        self.notify('after_write', data, retention_policy, time() - start,
+                    None)
+
+    @contextmanager
+    def observe_query(self, query):
+        """ Notifies the hooks of a query request done in this context. """
+        if not self.hooks:
+            yield
+            return
+
+        start = time()
+        try:
+            yield
+        except Exception as e:
+            self.notify('on_query', query, time() - start, e)
+            raise
+
+        self.notify('on_query', query, time() - start, None)
+
+    def serialize_observed(self, measurement):
+        """ Serializes measurements, notifying the hooks of the time it took.
+        """
+        if not self.hooks:
+            return self.serialize(measurement)
+
+        start = time()
+        data = self.serialize(measurement)
+        self.notify('on_serialize', len(measurement)
+                    if type(measurement) is list else 1, time() - start)
+
+        return data
+
     def write(self, measurement, retention_policy=None):
         """ Write a single measurement to the InfluxDB API. """
-        if type(measurement) is list:
-            data = '\n'.join([m.to_line(self.precision) for m in measurement])
-        else:
-            data = measurement.to_line(self.precision)
-
-        rv = post(self.get_write_url(retention_policy), auth=self.auth,
-                  data=data, timeout=self.timeout)
-
-        if rv.status_code == 400 or rv.status_code == 500:
-            raise WriteFailedException(rv.json())
-        elif rv.status_code == 401:
-            raise UnauthorizedException(rv.json())
-        elif rv.status_code == 403:
-            raise ForbiddenException(rv.json())
-        elif rv.status_code == 404:
-            raise DatabaseNotFoundException(rv.json())
-
-    def query(self, query, epoch=None):
-        """ Execute a query on InfluxDB. """
-        method = get_method(query)
-        rv = method(self.get_query_url(query, epoch), auth=self.auth,
-                    timeout=self.timeout)
+        return self.write_lines(self.serialize_observed(measurement),
+                                retention_policy)
+
+    def encode_write(self, data):
+        """ Returns the body and extra headers of a write request for the
+        given line protocol, which is compressed if configured. """
+        if not self.compress_writes:
+            return data, {}
+
+        # The minimum size is in bytes, not in characters.
+        if not isinstance(data, (bytes, bytearray)):
+            data = data.encode('utf-8')
+
+        if len(data) < self.compress_min_size:
+            return data, {}
+
+        return gzip_compress(data, self.compress_level), GZIP_HEADERS
+
+    def write_lines(self, data, retention_policy=None):
+        """ Write already serialized line protocol to the InfluxDB API.
+
+        With a spool, the spooled data is written first. When InfluxDB can't
+        be reached, the data is appended to the spool and no exception is
+        raised. It's written by the next replay that succeeds.
+        """
+        try:
+            if self.spool is not None:
+                self.spool_write(data, retention_policy)
+            else:
+                self.send_write(data, retention_policy)
+        finally:
+            if self.query_cache is not None:
+                self.query_cache.invalidate_lines(data)
+
+    def spool_write(self, data, retention_policy=None):
+        """ Writes line protocol after the spooled data, or appends it to the
+        spool when InfluxDB can't be reached. Errors caused by the data itself
+        are raised. """
+        # While data is spooled, new data is appended after it to keep the
+        # order. Draining the spool is left to the replayer, as it can take
+        # long after an outage, and only done here when there's no replayer.
+        if len(self.spool):
+            if self.replayer is not None or\
+                    not self.spool.replay(self.send_write, blocking=False):
+                return self.spool.append(data, retention_policy)
+
+        try:
+            self.send_write(data, retention_policy)
+        except Exception as e:
+            if not is_transient_error(e):
+                raise
+
+            self.spool.append(data, retention_policy)
+
+    def replay_spool(self):
+        """ Writes all spooled data to InfluxDB. Returns whether the spool is
+        empty now. """
+        return self.spool.replay(self.send_write)
+
+    def send_write(self, data, retention_policy=None):
+        """ Writes line protocol, retrying and splitting it according to the
+        retry policy. When only part of the lines could be written, a
+        :class:`~inflow.PartialWriteException` is raised with the others. """
+        if self.retry_policy is None:
+            return self.post_write(data, retention_policy)
+
+        failures = []
+        self.send_batch(data, retention_policy, failures)
+
+        if failures:
+            raise PartialWriteException(failures)
+
+    def send_batch(self, data, retention_policy, failures):
+        """ Writes a batch, splitting it in two when it's rejected, and adds
+        the parts that failed by themselves to ``failures``. """
+        try:
+            self.retry_policy.call(self.post_write, (data, retention_policy),
+                                   partial(self.notify, 'on_retry')
+                                   if self.hooks else None)
+        except WriteFailedException as e:
+            if not self.retry_policy.should_split(e):
+                raise
+
+            halves = split_lines(data)
+            if halves is None:
+                failures.append((data, e))
+                return
+
+            for half in halves:
+                self.send_batch(half, retention_policy, failures)
+
+    def post_write(self, data, retention_policy=None):
+        """ Sends a write request with the given line protocol. """
+        body, headers = self.encode_write(data)
+
+        with self.observe_write(data, retention_policy):
+            rv = self.http.post(self.get_write_url(retention_policy),
+                                auth=self.auth, data=body,
+                                timeout=self.timeout, headers=headers)
+
+            exception = WRITE_EXCEPTIONS.get(rv.status_code)
+            if exception is not None:
+                raise exception(get_error(rv), rv.status_code,
+                                parse_retry_after(
+                                    rv.headers.get('Retry-After')))
+
+    def get_cache_key(self, query, epoch, format, cache_ttl=None):
+        """ Returns the key of a query in the query cache, or None when its
+        result shouldn't be cached. Statements sent using POST modify the
+        database, so they're never cached. """
+        if self.query_cache is None or cache_ttl == 0 or\
+                get_method(query) != 'get':
+            return None
+
+        return (self.db, query, epoch, format)
+
+    def query(self, query, epoch=None, format='dicts', cache_ttl=None):
+        """ Execute a query on InfluxDB. See :func:`parse_query_data` for the
+        available result formats.
+
+        With a query cache, the result of a read query is cached for
+        ``cache_ttl`` seconds, or the default TTL of the cache when it's None.
+        A ``cache_ttl`` of 0 bypasses the cache.
+        """
+        key = self.get_cache_key(query, epoch, format, cache_ttl)
+        if key is not None:
+            result = self.query_cache.get(key)
+            if result is not MISSING:
+                return result
+
+        if not self.coalesce_queries or get_method(query) != 'get':
+            return self.send_query(query, epoch, format, key, cache_ttl)
+
+        # Only the first of concurrent identical queries sends a request, the
+        # others wait for its result.
+        flight_key = (query, epoch, format)
+        with self.flights_lock:
+            flight = self.flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[flight_key] = Flight()
+
+        if not leader:
+            self.notify('on_coalesce', query)
+            return flight.wait()
+
+        try:
+            flight.result = self.send_query(query, epoch, format, key,
+                                            cache_ttl)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.flights_lock:
+                del self.flights[flight_key]
+            flight.done.set()
+
+    def send_query(self, query, epoch=None, format='dicts', cache_key=None,
+                   cache_ttl=None):
+        """ Sends a query request, and caches its result under the given
+        key. """
+        method = getattr(self.http, get_method(query))
+        generation = (self.query_cache.generation
+                      if cache_key is not None else None)
+
+        with self.observe_query(query):
+            rv = method(self.get_query_url(query, epoch), auth=self.auth,
+                        headers=self.format_headers, timeout=self.timeout)
+
+            exception = QUERY_EXCEPTIONS.get(rv.status_code)
+            if exception is not None:
+                raise exception(get_error(rv), rv.status_code)
+
+            result = parse_query_response(rv, format, self.query_decoder)
+
+        if cache_key is not None:
+            self.query_cache.set(cache_key, result, len(rv.content),
+                                 cache_ttl, generation)
+
+        return result
+
+    def query_many(self, queries, epoch=None, format='dicts',
+                   max_length=MAX_QUERY_LENGTH):
+        """ Executes a list of queries using as few requests as possible.
+
+        The queries are joined into a single request, or into several requests
+        of at most ``max_length`` characters. Returns a list with the results
+        of every query, in order. Instead of raising, a failed query gets the
+        :class:`~inflow.QueryFailedException` it would have raised as result.
+        """
+        retval = []
+        for batch in batch_queries(queries, max_length):
+            retval.extend(self.query_batch(batch, epoch, format))
+
+        return retval
+
+    def query_batch(self, queries, epoch=None, format='dicts'):
+        """ Executes multiple queries in a single request.
+
+        InfluxDB stops at the first statement that fails, and reports all
+        statements after it as not executed, so these are executed again.
+        """
+        queries = [strip_statement(q) for q in queries]
+        methods = set(get_method(q) for q in queries)
+        method = getattr(self.http, 'post' if 'post' in methods else 'get')
+
+        query = ';'.join(queries)
+
+        with self.observe_query(query):
+            rv = method(self.get_query_url(query, epoch), auth=self.auth,
+                        headers=self.query_headers, timeout=self.timeout)
+
+            exception = QUERY_EXCEPTIONS.get(rv.status_code)
+            if exception is not None and rv.status_code != 400:
+                raise exception(get_error(rv), rv.status_code)
 
         if rv.status_code == 400:
-            raise QueryFailedException(rv.json())
-        elif rv.status_code == 401:
-            raise UnauthorizedException(rv.json())
-        elif rv.status_code == 403:
-            raise ForbiddenException(rv.json())
+            # InfluxDB rejects all statements when a single one of them can't
+            # be parsed, so execute them separately to find the culprit.
+            if len(queries) > 1:
+                return [result for q in queries
+                        for result in self.query_batch([q], epoch, format)]
+
+            return [QueryFailedException(get_error(rv), rv.status_code)]
+
+        data = rv.json()
+        count = len(data.get('results', []))
+
+        if len(queries) == 1:
+            return [merge_statement_results(data, count, format)]
+
+        if count != len(queries):
+            # A query holding several statements shifts the results of all
+            # queries after it, so execute them separately.
+            return [result for q in queries
+                    for result in self.query_batch([q], epoch, format)]
+
+        retval = parse_statement_results(data, count, format)
+
+        not_executed = [i for i, r in enumerate(retval) if is_not_executed(r)]
+        if not_executed:
+            results = self.query_batch([queries[i] for i in not_executed],
+                                       epoch, format)
+            for i, result in zip(not_executed, results):
+                retval[i] = result
+
+        return retval
+
+    def query_iter(self, query, epoch=None, chunk_size=10000, format='dicts'):
+        """ Execute a query on InfluxDB, streaming the results.
+
+        Yields the same series dicts as ``query`` does, but one for every
+        chunk of at most ``chunk_size`` rows, as soon as it arrives. A long
+        series is therefore yielded in several parts with the same name.
+        """
+        method = getattr(self.http, get_method(query))
+
+        # Only the time until the response starts is observed, as the
+        # results are streamed while the caller handles them.
+        with self.observe_query(query):
+            rv = method(self.get_query_url(query, epoch, chunk_size),
+                        auth=self.auth, headers=self.query_headers,
+                        timeout=self.timeout, stream=True)
+
+            exception = QUERY_EXCEPTIONS.get(rv.status_code)
+            if exception is not None:
+                error = get_error(rv)
+                rv.close()
+                raise exception(error, rv.status_code)
 
-        return parse_query_response(rv)
+        try:
+            for line in rv.iter_lines(chunk_size=STREAM_BUFFER_SIZE):
+                if not line:
+                    continue
+
+                data = decode_json(line)
+                check_query_errors(data)
+
+                for series in parse_query_data(data, format):
+                    yield series
+        finally:
+            rv.close()
+
+    def query_range(self, template, start, end, window=DAY, epoch=None,
+                    format='dicts', workers=4, retry_policy=None):
+        """ Runs a query over a long time range in windows, concurrently.
+
+        The range from ``start`` up to ``end`` is split into windows of at
+        most ``window``, a timedelta or a number of seconds. The ``{start}``
+        and ``{end}`` placeholders of the ``template`` are replaced by the
+        bounds of every window, as nanosecond timestamps, like::
+
+            SELECT * FROM "energy" WHERE time >= {start} AND time < {end}
+
+        ``start`` and ``end`` are datetimes, or numbers in the ``epoch``
+        precision (seconds by default). At most ``workers`` windows are
+        queried at once, and every failing window is retried on its own
+        according to the ``retry_policy``, the retry policy of the connection
+        or a default :class:`~inflow.RetryPolicy`. The series of all windows
+        are merged into one series per measurement.
+        """
+        return merge_series(self.query_range_iter(
+            template, start, end, window, epoch, format, workers,
+            retry_policy))
+
+    def query_range_iter(self, template, start, end, window=DAY, epoch=None,
+                         format='dicts', workers=4, retry_policy=None):
+        """ Runs a query over a long time range in windows, like
+        ``query_range``, but yields the series of every window in order, as
+        soon as they're available. At most ``2 * workers`` window results are
+        kept in memory. """
+        from concurrent.futures import ThreadPoolExecutor
+
+        policy = retry_policy or self.retry_policy or RetryPolicy()
+        queries = window_queries(template, start, end, window, epoch or 's')
+        on_retry = partial(self.notify, 'on_retry')
+
+        executor = ThreadPoolExecutor(workers)
+        pending = deque()
+
+        try:
+            for query in queries:
+                if len(pending) >= 2 * workers:
+                    for series in pending.popleft().result():
+                        yield series
+
+                pending.append(executor.submit(
+                    policy.call, self.query, (query, epoch, format), on_retry))
+
+            while pending:
+                for series in pending.popleft().result():
+                    yield series
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
+
+    def close(self):
+        """ Closes all pooled HTTP connections, and stops replaying the spool.
+        """
+        if self.replayer is not None:
+            self.replayer.stop()
+
+        self.http.close()
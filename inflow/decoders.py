@@ -0,0 +1,234 @@
+""" Decoding query responses.
+
+InfluxDB returns query results as JSON by default, but can also return them
+as MessagePack or CSV when asked to using the ``Accept`` header. Every decoder
+turns the body of a response into the structure of the JSON response, so the
+results are parsed the same way regardless of the format.
+"""
+import csv
+import io
+import json
+import re
+import struct
+import six
+
+from datetime import datetime, timedelta
+
+fast_loads = False
+""" The ``loads`` function of orjson, which is imported on first use, or
+None when it isn't installed. """
+
+msgpack = False
+""" The msgpack package, which is imported on first use, or None when it
+isn't installed. """
+
+__all__ = ['CONTENT_TYPES', 'DECODERS', 'decode_json', 'decode_msgpack',
+           'decode_csv', 'get_decoder']
+
+# The content type requested for every query format.
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'msgpack': 'application/x-msgpack',
+    'csv': 'application/csv'
+}
+
+# The MessagePack extension type InfluxDB uses for timestamps.
+MSGPACK_TIME_TYPE = 5
+
+EPOCH = datetime(1970, 1, 1)
+
+# Numbers the way InfluxDB writes them in CSV. Values written any other way,
+# like "00123", are strings.
+INTEGER_PATTERN = re.compile(r'-?(?:0|[1-9]\d*)\Z')
+FLOAT_PATTERN = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?\Z')
+
+
+def load_fast_loads():
+    """ Imports orjson, when it isn't imported yet. """
+    global fast_loads
+    if fast_loads is False:
+        try:
+            from orjson import loads as fast_loads
+        except ImportError:
+            fast_loads = None
+
+    return fast_loads
+
+
+def decode_json(body):
+    """ Decodes a JSON response, using orjson when it's installed. """
+    loads = fast_loads if fast_loads is not False else load_fast_loads()
+    if loads is not None:
+        return loads(body)
+
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+
+    return json.loads(body)
+
+
+def load_msgpack():
+    """ Imports msgpack, when it isn't imported yet. """
+    global msgpack
+    if msgpack is False:
+        try:
+            import msgpack
+        except ImportError:
+            msgpack = None
+
+    return msgpack
+
+
+def decode_msgpack_time(code, data):
+    """ Turns a MessagePack timestamp into the RFC3339 string the JSON format
+    uses. """
+    if code != MSGPACK_TIME_TYPE:
+        return msgpack.ExtType(code, data)
+
+    seconds, nanoseconds = struct.unpack('>QI', data)
+    timestamp = (EPOCH + timedelta(seconds=seconds)).isoformat()
+    if nanoseconds:
+        timestamp += '.{:09d}'.format(nanoseconds).rstrip('0')
+
+    return timestamp + 'Z'
+
+
+def decode_msgpack(body):
+    """ Decodes a MessagePack response, which needs the ``msgpack``
+    package. """
+    if load_msgpack() is None:
+        raise ImportError('Decoding MessagePack requires msgpack, install it '
+                          'using: pip install inflow[msgpack]')
+
+    return msgpack.unpackb(body, ext_hook=decode_msgpack_time, raw=False)
+
+
+def parse_csv_column(values):
+    """ Converts the values of a CSV column back to numbers or booleans. CSV
+    has no types, so a column is only converted when all of its values are
+    written the way InfluxDB writes numbers or booleans. Otherwise, like for
+    tags and string fields holding "00123", the values stay strings. Empty
+    values are missing, and become None. """
+    present = [v for v in values if v]
+
+    if all(INTEGER_PATTERN.match(v) for v in present):
+        convert = int
+    elif all(FLOAT_PATTERN.match(v) for v in present):
+        convert = float
+    elif all(v == 'true' or v == 'false' for v in present):
+        convert = lambda v: v == 'true'  # noqa: E731
+    else:
+        convert = None
+
+    if convert is None:
+        return [v or None for v in values]
+
+    return [convert(v) if v else None for v in values]
+
+
+def parse_csv_values(rows):
+    """ Converts the rows of a series, column by column. """
+    if not rows:
+        return rows
+
+    columns = [parse_csv_column(column) for column in zip(*rows)]
+    return [list(row) for row in zip(*columns)]
+
+
+def parse_csv_tags(tags):
+    """ Parses the escaped ``key=value,key=value`` tags of a CSV row. """
+    retval = {}
+    for pair in csv_split(tags, ','):
+        key, _, value = pair.partition('=')
+        retval[key] = value
+
+    return retval
+
+
+def csv_split(string, separator):
+    """ Splits a string at every separator that isn't escaped, and removes the
+    escapes. """
+    parts = []
+    part = []
+    escaped = False
+
+    for char in string:
+        if escaped:
+            part.append(char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == separator:
+            parts.append(''.join(part))
+            part = []
+        else:
+            part.append(char)
+
+    parts.append(''.join(part))
+    return parts
+
+
+def decode_csv(body):
+    """ Decodes a CSV response. Every series starts with a header row holding
+    the ``name`` and ``tags`` columns, followed by the columns of the series.
+    Rows of series with the same columns follow without a new header. """
+    if not six.PY3:
+        lines = io.BytesIO(body)
+    elif isinstance(body, bytes):
+        lines = io.StringIO(body.decode('utf-8'), newline='')
+    else:
+        lines = io.StringIO(body, newline='')
+
+    series = []
+    columns = None
+    current = None
+    current_key = None
+
+    for row in csv.reader(lines):
+        if not row:
+            columns = None
+            continue
+
+        if columns is None:
+            if row == ['error']:
+                columns = row
+                continue
+
+            columns = row[2:]
+            current_key = None
+            continue
+
+        if columns == ['error']:
+            return {'error': row[0]}
+
+        key = (row[0], row[1])
+        if key != current_key:
+            current_key = key
+            current = {'name': row[0], 'columns': columns, 'values': []}
+            if row[1]:
+                current['tags'] = parse_csv_tags(row[1])
+            series.append(current)
+
+        current['values'].append(row[2:])
+
+    for s in series:
+        s['values'] = parse_csv_values(s['values'])
+
+    return {'results': [{'statement_id': 0, 'series': series}]}
+
+
+# The decoder of every content type.
+DECODERS = {
+    'application/json': decode_json,
+    'application/x-msgpack': decode_msgpack,
+    'application/csv': decode_csv,
+    'text/csv': decode_csv
+}
+
+
+def get_decoder(content_type):
+    """ Returns the decoder of a content type, which is JSON by default. """
+    if isinstance(content_type, six.string_types):
+        return DECODERS.get(content_type.split(';')[0].strip(), decode_json)
+
+    return decode_json
@@ -1,6 +1,8 @@
 __all__ = ['InfluxDBException', 'QueryFailedException', 'WriteFailedException',
            'DatabaseNotFoundException', 'UnauthorizedException',
-           'ForbiddenException']
+           'ForbiddenException', 'QueueFullException',
+           'ShardedWriteException', 'RequestTooLargeException',
+           'PartialWriteException']
 
 
 class InfluxDBException(Exception):
@@ -8,9 +10,22 @@ class InfluxDBException(Exception):
     subclass from this one.
 
     The message in this exception (and it's subclasses) is the raw error
-    message returned by the InfluxDB HTTP API.
+    message returned by the InfluxDB HTTP API, and is available as the
+    ``message`` attribute. The ``status_code`` attribute holds the HTTP status
+    code of the failed request, if any, and ``retry_after`` the amount of
+    seconds the server asked to wait before trying again.
     """
-    pass
+
+    def __init__(self, message=None, status_code=None, retry_after=None):
+        Exception.__init__(self, message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # Keeps the attributes when an exception is sent to another process.
+        return self.__class__, (self.message, self.status_code,
+                                self.retry_after)
 
 
 class QueryFailedException(InfluxDBException):
@@ -24,6 +39,37 @@ class WriteFailedException(InfluxDBException):
     pass
 
 
+class RequestTooLargeException(WriteFailedException):
+    """ Thrown when a write is rejected because its body is too large. """
+    pass
+
+
+class PartialWriteException(WriteFailedException):
+    """ Thrown when some lines of a batch were rejected, after splitting it
+    to write all other lines. See :class:`~inflow.retry.RetryPolicy`.
+
+    The ``failures`` attribute holds a ``(lines, exception)`` tuple for every
+    part of the batch that failed by itself, and ``lines`` holds all lines
+    that weren't written.
+    """
+
+    def __init__(self, failures):
+        InfluxDBException.__init__(self, 'Writing {} part(s) of the batch '
+                                   'failed: {}'.format(
+                                       len(failures),
+                                       [e for _, e in failures]),
+                                   failures[0][1].status_code)
+        self.failures = failures
+
+    def __reduce__(self):
+        return self.__class__, (self.failures,)
+
+    @property
+    def lines(self):
+        return [line for lines, _ in self.failures
+                for line in lines.splitlines()]
+
+
 class DatabaseNotFoundException(InfluxDBException):
     """ Thrown when trying to write to a non-existing database. """
     pass
@@ -38,3 +84,27 @@ class ForbiddenException(InfluxDBException):
     """ Thrown when a user is correctly logged in, but is not allowed to do the
     query or write action it wants to do. """
     pass
+
+
+class QueueFullException(InfluxDBException):
+    """ Thrown when a measurement is written to a full background writer which
+    is configured to raise on overflow. """
+    pass
+
+
+class ShardedWriteException(InfluxDBException):
+    """ Thrown when writing to one or more shards of a
+    :class:`~inflow.ShardedClient` failed. The writes to all other shards did
+    succeed.
+
+    The ``errors`` attribute maps the URI of every failed shard to the
+    exception its write raised.
+    """
+
+    def __init__(self, errors):
+        InfluxDBException.__init__(self, 'Writing to {} shard(s) failed: {}'
+                                   .format(len(errors), errors))
+        self.errors = errors
+
+    def __reduce__(self):
+        return self.__class__, (self.errors,)
@@ -0,0 +1,227 @@
+""" Observing what a connection does.
+
+A connection calls the methods of its hooks before and after every write
+request, after every query, after serializing measurements, before every
+retry, and when a query is coalesced. Subclass :class:`Hooks` and override
+the events you're interested in, or use the :class:`StatsCollector` to keep
+track of the most important metrics.
+"""
+import threading
+
+from bisect import bisect_left
+from time import time
+
+from .measurement import Measurement
+
+__all__ = ['Hooks', 'Histogram', 'StatsCollector']
+
+# The upper bounds in seconds of the buckets of a latency histogram.
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0]
+
+
+class Hooks(object):
+    """ The events of a connection, which all do nothing by default. Hooks
+    are called on the thread doing the request, so they should be fast. """
+
+    def before_write(self, data, retention_policy):
+        """ Called before a write request with the given line protocol is
+        sent. """
+
+    def after_write(self, data, retention_policy, duration, error):
+        """ Called after a write request, with the seconds it took, and the
+        exception it raised or None. """
+
+    def on_serialize(self, points, duration):
+        """ Called after serializing the given amount of measurements. """
+
+    def on_retry(self, attempt, delay, error):
+        """ Called before retrying a write that failed with the given error,
+        which is retried after ``delay`` seconds. ``attempt`` is 1 for the
+        first retry. """
+
+    def on_query(self, query, duration, error):
+        """ Called after a query request, with the seconds it took, and the
+        exception it raised or None. """
+
+    def on_coalesce(self, query):
+        """ Called when a query waits for the result of an identical query
+        that is in progress, instead of sending its own request. """
+
+
+class Histogram(object):
+    """ Counts values in fixed buckets, which keeps recording a value cheap
+    and the memory used constant. """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = list(buckets)
+        """ The upper bound of every bucket. The last, implicit bucket holds
+        everything above the last bound. """
+
+        self.counts = [0] * (len(self.bounds) + 1)
+        """ The amount of values in every bucket. """
+
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, percentile):
+        """ Returns the upper bound of the bucket holding the given percentile
+        (from 0 to 100), or the maximum when it's in the last bucket. """
+        if not self.count:
+            return 0.0
+
+        rank = percentile / 100.0 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+
+class StatsCollector(Hooks):
+    """ Keeps track of the throughput, latency and errors of a connection.
+
+    Recording an event costs a few counter updates under a lock, so the
+    collector can be left enabled in production.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Resets all statistics. """
+        with self.lock:
+            self.start = time()
+            """ When the statistics were last reset. """
+
+            self.writes = 0
+            """ The amount of write requests. """
+
+            self.points = 0
+            """ The amount of points written successfully. """
+
+            self.bytes = 0
+            """ The amount of bytes of line protocol written successfully. """
+
+            self.write_errors = 0
+            """ The amount of write requests that failed. """
+
+            self.retries = 0
+            """ The amount of retried write requests. """
+
+            self.queries = 0
+            """ The amount of query requests. """
+
+            self.query_errors = 0
+            """ The amount of query requests that failed. """
+
+            self.coalesced = 0
+            """ The amount of queries that shared the request of an identical
+            query. """
+
+            self.errors = {}
+            """ The amount of failures, by the name of the exception. """
+
+            self.serialize_time = 0.0
+            """ The seconds spent serializing measurements. """
+
+            self.network_time = 0.0
+            """ The seconds spent on write requests. """
+
+            self.write_latency = Histogram()
+            self.query_latency = Histogram()
+
+    def after_write(self, data, retention_policy, duration, error):
+        with self.lock:
+            self.writes += 1
+            self.network_time += duration
+            self.write_latency.add(duration)
+
+            if error is not None:
+                self.write_errors += 1
+                self.count_error(error)
+            else:
+                newline = b'\n' if isinstance(data, (bytes, bytearray))\
+                    else '\n'
+                self.points += data.count(newline) + 1
+                self.bytes += len(data)
+
+    def on_serialize(self, points, duration):
+        with self.lock:
+            self.serialize_time += duration
+
+    def on_retry(self, attempt, delay, error):
+        with self.lock:
+            self.retries += 1
+
+    def on_query(self, query, duration, error):
+        with self.lock:
+            self.queries += 1
+            self.query_latency.add(duration)
+
+            if error is not None:
+                self.query_errors += 1
+                self.count_error(error)
+
+    def on_coalesce(self, query):
+        with self.lock:
+            self.coalesced += 1
+
+    def count_error(self, error):
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def snapshot(self):
+        """ Returns the current statistics as a dict. """
+        with self.lock:
+            elapsed = max(time() - self.start, 1e-9)
+
+            return {
+                'writes': self.writes,
+                'points': self.points,
+                'bytes': self.bytes,
+                'points_per_second': self.points / elapsed,
+                'bytes_per_second': self.bytes / elapsed,
+                'write_errors': self.write_errors,
+                'retries': self.retries,
+                'queries': self.queries,
+                'query_errors': self.query_errors,
+                'coalesced': self.coalesced,
+                'errors': dict(self.errors),
+                'serialize_time': self.serialize_time,
+                'network_time': self.network_time,
+                'write_latency_mean': self.write_latency.mean,
+                'write_latency_p50': self.write_latency.percentile(50),
+                'write_latency_p99': self.write_latency.percentile(99),
+                'query_latency_mean': self.query_latency.mean,
+                'query_latency_p50': self.query_latency.percentile(50),
+                'query_latency_p99': self.query_latency.percentile(99)
+            }
+
+    def to_measurement(self, name='inflow', tags=None):
+        """ Returns the current statistics as a measurement. """
+        values = self.snapshot()
+        del values['errors']
+
+        return Measurement(name, tags=tags, **values)
+
+    def write_to(self, writer, name='inflow', tags=None):
+        """ Writes the current statistics to InfluxDB, using a client or
+        session. Using a client that isn't observed by this collector keeps
+        these writes out of the statistics. """
+        return writer.write(self.to_measurement(name, tags))
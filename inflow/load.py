@@ -0,0 +1,460 @@
+""" Bulk loading line protocol and CSV files.
+
+Files are memory-mapped, and written in batches of at most ``batch_size``
+bytes that end at a line boundary, so only the batches in flight are held in
+memory. Several batches are written at once over a pooled connection. After
+every batch, the offset up to which the file is written is saved to a
+checkpoint file, so an interrupted load resumes where it stopped.
+"""
+import calendar
+import csv
+import io
+import mmap
+import os
+import re
+import six
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from .decoders import parse_csv_tags
+from .exceptions import PartialWriteException
+from .measurement import NANOSECONDS
+from .serializer import (escape_measurement, escape_key, escape_tag_value,
+                         format_value)
+from .utils import replace
+
+__all__ = ['Loader', 'LoadStats', 'Checkpoint', 'CSVConverter',
+           'iter_batches']
+
+DEFAULT_BATCH_SIZE = 1024 * 1024
+
+# Match the start of every blank or comment line, and the newline before a
+# line that might be one.
+SKIPPED_LINE_PATTERNS = {
+    bytes: (re.compile(br'^[ \t\r]*(?:#|$)', re.MULTILINE),
+            re.compile(br'\n[ \t\r\n#]')),
+    six.text_type: (re.compile(r'^[ \t\r]*(?:#|$)', re.MULTILINE),
+                    re.compile(r'\n[ \t\r\n#]'))
+}
+
+# A float as line protocol accepts it. Python's float() also accepts
+# whitespace, underscores, infinity and NaN, which InfluxDB rejects.
+FLOAT_PATTERN = re.compile(r'-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\Z')
+
+RFC3339_PATTERN = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)'
+                             r'(?:\.(\d{1,9}))?(?:Z|([+-])(\d\d):(\d\d))\Z')
+
+
+def iter_batches(data, start, end, batch_size):
+    """ Yields the ``(start, stop)`` offsets of the batches of ``data`` from
+    ``start`` up to ``end``. Every batch ends after a newline and holds at
+    most ``batch_size`` bytes, unless it's a single longer line. """
+    while start < end:
+        stop = data.rfind(b'\n', start, min(start + batch_size, end))
+        if stop == -1:
+            stop = data.find(b'\n', start, end)
+        if stop == -1:
+            stop = end - 1
+
+        yield start, stop + 1
+        start = stop + 1
+
+
+def count_lines(data):
+    """ Returns the amount of lines of line protocol, skipping blank lines and
+    comments. """
+    if not data:
+        return 0
+
+    newline = b'\n' if isinstance(data, bytes) else '\n'
+    skipped, suspect = SKIPPED_LINE_PATTERNS[type(data)]
+
+    # Finding the lines to skip takes long, so it's only done when a line
+    # might be blank or a comment.
+    if suspect.match(newline + data[:1]) or suspect.search(data):
+        return data.count(newline) + 1 - len(skipped.findall(data))
+
+    return data.count(newline) + (not data.endswith(newline))
+
+
+def format_csv_value(value):
+    """ Formats a CSV value as field value. Numbers are written as they are,
+    which InfluxDB stores as floats, and other values as strings, except for
+    booleans. """
+    if value[0] in '-.0123456789':
+        if FLOAT_PATTERN.match(value):
+            return value
+    elif value == 'true' or value == 'false':
+        return value
+
+    return format_value(value)
+
+
+def parse_rfc3339(value):
+    """ Converts an RFC3339 timestamp, in UTC as returned by InfluxDB or with
+    an offset, to nanoseconds since the epoch. """
+    match = RFC3339_PATTERN.match(value)
+    if match is None:
+        raise ValueError('Invalid timestamp: {!r}'.format(value))
+
+    parts = match.groups()
+    seconds = calendar.timegm([int(p) for p in parts[:6]])
+
+    if parts[7] is not None:
+        offset = int(parts[8]) * 3600 + int(parts[9]) * 60
+        seconds -= offset if parts[7] == '+' else -offset
+
+    return seconds * 10**9 + int((parts[6] or '0').ljust(9, '0'))
+
+
+class Checkpoint(object):
+    """ Records the offset up to which a file is written, in a file at
+    ``path``. """
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        """ Returns the saved offset, or 0 when there's none. """
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0)
+        except (IOError, OSError):
+            return 0
+
+    def save(self, offset):
+        """ Saves the offset, replacing the file atomically so a crash never
+        leaves a torn checkpoint behind. """
+        temp = self.path + '.tmp'
+        with open(temp, 'w') as f:
+            f.write(str(offset))
+        replace(temp, self.path)
+
+    def remove(self):
+        """ Removes the checkpoint, once the whole file is written. """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CSVConverter(object):
+    """ Converts the rows of a CSV file to line protocol.
+
+    The first row of the file names the columns. The ``tags`` columns become
+    tags, the ``time_column`` the timestamp in the ``precision`` of the
+    write, or an RFC3339 timestamp, and all other columns become fields.
+    Without a ``measurement``, the ``name`` column holds it. Files exported
+    by InfluxDB, with ``name``, ``tags`` and ``time`` columns, are loaded as
+    is. Empty values are skipped, and quoted values can't span lines.
+    """
+
+    def __init__(self, columns, measurement=None, tags=(), time_column='time',
+                 precision='ns'):
+        index = {column: i for i, column in enumerate(columns)}
+        used = set()
+
+        def find(column):
+            try:
+                i = index[column]
+            except KeyError:
+                raise ValueError('The CSV file has no {!r} column.'.format(
+                    column))
+
+            used.add(i)
+            return i
+
+        if measurement is None and 'name' not in index:
+            raise ValueError('The CSV file has no name column, so the '
+                             'measurement should be given.')
+
+        self.measurement = (escape_measurement(measurement)
+                            if measurement is not None else None)
+        self.name_index = find('name') if measurement is None else None
+
+        self.tags_index = (find('tags')
+                           if 'tags' in index and 'tags' not in tags
+                           else None)
+        """ The index of the column holding all tags of InfluxDB exports. """
+
+        self.tag_indexes = sorted((escape_key(t), find(t)) for t in tags)
+        self.time_index = (find(time_column) if time_column in index
+                           else None)
+        self.field_indexes = [(escape_key(column), i)
+                              for i, column in enumerate(columns)
+                              if i not in used]
+        self.unit = NANOSECONDS[precision]
+        self.width = len(columns)
+
+    def convert(self, rows):
+        """ Returns the lines of the given rows. Missing values of short rows
+        are empty, and rows without fields are skipped. """
+        width = self.width
+        lines = []
+        for row in rows:
+            if len(row) < width:
+                row += [''] * (width - len(row))
+
+            line = self.line(row)
+            if line is not None:
+                lines.append(line)
+
+        return lines
+
+    def line(self, row):
+        fields = []
+        for key, i in self.field_indexes:
+            value = row[i]
+            if value:
+                fields.append(key + '=' + format_csv_value(value))
+
+        if not fields:
+            return None
+
+        line = (self.measurement if self.name_index is None
+                else escape_measurement(row[self.name_index]))
+
+        tags = [(k, row[i]) for k, i in self.tag_indexes if row[i]]
+        if self.tags_index is not None and row[self.tags_index]:
+            tags = sorted(tags + [
+                (escape_key(k), v)
+                for k, v in parse_csv_tags(row[self.tags_index]).items()
+                if v])
+
+        for key, value in tags:
+            line += ',' + key + '=' + escape_tag_value(value)
+
+        line += ' ' + ','.join(fields)
+
+        if self.time_index is not None:
+            timestamp = row[self.time_index]
+            if timestamp.lstrip('-').isdigit():
+                line += ' ' + timestamp
+            elif timestamp:
+                line += ' ' + str(parse_rfc3339(timestamp) // self.unit)
+
+        return line
+
+
+class LineProtocolReader(object):
+    """ Reads batches of a line protocol file as is. """
+
+    def __init__(self, data):
+        self.data = data
+        self.start = 0
+
+    def read(self, start, stop):
+        """ Returns the line protocol of a batch, and its amount of points.
+        """
+        # A trailing newline would leave an empty half when a rejected batch
+        # is split.
+        if self.data[stop - 1:stop] == b'\n':
+            stop -= 1
+
+        data = self.data[start:stop]
+        return data, count_lines(data)
+
+
+class CSVReader(object):
+    """ Reads batches of a CSV file, and converts them to line protocol. """
+
+    def __init__(self, data, precision='ns', **kwargs):
+        self.data = data
+
+        end = data.find(b'\n')
+        self.start = len(data) if end == -1 else end + 1
+        self.converter = CSVConverter(self.parse(0, self.start)[0],
+                                      precision=precision, **kwargs)
+
+    def parse(self, start, stop):
+        text = self.data[start:stop]
+        if six.PY3:
+            text = io.StringIO(text.decode('utf-8'), newline='')
+        else:
+            text = io.BytesIO(text)
+
+        return [row for row in csv.reader(text) if row]
+
+    def read(self, start, stop):
+        lines = self.converter.convert(self.parse(start, stop))
+        return '\n'.join(lines).encode('utf-8'), len(lines)
+
+
+class LoadStats(object):
+    """ The progress of loading a file. """
+
+    def __init__(self, path, size, offset=0):
+        self.path = path
+        """ The file that's loaded. """
+
+        self.size = size
+        """ The size of the file in bytes. """
+
+        self.offset = offset
+        """ The offset up to which the file is written. """
+
+        self.resumed_from = offset
+        """ The offset of the checkpoint the load was resumed from. """
+
+        self.points = 0
+        """ The amount of points written. """
+
+        self.batches = 0
+        """ The amount of batches written. """
+
+        self.errors = []
+        """ A ``(exception, points)`` tuple for every batch holding lines
+        that were rejected. """
+
+        self.start = time()
+        self.end = None
+
+    def __repr__(self):
+        return ('LoadStats(path={!r}, points={}, offset={}, size={}, '
+                'errors={}, points_per_second={:.0f})'.format(
+                    self.path, self.points, self.offset, self.size,
+                    len(self.errors), self.points_per_second))
+
+    @property
+    def failed_points(self):
+        """ The amount of points that were rejected. """
+        return sum(points for _, points in self.errors)
+
+    @property
+    def fraction(self):
+        """ The fraction of the file that's written. """
+        return self.offset / float(self.size) if self.size else 1.0
+
+    @property
+    def elapsed(self):
+        return (self.end or time()) - self.start
+
+    @property
+    def points_per_second(self):
+        elapsed = self.elapsed
+        return self.points / elapsed if elapsed else 0.0
+
+
+class Loader(object):
+    """ Writes line protocol or CSV files to InfluxDB.
+
+    Files are written in batches of ``batch_size`` bytes, at most
+    ``concurrency`` at once, so the connection should pool at least that many
+    connections. Every ``progress_interval`` seconds, ``progress`` is called
+    with the :class:`LoadStats`.
+
+    The checkpoint only moves past a batch once all batches before it are
+    written, so a resumed load might write a few batches again. InfluxDB
+    overwrites points with the same series and timestamp, so this is
+    harmless.
+    """
+
+    def __init__(self, connection, batch_size=DEFAULT_BATCH_SIZE,
+                 concurrency=4, retention_policy=None, progress=None,
+                 progress_interval=1.0):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.retention_policy = retention_policy
+        self.progress = progress
+        self.progress_interval = progress_interval
+
+    def load(self, path, format=None, checkpoint=None, **kwargs):
+        """ Writes a file, which is in the ``line`` or ``csv`` format. The
+        format is derived from the extension by default. The keyword
+        arguments are passed to the :class:`CSVConverter` of CSV files, and
+        ignored for line protocol.
+
+        When a ``checkpoint`` path is given, the load resumes from the offset
+        saved in it, and the checkpoint is removed once the whole file is
+        written. Returns the :class:`LoadStats`. """
+        if format is None:
+            format = 'csv' if path.lower().endswith('.csv') else 'line'
+        if format not in ('line', 'csv'):
+            raise ValueError('Invalid format provided, must be either line '
+                             'or csv.')
+
+        checkpoint = Checkpoint(checkpoint) if checkpoint is not None else None
+
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            stats = LoadStats(path, size,
+                              checkpoint.read() if checkpoint else 0)
+
+            # Empty files can't be mapped.
+            if size:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    reader = (CSVReader(data, self.connection.precision,
+                                        **kwargs)
+                              if format == 'csv' else LineProtocolReader(data))
+                    self.write_batches(reader, stats, checkpoint)
+                finally:
+                    data.close()
+
+        stats.offset = size
+        stats.end = time()
+
+        if checkpoint is not None:
+            checkpoint.remove()
+
+        return stats
+
+    def write_batches(self, reader, stats, checkpoint):
+        """ Writes the batches of a file, keeping ``concurrency`` writes in
+        flight, and completing them in order. """
+        start = max(stats.offset, reader.start)
+        batches = iter_batches(reader.data, start, stats.size,
+                               self.batch_size)
+
+        pending = deque()
+        reported = [time()]
+
+        def complete():
+            self.complete(pending.popleft(), stats, checkpoint)
+
+            if self.progress is not None and\
+                    time() - reported[0] >= self.progress_interval:
+                reported[0] = time()
+                self.progress(stats)
+
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            try:
+                for start, stop in batches:
+                    data, points = reader.read(start, stop)
+                    future = (executor.submit(self.connection.write_lines,
+                                              data, self.retention_policy)
+                              if points else None)
+                    pending.append((future, stop, points))
+
+                    # Reading ahead keeps the workers busy, while it holds
+                    # only a bounded amount of batches in memory.
+                    while len(pending) >= 2 * self.concurrency:
+                        complete()
+
+                while pending:
+                    complete()
+            finally:
+                for future, _, _ in pending:
+                    if future is not None:
+                        future.cancel()
+
+    def complete(self, batch, stats, checkpoint):
+        """ Waits for the write of a batch, and moves the checkpoint past
+        it. Rejected lines are recorded, other errors stop the load. """
+        future, stop, points = batch
+
+        if future is not None:
+            try:
+                future.result()
+                stats.points += points
+            except PartialWriteException as e:
+                failed = sum(count_lines(lines) for lines, _ in e.failures)
+                stats.points += points - failed
+                stats.errors.append((e, failed))
+
+        stats.batches += 1
+        stats.offset = stop
+
+        if checkpoint is not None:
+            checkpoint.save(stop)
@@ -1,41 +1,37 @@
-import six
+import numbers
 
-from functools import partial
+from collections import namedtuple
 from datetime import datetime
 
-from .utils import to_comma_separated_string, escape
+from .serializer import format_fields, serialize, series_key
+
+try:
+    from time import time_ns
+except ImportError:
+    from time import time
+
+    def time_ns():
+        return int(time() * 10**9)
 
 try:
     from datetime import timezone
 except:
     import pytz as timezone
 
-__all__ = ['Measurement']
+__all__ = ['Measurement', 'Point', 'to_point']
 
 EPOCH = datetime(1970, 1, 1).replace(tzinfo=timezone.utc)
 
-PRECISION_MULTIPLIERS = {
-    'ns': 10**9,
-    'u': 1000000.0,
-    'ms': 1000.0,
-    's': 1.0,
-    'm': 0.017,
-    'h': 0.000278
+# The amount of nanoseconds in a single unit of every precision.
+NANOSECONDS = {
+    'ns': 1,
+    'u': 10**3,
+    'ms': 10**6,
+    's': 10**9,
+    'm': 60 * 10**9,
+    'h': 3600 * 10**9
 }
 
-escape_tags = partial(escape, [',', '=', ' '])
-escape_measurements = partial(escape, [',', ' '])
-escape_string_values = partial(escape, ['"'])
-
-
-def to_line_value(value):
-    """ Adds quotes and escapes the value if it is a string. If the value is
-    not a string, it is returned verbatim. """
-    if isinstance(value, six.string_types):
-        return '"{}"'.format(escape_string_values(value))
-
-    return value
-
 
 def to_timestamp(timestamp):
     """ Converts a datetime object to timestamp. Needed for py3 and py2 cross
@@ -48,37 +44,93 @@ def to_timestamp(timestamp):
         return (timestamp - EPOCH).total_seconds()
 
 
-class Measurement:
-    """ A measurement that can be written (by the client) to InfluxDB. """
+def datetime_to_nanoseconds(timestamp):
+    """ Converts a datetime to integer nanoseconds since the epoch, without
+    the rounding errors of float seconds. """
+    seconds = to_timestamp(timestamp.replace(microsecond=0))
+    return int(seconds) * 10**9 + timestamp.microsecond * 1000
+
+
+def to_nanoseconds(timestamp, epoch='s'):
+    """ Converts a timestamp to integer nanoseconds since the epoch. Numbers
+    are in the ``epoch`` precision, other timestamps should be datetimes. """
+    if not isinstance(timestamp, numbers.Real):
+        return datetime_to_nanoseconds(timestamp)
+
+    try:
+        unit = NANOSECONDS[epoch]
+    except KeyError:
+        raise ValueError('Invalid timestamp unit provided, must be one of h, '
+                         'm, s, ms, u or ns.')
+
+    if isinstance(timestamp, numbers.Integral):
+        return int(timestamp) * unit
+
+    return int(round(timestamp * unit))
+
+
+class Measurement(object):
+    """ A measurement that can be written (by the client) to InfluxDB.
 
-    def __init__(self, name, timestamp=None, tags=None, **values):
+    The timestamp is either a datetime, or a number in the
+    ``timestamp_unit`` precision, seconds by default. It defaults to the
+    current time.
+    """
+
+    __slots__ = ['name', 'values', 'tags', 'timestamp']
+
+    def __init__(self, name, timestamp=None, tags=None, timestamp_unit='s',
+                 **values):
         self.name = name
         self.values = values
         self.tags = tags
 
         if timestamp is None:
-            self.timestamp = datetime.now(tz=timezone.utc)
-        elif isinstance(timestamp, six.integer_types):
-            self.timestamp = datetime.fromtimestamp(timestamp, timezone.utc)
+            self.timestamp = time_ns()
         else:
-            self.timestamp = timestamp
+            self.timestamp = to_nanoseconds(timestamp, timestamp_unit)
+        """ The timestamp, in nanoseconds since the epoch. """
+
+    def get_timestamp(self, precision='s'):
+        """ Returns the timestamp as an integer in the given precision. """
+        return self.timestamp // NANOSECONDS[precision]
 
     def to_line(self, precision='s'):
-        tags = None
-        if self.tags is not None:
-            tags = sorted([(escape_tags(k), escape_tags(v))
-                           for k, v in self.tags.items()])
-
-        values = [(escape_tags(k), to_line_value(v))
-                  for k, v in self.values.items()]
-
-        multiplier = PRECISION_MULTIPLIERS[precision]
-
-        return '{name}{tags} {values} {timestamp}'.format(
-            name=escape_measurements(self.name),
-            tags=(',' + to_comma_separated_string(tags)
-                  if tags is not None
-                  else ''),
-            values=to_comma_separated_string(values),
-            timestamp=int(to_timestamp(self.timestamp) * multiplier)
-        )
+        return serialize(self, precision)
+
+    def to_point(self):
+        """ Returns the measurement as a compact :class:`Point`. """
+        return Point(series_key(self), format_fields(self.values),
+                     self.timestamp)
+
+
+class Point(namedtuple('Point', ['key', 'fields', 'timestamp'])):
+    """ A measurement that is already serialized, apart from its timestamp.
+
+    ``key`` holds the escaped measurement name and tags, which is shared by
+    all points of the same series, ``fields`` the field set of the line, and
+    ``timestamp`` the timestamp in nanoseconds. A point takes far less memory
+    than a :class:`Measurement` and its dicts, so sessions buffer points.
+    """
+
+    __slots__ = ()
+
+    def get_timestamp(self, precision='s'):
+        """ Returns the timestamp as an integer in the given precision. """
+        return self.timestamp // NANOSECONDS[precision]
+
+    def append_line(self, parts, precision='s'):
+        parts.append(self.to_line(precision))
+
+    def to_line(self, precision='s'):
+        timestamp = self.timestamp // NANOSECONDS[precision]
+        return self.key + self.fields + ' ' + str(timestamp)
+
+
+def to_point(measurement):
+    """ Converts a measurement to a :class:`Point`. Points, including those of
+    a :class:`~inflow.SeriesTemplate`, are returned as is. """
+    if isinstance(measurement, tuple):
+        return measurement
+
+    return measurement.to_point()
@@ -0,0 +1,343 @@
+""" Writing from multiple processes.
+
+Serializing line protocol is CPU-bound, and a single Python process can't
+use more than one core for it. A :class:`ProcessPoolWriter` spreads the work
+over worker processes, which serialize their chunks and write them to
+InfluxDB using their own pooled connections.
+
+Chunks are pickled to send them to a worker, which takes longer for
+measurement objects than serializing them. So measurements are packed into
+rows of values per series first, and columns are sent as they are. Fastest
+of all is letting the workers produce the measurements themselves, using
+:meth:`ProcessPoolWriter.map`.
+"""
+import uuid
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import cpu_count
+from time import time
+
+from .columns import column_lines, is_column
+from .connection import Connection
+from .measurement import Measurement
+from .template import SeriesTemplate, TemplatePoint
+from .write import WriteMixin
+
+__all__ = ['ProcessPoolWriter', 'WriteStats']
+
+# The connections of a worker process, by the key of the writer they belong
+# to, so every worker sets up its connection pool only once.
+_connections = {}
+
+
+def get_connection(key, uri, settings):
+    """ Returns the connection of a worker process, creating it when
+    needed. """
+    try:
+        return _connections[key]
+    except KeyError:
+        connection = _connections[key] = Connection(uri, **settings)
+        return connection
+
+
+def pack_chunk(measurements):
+    """ Packs a chunk of measurements into a list of ``(name, tags, keys,
+    timestamps, rows)`` tuples, one for every run of measurements of the
+    same series and field keys, and a list of all other points. These pickle
+    many times faster than the measurement objects. """
+    series = []
+    others = []
+    name = tags = keys = timestamps = rows = None
+
+    for m in measurements:
+        if type(m) is Measurement:
+            values = m.values
+            m_name, m_tags, m_keys = m.name, m.tags, list(values)
+            row = list(values.values())
+        elif type(m) is TemplatePoint:
+            template = m.template
+            m_name, m_tags, m_keys = (template.name, template.tags,
+                                      template.field_keys)
+            row = m.values
+        else:
+            others.append(m)
+            continue
+
+        if m_name != name or (m_tags is not tags and m_tags != tags) or\
+                m_keys != keys:
+            name, tags, keys = m_name, m_tags, m_keys
+            timestamps = []
+            rows = []
+            series.append((name, tags, keys, timestamps, rows))
+
+        timestamps.append(m.timestamp)
+        rows.append(row)
+
+    return series, others
+
+
+def unpack_chunk(series, others):
+    """ Turns a packed chunk back into points. """
+    points = []
+    for name, tags, keys, timestamps, rows in series:
+        template = SeriesTemplate(name, tags, keys)
+        points.extend(TemplatePoint(template, row, timestamp)
+                      for row, timestamp in zip(rows, timestamps))
+
+    return points + others
+
+
+def write_chunk(key, uri, settings, series, others, retention_policy):
+    """ Serializes and writes a packed chunk of measurements, in a worker
+    process. Returns the amount of points and bytes written, the time spent
+    serializing and writing them, and the exception of a failed write. """
+    connection = get_connection(key, uri, settings)
+
+    start = time()
+    points = unpack_chunk(series, others)
+    data = connection.serialize(points)
+    serialized = time()
+
+    return post_chunk(connection, data, len(points), retention_policy,
+                      start, serialized)
+
+
+def write_generated(key, uri, settings, func, item, retention_policy):
+    """ Calls ``func(item)``, and serializes and writes the measurements it
+    returns, in a worker process. """
+    connection = get_connection(key, uri, settings)
+
+    start = time()
+    measurements = list(func(item))
+    data = connection.serialize(measurements)
+    serialized = time()
+
+    return post_chunk(connection, data, len(measurements), retention_policy,
+                      start, serialized)
+
+
+def write_column_chunk(key, uri, settings, name, timestamps, tags, fields,
+                       epoch, retention_policy):
+    """ Serializes and writes a chunk of columns, in a worker process. """
+    connection = get_connection(key, uri, settings)
+
+    start = time()
+    data = '\n'.join(column_lines(name, timestamps, tags, fields,
+                                  connection.precision, epoch,
+                                  len(timestamps)))
+    serialized = time()
+
+    return post_chunk(connection, data, data.count('\n') + 1 if data else 0,
+                      retention_policy, start, serialized)
+
+
+def post_chunk(connection, data, points, retention_policy, start, serialized):
+    error = None
+    if points:
+        try:
+            connection.write_lines(data, retention_policy)
+        except Exception as e:
+            error = e
+
+    return points, len(data), serialized - start, time() - serialized, error
+
+
+class WriteStats(object):
+    """ The aggregate results of the writes of a :class:`ProcessPoolWriter`.
+
+    The serialization and network times are summed over all workers, so they
+    exceed the elapsed time when workers run in parallel.
+    """
+
+    def __init__(self):
+        self.points = 0
+        """ The amount of points written successfully. """
+
+        self.bytes = 0
+        """ The amount of bytes of line protocol written successfully. """
+
+        self.chunks = 0
+        """ The amount of chunks handled. """
+
+        self.serialize_time = 0.0
+        """ The seconds spent serializing. """
+
+        self.network_time = 0.0
+        """ The seconds spent writing to InfluxDB. """
+
+        self.errors = []
+        """ A ``(exception, points)`` tuple for every chunk that failed. """
+
+        self.start = None
+        self.end = None
+
+    def __repr__(self):
+        return ('WriteStats(points={}, bytes={}, errors={}, '
+                'points_per_second={:.0f})'.format(
+                    self.points, self.bytes, len(self.errors),
+                    self.points_per_second))
+
+    @property
+    def failed_points(self):
+        """ The amount of points that couldn't be written. """
+        return sum(points for _, points in self.errors)
+
+    @property
+    def elapsed(self):
+        """ The seconds between the first write and the last completed
+        chunk. """
+        if self.start is None:
+            return 0.0
+
+        return (self.end or time()) - self.start
+
+    @property
+    def points_per_second(self):
+        elapsed = self.elapsed
+        return self.points / elapsed if elapsed else 0.0
+
+    def add(self, result):
+        points, size, serialize_time, network_time, error = result
+
+        self.chunks += 1
+        self.serialize_time += serialize_time
+        self.network_time += network_time
+        self.end = time()
+
+        if error is not None:
+            self.errors.append((error, points))
+        else:
+            self.points += points
+            self.bytes += size
+
+
+class ProcessPoolWriter(WriteMixin):
+    """ Serializes and writes measurements using a pool of worker processes.
+
+    Writes are split into chunks of ``chunk_size`` points, which are handed
+    to ``processes`` workers (the amount of CPUs by default). Every worker
+    serializes its chunks and writes them to InfluxDB using its own
+    :class:`~inflow.Connection`, created with the given ``uri`` and any
+    other keyword arguments. At most ``max_pending`` chunks are waiting at
+    once, writing more blocks until a chunk is done.
+
+    Packing measurements still takes time in this process, so with many
+    workers it limits the throughput. Use :meth:`map` to let the workers
+    produce the measurements instead.
+
+    Errors aren't raised, but collected in :attr:`stats`, together with the
+    throughput of all workers.
+    """
+
+    def __init__(self, uri, processes=None, chunk_size=5000, max_pending=None,
+                 retention_policy=None, **kwargs):
+        # Every worker would append to and replay the same directory.
+        if kwargs.get('spool') is not None:
+            raise ValueError('A process pool writer doesn\'t support '
+                             'spooling.')
+
+        # Fail early on invalid settings, instead of in every worker.
+        Connection(uri, **kwargs).close()
+
+        self.uri = uri
+        self.settings = kwargs
+        self.key = uuid.uuid4().hex
+
+        self.chunk_size = chunk_size
+        """ The maximum amount of points handed to a worker at once. """
+
+        self.retention_policy = retention_policy
+        """ The retention policy this writer should write to. """
+
+        self.processes = processes or cpu_count()
+        """ The amount of worker processes. """
+
+        self.max_pending = max_pending or 2 * self.processes
+        """ The maximum amount of chunks waiting to be written. """
+
+        self.executor = ProcessPoolExecutor(self.processes)
+        self.pending = deque()
+
+        self.stats = WriteStats()
+        """ The :class:`WriteStats` of all chunks written so far. """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write_func(self, measurement, retention_policy=None):
+        measurements = (measurement if type(measurement) is list
+                        else [measurement])
+        self.write_iter(measurements, retention_policy)
+
+    def write_iter(self, measurements, retention_policy=None):
+        """ Writes an iterable of measurements, like a generator, in
+        chunks. """
+        retention_policy = retention_policy or self.retention_policy
+        iterator = iter(measurements)
+
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+
+            series, others = pack_chunk(chunk)
+            self.submit(write_chunk, series, others, retention_policy)
+
+    def map(self, func, items, retention_policy=None):
+        """ Calls ``func(item)`` in the workers for every item, and writes
+        the measurements it returns as a single chunk. ``func`` should be a
+        module level function, like one reading a file or a time range, so
+        only the items are sent to the workers. """
+        retention_policy = retention_policy or self.retention_policy
+
+        for item in items:
+            self.submit(write_generated, func, item, retention_policy)
+
+    def write_columns(self, name, timestamps, tags=None, retention_policy=None,
+                      epoch=None, **fields):
+        """ Writes columns of values in chunks, see
+        :meth:`Client.write_columns <inflow.Client.write_columns>`. """
+        tags = tags or {}
+        retention_policy = retention_policy or self.retention_policy
+
+        for start in range(0, len(timestamps), self.chunk_size):
+            end = start + self.chunk_size
+            self.submit(
+                write_column_chunk, name, timestamps[start:end],
+                {k: v[start:end] if is_column(v) else v
+                 for k, v in tags.items()},
+                {k: v[start:end] for k, v in fields.items()},
+                epoch, retention_policy
+            )
+
+    def submit(self, func, *args):
+        """ Hands a chunk to a worker, waiting for the oldest pending chunk
+        when too many are pending. """
+        if self.stats.start is None:
+            self.stats.start = time()
+
+        while len(self.pending) >= self.max_pending:
+            self.stats.add(self.pending.popleft().result())
+
+        self.pending.append(self.executor.submit(
+            func, self.key, self.uri, self.settings, *args))
+
+    def flush(self):
+        """ Waits until all chunks are written, and returns the
+        :class:`WriteStats`. """
+        while self.pending:
+            self.stats.add(self.pending.popleft().result())
+
+        return self.stats
+
+    commit = flush
+
+    def close(self):
+        """ Waits until all chunks are written, and stops the workers. """
+        self.flush()
+        self.executor.shutdown()
@@ -0,0 +1,105 @@
+""" Querying long time ranges in windows.
+
+A query over a long time range runs as a single request, which InfluxDB
+answers using a single core, and returns in one huge response. Splitting the
+range into windows lets InfluxDB work on several of them at once, and keeps
+every response small.
+"""
+from array import array
+from datetime import timedelta
+
+from .measurement import NANOSECONDS, to_nanoseconds
+from .series import Series
+
+__all__ = ['split_range', 'window_queries', 'merge_series']
+
+# The default window of a range query.
+DAY = timedelta(days=1)
+
+
+def to_duration(window):
+    """ Converts a timedelta, or a number of seconds, to nanoseconds. """
+    if isinstance(window, timedelta):
+        seconds = window.days * 86400 + window.seconds
+        return seconds * NANOSECONDS['s'] + window.microseconds * 1000
+
+    return to_nanoseconds(window)
+
+
+def split_range(start, end, window=DAY, epoch='s'):
+    """ Splits the time range from ``start`` up to ``end`` into windows of at
+    most ``window``, which is a timedelta or a number of seconds. Returns the
+    start and end of every window in nanoseconds since the epoch. Numeric
+    ``start`` and ``end`` timestamps are in the ``epoch`` precision. """
+    start = to_nanoseconds(start, epoch)
+    end = to_nanoseconds(end, epoch)
+    step = to_duration(window)
+
+    if step <= 0:
+        raise ValueError('The window should be longer than 0 seconds.')
+
+    return [(s, min(s + step, end)) for s in range(start, end, step)]
+
+
+def window_queries(template, start, end, window=DAY, epoch='s'):
+    """ Returns the query of every window of a range. The ``{start}`` and
+    ``{end}`` placeholders of the template are replaced by the bounds of the
+    window, as nanosecond timestamps. """
+    return [template.format(start=s, end=e)
+            for s, e in split_range(start, end, window, epoch)]
+
+
+def group_key(tags):
+    """ Returns a hashable key for the tags of a group. """
+    return tuple(sorted(tags.items())) if tags else ()
+
+
+def merge_series(series):
+    """ Merges the series of consecutive windows into one series per name
+    and group (for queries using ``GROUP BY``), in the order they were first
+    seen. Series are dicts or :class:`~inflow.Series`. The given series
+    aren't modified, as they might be cached. """
+    indexes = {}
+    copied = set()
+    retval = []
+
+    for s in series:
+        is_series = isinstance(s, Series)
+        if is_series:
+            key = (s.name, group_key(s.tags), tuple(s.columns))
+        else:
+            key = (s['name'], group_key(s.get('tags')))
+
+        i = indexes.get(key)
+        if i is None:
+            indexes[key] = len(retval)
+            retval.append(s)
+            continue
+
+        if i not in copied:
+            copied.add(i)
+            first = retval[i]
+            retval[i] = (Series(first.name, first.columns,
+                                data=[c[:] for c in first.data],
+                                tags=first.tags)
+                         if is_series else
+                         dict(first, values=list(first['values'])))
+
+        if is_series:
+            extend_columns(retval[i], s)
+        else:
+            retval[i]['values'].extend(s['values'])
+
+    return retval
+
+
+def extend_columns(series, other):
+    """ Appends the rows of another series with the same columns. """
+    for i, values in enumerate(other.data):
+        column = series.data[i]
+
+        # An array of floats can't hold the other values of a column.
+        if isinstance(column, array) and not isinstance(values, array):
+            column = series.data[i] = list(column)
+
+        column.extend(values)
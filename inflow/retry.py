@@ -0,0 +1,179 @@
+""" Retrying failed writes, and splitting batches InfluxDB rejects. """
+import random
+import sys
+import time
+
+import six
+
+__all__ = ['RetryPolicy', 'is_transient_error', 'parse_retry_after',
+           'split_lines']
+
+# Status codes of writes that may succeed when they are sent again.
+TRANSIENT_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# Status codes of writes that are rejected because of (part of) their data.
+SPLIT_STATUS_CODES = [400, 413]
+
+
+def is_transient_error(error):
+    """ Returns whether a write failed because of a problem that might go away
+    by itself, like a network error or an overloaded server. Writes failing
+    because of their data, or because of missing permissions, will keep
+    failing. """
+    # Network errors are raised by requests, which is only imported once a
+    # connection is used.
+    requests = sys.modules.get('requests')
+    if requests is not None and isinstance(error, requests.RequestException):
+        return True
+
+    # The same goes for aiohttp and asyncio, used by the async connection.
+    aiohttp = sys.modules.get('aiohttp')
+    if aiohttp is not None and isinstance(error, aiohttp.ClientError):
+        return True
+
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is not None and isinstance(error, asyncio.TimeoutError):
+        return True
+
+    return getattr(error, 'status_code', None) in TRANSIENT_STATUS_CODES
+
+
+def parse_retry_after(value):
+    """ Parses the value of a ``Retry-After`` header, which is either an
+    amount of seconds or a date, to the amount of seconds to wait. """
+    if not isinstance(value, six.string_types):
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    # Importing email.utils takes long, and dates are rarely used.
+    from email.utils import mktime_tz, parsedate_tz
+
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+
+    return max(0.0, mktime_tz(date) - time.time())
+
+
+def split_lines(data):
+    """ Splits line protocol in two halves, at the line boundary closest to
+    its middle. Returns None when it holds a single line. """
+    newline = b'\n' if isinstance(data, (bytes, bytearray)) else '\n'
+    middle = len(data) // 2
+
+    i = data.find(newline, middle)
+    if i == -1:
+        i = data.rfind(newline, 0, middle)
+    if i == -1:
+        return None
+
+    return data[:i], data[i + 1:]
+
+
+class RetryPolicy(object):
+    """ Decides when, and how often, a failed write is sent again.
+
+    Writes failing because of a network error, a timeout or a server error are
+    retried at most ``retries`` times. The delay before every retry grows
+    exponentially from ``backoff`` seconds up to ``max_backoff`` seconds, and
+    is picked at random between zero and that limit when ``jitter`` is
+    enabled, so clients that failed together don't retry together. A delay
+    requested by InfluxDB (or a proxy in front of it) using a ``Retry-After``
+    header takes precedence, up to ``max_backoff`` seconds.
+
+    With ``split_batches`` enabled, batches rejected as invalid (400) or too
+    large (413) are split in two, and both halves are written separately,
+    until the lines that fail by themselves are found.
+    """
+
+    def __init__(self, retries=3, backoff=0.1, max_backoff=10.0, jitter=True,
+                 split_batches=True):
+        self.retries = retries
+        """ The maximum amount of retries of a single request. """
+
+        self.backoff = backoff
+        """ The delay in seconds before the first retry. """
+
+        self.max_backoff = max_backoff
+        """ The maximum delay in seconds before a retry. """
+
+        self.jitter = jitter
+        """ Whether to randomize the delays. """
+
+        self.split_batches = split_batches
+        """ Whether to split batches that are rejected. """
+
+    def get_delay(self, attempt, error, transient=None):
+        """ Returns the amount of seconds to wait before retrying a request
+        that failed ``attempt + 1`` times with the given error, or None when it
+        shouldn't be retried. Pass ``transient`` to override whether the error
+        is transient. """
+        if transient is None:
+            transient = is_transient_error(error)
+
+        if attempt >= self.retries or not transient:
+            return None
+
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            return min(self.max_backoff, retry_after)
+
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def should_split(self, error):
+        """ Returns whether a batch that failed with the given error should be
+        split. """
+        return self.split_batches and\
+            getattr(error, 'status_code', None) in SPLIT_STATUS_CODES
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def attempts(self, on_retry=None):
+        """ Returns the :class:`Attempts` of a single request. """
+        return Attempts(self, on_retry)
+
+    def call(self, func, args=(), on_retry=None):
+        """ Calls ``func(*args)``, retrying it while it fails with transient
+        errors. ``on_retry`` is called with the attempt, delay and error
+        before every retry. """
+        attempts = self.attempts(on_retry)
+        while True:
+            try:
+                return func(*args)
+            except Exception as e:
+                delay = attempts.failed(e)
+
+            self.sleep(delay)
+
+
+class Attempts(object):
+    """ Keeps track of the attempts of a single request, for callers that
+    can't use :meth:`RetryPolicy.call`, like the async connection, which
+    has to wait without blocking. """
+
+    def __init__(self, policy, on_retry=None):
+        self.policy = policy
+        self.on_retry = on_retry
+
+        self.attempt = 0
+        """ The amount of retries so far. """
+
+    def failed(self, error):
+        """ Returns the amount of seconds to wait before retrying after the
+        given error. Must be called while handling it, as the error is raised
+        again when the request shouldn't be retried. """
+        delay = self.policy.get_delay(self.attempt, error)
+        if delay is None:
+            raise
+
+        if self.on_retry is not None:
+            self.on_retry(self.attempt + 1, delay, error)
+
+        self.attempt += 1
+        return delay
@@ -0,0 +1,171 @@
+""" Serializes measurements to InfluxDB line protocol.
+
+Escaping is done using translate tables, and is skipped altogether for strings
+without special characters. Escaped measurement names and tag and field keys
+are cached, as these are repeated for every point of a series.
+"""
+import six
+
+__all__ = ['serialize', 'serialize_batch', 'series_key', 'format_fields',
+           'escape_measurement', 'escape_key', 'escape_tag_value',
+           'format_value']
+
+# Caches are cleared when they grow beyond this amount of entries, which keeps
+# memory bounded when keys are generated dynamically.
+MAX_CACHE_SIZE = 10000
+
+MEASUREMENT_ESCAPES = {ord(','): u'\\,', ord(' '): u'\\ '}
+KEY_ESCAPES = {ord(','): u'\\,', ord('='): u'\\=', ord(' '): u'\\ '}
+STRING_ESCAPES = {ord('"'): u'\\"'}
+
+_measurement_cache = {}
+_key_cache = {}
+_series_cache = {}
+
+
+def translate(string, table):
+    """ Replaces characters in the string using the given translate table. """
+    try:
+        return string.translate(table)
+
+    # Python 2 byte strings don't accept a dict as translate table.
+    except TypeError:
+        for char, replacement in table.items():
+            string = string.replace(chr(char), str(replacement))
+        return string
+
+
+def escape_measurement(name):
+    """ Escapes a measurement name, caching the result. """
+    try:
+        return _measurement_cache[name]
+    except KeyError:
+        pass
+
+    escaped = name
+    if isinstance(name, six.string_types):
+        if ',' in name or ' ' in name:
+            escaped = translate(name, MEASUREMENT_ESCAPES)
+    else:
+        escaped = str(name)
+
+    if len(_measurement_cache) >= MAX_CACHE_SIZE:
+        _measurement_cache.clear()
+    _measurement_cache[name] = escaped
+
+    return escaped
+
+
+def escape_key(key):
+    """ Escapes a tag or field key, caching the result. """
+    try:
+        return _key_cache[key]
+    except KeyError:
+        pass
+
+    escaped = escape_tag_value(key)
+
+    if len(_key_cache) >= MAX_CACHE_SIZE:
+        _key_cache.clear()
+    _key_cache[key] = escaped
+
+    return escaped
+
+
+def escape_tag_value(value):
+    """ Escapes a tag value. Non-string values are converted to strings. """
+    if not isinstance(value, six.string_types):
+        return str(value)
+
+    if ',' in value or '=' in value or ' ' in value:
+        return translate(value, KEY_ESCAPES)
+
+    return value
+
+
+def format_value(value):
+    """ Formats a field value. Strings are quoted and escaped, other values
+    are written verbatim. """
+    if isinstance(value, six.string_types):
+        if '"' in value:
+            value = translate(value, STRING_ESCAPES)
+        return '"' + value + '"'
+
+    return str(value)
+
+
+def series_key(measurement):
+    """ Returns the escaped measurement name and sorted tags of a measurement,
+    which identify the series it belongs to. Equal keys are shared, so points
+    of the same series hold a single copy of their key. """
+    if isinstance(measurement, tuple):
+        return measurement.key
+
+    key = escape_measurement(measurement.name)
+
+    tags = measurement.tags
+    if tags:
+        for k, v in sorted([(escape_key(k), v) for k, v in tags.items()]):
+            key += ',' + k + '=' + escape_tag_value(v)
+
+    try:
+        return _series_cache[key]
+    except KeyError:
+        pass
+
+    if len(_series_cache) >= MAX_CACHE_SIZE:
+        _series_cache.clear()
+    _series_cache[key] = key
+
+    return key
+
+
+def format_fields(values):
+    """ Formats a dict of field values to the field set of a line, including
+    the leading space. """
+    return ' ' + ','.join([escape_key(k) + '=' + format_value(v)
+                           for k, v in values.items()])
+
+
+def append_line(parts, measurement, precision):
+    """ Appends the line protocol fragments of a measurement to ``parts``. """
+    if isinstance(measurement, tuple):
+        # Points and the points of a SeriesTemplate render themselves.
+        return measurement.append_line(parts, precision)
+
+    parts.append(escape_measurement(measurement.name))
+
+    tags = measurement.tags
+    if tags:
+        for key, value in sorted([(escape_key(k), v)
+                                  for k, v in tags.items()]):
+            parts.append(',' + key + '=' + escape_tag_value(value))
+
+    separator = ' '
+    for key, value in measurement.values.items():
+        parts.append(separator + escape_key(key) + '=' + format_value(value))
+        separator = ','
+
+    parts.append(' ' + str(measurement.get_timestamp(precision)))
+
+
+def serialize(measurement, precision='s'):
+    """ Serializes a single measurement or point to a line of line
+    protocol. """
+    parts = []
+    append_line(parts, measurement, precision)
+    return ''.join(parts)
+
+
+def serialize_batch(measurements, precision='s'):
+    """ Serializes a list of measurements into a single string, one line per
+    measurement. """
+    parts = []
+    for measurement in measurements:
+        append_line(parts, measurement, precision)
+        parts.append('\n')
+
+    if parts:
+        parts.pop()
+
+    return ''.join(parts)
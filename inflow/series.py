@@ -0,0 +1,76 @@
+from array import array
+
+__all__ = ['Series']
+
+
+def to_column(values):
+    """ Stores a column of values compactly. Columns holding only floats are
+    stored in an ``array('d')``, which takes 8 bytes per value instead of a
+    float object and a reference to it. Other columns are kept as a list. """
+    if values and all(type(v) is float for v in values):
+        return array('d', values)
+
+    return list(values)
+
+
+class Series(object):
+    """ A series of query results, stored per column instead of per row.
+
+    The column names are stored only once, and every column is stored as a
+    list of values (or an array of floats). Rows are only built on demand,
+    when iterating over the series or calling :meth:`row`.
+    """
+
+    __slots__ = ['name', 'columns', 'data', 'tags']
+
+    def __init__(self, name, columns, rows=None, data=None, tags=None):
+        self.name = name
+        """ The name of the measurement. """
+
+        self.tags = tags
+        """ The tags of the group, for queries using ``GROUP BY``, or None.
+        """
+
+        self.columns = columns
+        """ The names of the columns, in order. """
+
+        if data is None:
+            data = [to_column(c) for c in zip(*rows)] if rows else\
+                [[] for _ in columns]
+
+        self.data = data
+        """ A list of values for every column, in the order of ``columns``. """
+
+    def __len__(self):
+        return len(self.data[0]) if self.data else 0
+
+    def __getitem__(self, column):
+        """ Returns all values of the given column. """
+        try:
+            return self.data[self.columns.index(column)]
+        except ValueError:
+            raise KeyError(column)
+
+    def __iter__(self):
+        columns = self.columns
+        for values in zip(*self.data):
+            yield dict(zip(columns, values))
+
+    def __repr__(self):
+        if self.tags:
+            return 'Series(name={!r}, tags={!r}, columns={!r}, rows={})'\
+                .format(self.name, self.tags, self.columns, len(self))
+
+        return 'Series(name={!r}, columns={!r}, rows={})'.format(
+            self.name, self.columns, len(self))
+
+    def row(self, index):
+        """ Returns a single row as a dict. """
+        return {c: values[index] for c, values in zip(self.columns, self.data)}
+
+    def to_dict(self):
+        """ Returns the series in the default query result format. """
+        if self.tags is not None:
+            return dict(name=self.name, tags=self.tags, values=list(self))
+
+        return dict(name=self.name, values=list(self))
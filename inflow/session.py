@@ -1,10 +1,22 @@
+from .exceptions import PartialWriteException
+from .measurement import to_point
+from .serializer import serialize
 from .write import WriteMixin
 
 __all__ = ['Session']
 
 
 class Session(WriteMixin):
-    def __init__(self, connection, autocommit_every=None, retention_policy=None):
+    """ Accumulates measurements, and writes them all at once on commit.
+
+    In ``incremental`` mode, every measurement is serialized as soon as it's
+    written, into a growing buffer of line protocol. Committing then hands the
+    buffer over to the HTTP request as is, instead of serializing all
+    measurements at once. Setting ``autocommit_bytes`` enables this mode.
+    """
+
+    def __init__(self, connection, autocommit_every=None, retention_policy=None,
+                 autocommit_bytes=None, incremental=False):
         self.connection = connection
         """ The connection where the measurements will be written to. """
 
@@ -16,8 +28,24 @@ class Session(WriteMixin):
         """ The retention policy this session should write to. Overrides the
         connection's retention policy. """
 
+        self.autocommit_bytes = autocommit_bytes
+        """ When set to a number, this session will autocommit whenever its
+        buffer holds at least this amount of bytes. """
+
+        self.incremental = incremental or autocommit_bytes is not None
+        """ Whether measurements are serialized as soon as they're written. """
+
         self.measurements = []
-        """ Contains all uncommitted measurements. """
+        """ Contains all uncommitted measurements, as compact
+        :class:`~inflow.measurement.Point` tuples. Always empty in incremental
+        mode. """
+
+        self.buffer = bytearray()
+        """ The line protocol of all uncommitted measurements, in incremental
+        mode. """
+
+        self.count = 0
+        """ The amount of measurements in the buffer. """
 
     def __enter__(self, *args, **kwargs):
         return self
@@ -26,17 +54,68 @@ class Session(WriteMixin):
         self.commit()
 
     def write_func(self, measurement, **kwargs):
+        if self.incremental:
+            return self.append(measurement)
+
         if type(measurement) is list:
-            self.measurements.extend(measurement)
+            self.measurements.extend([to_point(m) for m in measurement])
         else:
-            self.measurements.append(measurement)
+            self.measurements.append(to_point(measurement))
 
         if self.autocommit_every is not None:
             if len(self.measurements) >= self.autocommit_every:
                 self.commit()
 
+    def append(self, measurement):
+        """ Serializes measurements into the buffer. """
+        measurements = (measurement if type(measurement) is list
+                        else [measurement])
+        precision = self.connection.precision
+        buffer = self.buffer
+
+        for m in measurements:
+            line = serialize(m, precision).encode('utf-8')
+            if buffer:
+                buffer += b'\n'
+            buffer += line
+
+        self.count += len(measurements)
+
+        if self.autocommit_every is not None and\
+                self.count >= self.autocommit_every:
+            self.commit()
+        elif self.autocommit_bytes is not None and\
+                len(buffer) >= self.autocommit_bytes:
+            self.commit()
+
     def commit(self):
         """ Write out all cached measurements at once. """
-        self.connection.write(self.measurements,
-                              retention_policy=self.retention_policy)
+        if self.incremental:
+            return self.commit_buffer()
+
+        try:
+            self.connection.write(self.measurements,
+                                  retention_policy=self.retention_policy)
+        except PartialWriteException:
+            # All other measurements were written, and writing the rejected
+            # ones again would fail again.
+            self.measurements = []
+            raise
+
         self.measurements = []
+
+    def commit_buffer(self):
+        """ Writes the buffer, without copying it, and starts a new one. """
+        if not self.buffer:
+            return
+
+        try:
+            self.connection.write_lines(self.buffer,
+                                        retention_policy=self.retention_policy)
+        except PartialWriteException:
+            self.buffer = bytearray()
+            self.count = 0
+            raise
+
+        self.buffer = bytearray()
+        self.count = 0
@@ -0,0 +1,154 @@
+import hashlib
+
+from bisect import bisect, insort
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .connection import Connection
+from .exceptions import ShardedWriteException
+from .serializer import series_key
+from .session import Session
+from .write import WriteMixin
+
+__all__ = ['ShardedClient', 'ShardedConnection', 'HashRing']
+
+
+def hash_key(key):
+    """ Hashes a string to an integer, which is stable between processes. """
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """ A consistent hash ring, which maps keys to nodes.
+
+    Every node is put on the ring ``replicas`` times. A key belongs to the
+    first node following the key's hash on the ring. When a node is added, it
+    only takes over the keys that now hash closest to it, so about
+    ``1 / len(nodes)`` of all keys move.
+    """
+
+    def __init__(self, nodes=None, replicas=100):
+        self.replicas = replicas
+        self.hashes = []
+        self.nodes = {}
+
+        for node in nodes or []:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            h = hash_key('{}-{}'.format(node, i))
+            self.nodes[h] = node
+            insort(self.hashes, h)
+
+    def remove(self, node):
+        for i in range(self.replicas):
+            h = hash_key('{}-{}'.format(node, i))
+            del self.nodes[h]
+            self.hashes.remove(h)
+
+    def get(self, key):
+        """ Returns the node the given key belongs to. """
+        if not self.hashes:
+            raise ValueError('Hash ring has no nodes.')
+
+        i = bisect(self.hashes, hash_key(key)) % len(self.hashes)
+        return self.nodes[self.hashes[i]]
+
+
+class ShardedConnection(object):
+    """ Writes to multiple InfluxDB instances, routing every measurement to a
+    shard by the consistent hash of its series (its name and tag set).
+
+    The batches for different shards are written in parallel. Writes to all
+    shards are attempted, and the failed ones are reported in a single
+    :class:`~inflow.ShardedWriteException`.
+    """
+
+    def __init__(self, uris, precision='s', retention_policy=None,
+                 timeout=None, replicas=100, max_workers=None, **kwargs):
+        if not uris:
+            raise ValueError('Should specify at least one URI.')
+
+        # Every shard would append to and replay the same directory, sending
+        # the points of other shards to its own server.
+        if kwargs.get('spool') is not None:
+            raise ValueError('A sharded connection doesn\'t support '
+                             'spooling.')
+
+        self.precision = precision
+        self.settings = dict(kwargs, precision=precision,
+                             retention_policy=retention_policy,
+                             timeout=timeout)
+        self.connections = OrderedDict(
+            (uri, Connection(uri, **self.settings)) for uri in uris
+        )
+        self.ring = HashRing(uris, replicas)
+        self.executor = ThreadPoolExecutor(max_workers or len(uris))
+
+    def add_shard(self, uri):
+        """ Adds a shard, which takes over part of the series. """
+        self.connections[uri] = Connection(uri, **self.settings)
+        self.ring.add(uri)
+
+    def remove_shard(self, uri):
+        """ Removes a shard, its series are spread over the other shards. """
+        self.ring.remove(uri)
+        self.connections.pop(uri).close()
+
+    def get_shard(self, measurement):
+        """ Returns the URI of the shard the given measurement belongs to. """
+        return self.ring.get(series_key(measurement))
+
+    def write(self, measurement, retention_policy=None):
+        """ Write measurements to their shards, in parallel. """
+        measurements = (measurement if type(measurement) is list
+                        else [measurement])
+
+        shards = OrderedDict()
+        for m in measurements:
+            shards.setdefault(self.get_shard(m), []).append(m)
+
+        futures = [
+            (uri, self.executor.submit(self.connections[uri].write, batch,
+                                       retention_policy))
+            for uri, batch in shards.items()
+        ]
+
+        errors = {}
+        for uri, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors[uri] = e
+
+        if errors:
+            raise ShardedWriteException(errors)
+
+    def close(self):
+        """ Closes the connections to all shards. """
+        self.executor.shutdown()
+        for connection in self.connections.values():
+            connection.close()
+
+
+class ShardedClient(WriteMixin):
+    """ An InfluxDB client that shards writes over multiple instances, see
+    :class:`ShardedConnection`. Any other keyword arguments are passed on to
+    the :class:`~inflow.Connection` of every shard. """
+
+    def __init__(self, uris, precision='s', retention_policy=None,
+                 timeout=None, replicas=100, max_workers=None, **kwargs):
+        self.connection = ShardedConnection(uris, precision, retention_policy,
+                                            timeout, replicas=replicas,
+                                            max_workers=max_workers, **kwargs)
+
+    def write_func(self, measurement, **kwargs):
+        return self.connection.write(measurement, **kwargs)
+
+    def session(self, autocommit_every=None, retention_policy=None):
+        return Session(self.connection, autocommit_every, retention_policy)
+
+    def close(self):
+        """ Closes the connections to all shards. """
+        self.connection.close()
@@ -0,0 +1,359 @@
+""" A durable, on-disk buffer for writes that couldn't be sent (yet).
+
+The spool is a directory of append-only segment files. Every write is
+appended to the newest segment as a record holding the line protocol and its
+retention policy. Segments are replayed oldest first, and deleted once all of
+their records are written to InfluxDB. Records InfluxDB rejects are moved to
+a quarantine file, so they don't block the records after them.
+"""
+import logging
+import os
+import struct
+import threading
+import zlib
+
+from .exceptions import PartialWriteException
+from .retry import is_transient_error
+from .utils import replace
+
+__all__ = ['Spool']
+
+logger = logging.getLogger(__name__)
+
+# A record header holds the length of the data, the CRC32 of the data, and the
+# length of the retention policy name.
+HEADER = struct.Struct('>IIH')
+
+SEGMENT_SUFFIX = '.spool'
+OFFSET_FILE = 'offset'
+QUARANTINE_FILE = 'rejected'
+
+
+def encode_record(data, retention_policy):
+    """ Returns the record holding line protocol and its retention policy. """
+    if not isinstance(data, (bytes, bytearray)):
+        data = data.encode('utf-8')
+
+    rp = (retention_policy or '').encode('utf-8')
+    return HEADER.pack(len(data), zlib.crc32(data) & 0xffffffff,
+                       len(rp)) + rp + data
+
+
+class Spool(object):
+    """ An append-only, segmented write-ahead spool of line protocol.
+
+    Segments are rotated after growing beyond ``segment_size`` bytes. When
+    the spool grows beyond ``max_size`` bytes, its oldest segments are
+    dropped. With ``fsync`` enabled, every append is flushed to disk before it
+    returns, so it survives a power loss too, not only a process restart.
+    """
+
+    def __init__(self, directory, segment_size=16 * 1024 * 1024,
+                 max_size=1024 * 1024 * 1024, fsync=False):
+        self.directory = directory
+        """ The directory the segments are stored in. """
+
+        self.segment_size = segment_size
+        """ The size in bytes after which a new segment is started. """
+
+        self.max_size = max_size
+        """ The maximum size in bytes of all segments together. """
+
+        self.fsync = fsync
+        """ Whether to fsync every append. """
+
+        self.dropped = 0
+        """ The amount of bytes dropped because the spool was full. """
+
+        self.rejected = 0
+        """ The amount of bytes InfluxDB rejected while replaying, which were
+        moved to the quarantine file. """
+
+        self.lock = threading.RLock()
+
+        # Only one thread replays at a time, without holding the lock while
+        # sending, so appends don't wait for InfluxDB.
+        self.replay_lock = threading.Lock()
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+        self.offset = self.read_offset()
+
+        if not self.segments:
+            self.segments.append(0)
+
+        self.truncate_torn_record(self.segments[-1])
+        self.file = open(self.segment_path(self.segments[-1]), 'ab')
+
+        self.total_size = sum(os.path.getsize(self.segment_path(s))
+                              for s in self.segments)
+        """ The size in bytes of all segments together. """
+
+    def __len__(self):
+        """ Returns the amount of bytes waiting to be replayed. """
+        with self.lock:
+            return self.size() - self.offset
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory,
+                            '{:020d}{}'.format(segment, SEGMENT_SUFFIX))
+
+    def read_offset(self):
+        """ Reads the offset of the first record that isn't replayed yet,
+        within the oldest segment. """
+        try:
+            with open(os.path.join(self.directory, OFFSET_FILE)) as f:
+                segment, offset = [int(v) for v in f.read().split()]
+        except (IOError, OSError, ValueError):
+            return 0
+
+        return offset if self.segments and segment == self.segments[0] else 0
+
+    def write_offset(self):
+        path = os.path.join(self.directory, OFFSET_FILE)
+        with open(path + '.tmp', 'w') as f:
+            f.write('{} {}'.format(self.segments[0], self.offset))
+
+        replace(path + '.tmp', path)
+
+    def truncate_torn_record(self, segment):
+        """ Removes a partially written record from the end of a segment, left
+        behind when the process crashed while appending to it. Otherwise, all
+        records appended after it would be unreadable. """
+        path = self.segment_path(segment)
+        if not os.path.exists(path):
+            return
+
+        end = 0
+        for end, _, _ in self.read_records(segment, 0):
+            pass
+
+        if os.path.getsize(path) > end:
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+
+    def size(self):
+        """ Returns the size in bytes of all segments together. """
+        return self.total_size
+
+    def rotate(self):
+        """ Starts a new segment. """
+        self.file.close()
+        self.segments.append(self.segments[-1] + 1)
+        self.file = open(self.segment_path(self.segments[-1]), 'ab')
+
+    def remove_oldest(self):
+        """ Deletes the oldest segment. Returns its size. """
+        path = self.segment_path(self.segments.pop(0))
+        size = os.path.getsize(path)
+        os.remove(path)
+
+        self.total_size -= size
+        return size
+
+    def drop_oldest(self):
+        """ Deletes the oldest segment. """
+        self.dropped += self.remove_oldest() - self.offset
+
+        self.offset = 0
+        self.write_offset()
+
+    def append(self, data, retention_policy=None):
+        """ Appends line protocol to the spool. """
+        record = encode_record(data, retention_policy)
+
+        with self.lock:
+            if self.file.tell() > 0 and\
+                    self.file.tell() + len(record) > self.segment_size:
+                self.rotate()
+
+            while len(self.segments) > 1 and\
+                    self.size() + len(record) > self.max_size:
+                self.drop_oldest()
+
+            self.file.write(record)
+            self.file.flush()
+            self.total_size += len(record)
+
+            if self.fsync:
+                os.fsync(self.file.fileno())
+
+    def read_records(self, segment, offset):
+        """ Yields the offset after, retention policy and data of every
+        complete record in a segment, starting at the given offset. A record
+        that was only partially written, for example because the process
+        crashed, ends the segment. """
+        with open(self.segment_path(segment), 'rb') as f:
+            f.seek(offset)
+
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+
+                length, crc, rp_length = HEADER.unpack(header)
+                rp = f.read(rp_length)
+                data = f.read(length)
+
+                if len(data) < length or\
+                        zlib.crc32(data) & 0xffffffff != crc:
+                    return
+
+                offset += HEADER.size + rp_length + length
+                yield offset, rp.decode('utf-8') or None, data
+
+    def next_batch(self, batch_size):
+        """ Returns the segment, the offset after, the retention policy and
+        the records of the next batch to replay, deleting replayed segments
+        on the way. Returns None when everything is replayed. """
+        with self.lock:
+            while True:
+                segment = self.segments[0]
+                active = len(self.segments) == 1
+
+                if active:
+                    self.file.flush()
+
+                batch = []
+                size = 0
+                batch_rp = None
+                end = self.offset
+
+                for offset, rp, data in self.read_records(segment,
+                                                          self.offset):
+                    if batch and (rp != batch_rp or size >= batch_size):
+                        break
+
+                    batch.append(data)
+                    size += len(data) + 1
+                    batch_rp = rp
+                    end = offset
+
+                if batch:
+                    return segment, end, batch_rp, batch
+
+                # The whole segment is replayed.
+                if active:
+                    if self.offset > 0:
+                        self.rotate()
+                    else:
+                        return None
+
+                self.remove_oldest()
+                self.offset = 0
+                self.write_offset()
+
+    def commit(self, segment, offset):
+        """ Marks the records before the offset as replayed. """
+        with self.lock:
+            # The segment was dropped while replaying when the spool is full.
+            if self.segments[0] == segment:
+                self.offset = offset
+                self.write_offset()
+
+    def quarantine(self, data, retention_policy, error):
+        """ Moves line protocol InfluxDB rejected to the quarantine file. """
+        logger.warning('InfluxDB rejected %d bytes of spooled data, moved '
+                       'them to %s: %s', len(data), QUARANTINE_FILE, error)
+
+        with self.lock:
+            path = os.path.join(self.directory, QUARANTINE_FILE)
+            with open(path, 'ab') as f:
+                f.write(encode_record(data, retention_policy))
+
+            self.rejected += len(data)
+
+    def send_records(self, send, records, retention_policy):
+        """ Sends records as a single batch. When InfluxDB rejects the batch,
+        its records are sent one by one, and the records rejected by
+        themselves are quarantined. Only transient errors are raised. """
+        try:
+            send(b'\n'.join(records), retention_policy)
+        except Exception as e:
+            if is_transient_error(e):
+                raise
+
+            if isinstance(e, PartialWriteException):
+                for lines, error in e.failures:
+                    self.quarantine(lines, retention_policy, error)
+            elif len(records) > 1:
+                for record in records:
+                    self.send_records(send, [record], retention_policy)
+            else:
+                self.quarantine(records[0], retention_policy, e)
+
+    def replay(self, send, batch_size=4 * 1024 * 1024, blocking=True):
+        """ Replays the spooled records, oldest first, by calling
+        ``send(data, retention_policy)``. Consecutive records with the same
+        retention policy are combined into batches of about ``batch_size``
+        bytes.
+
+        Returns whether the spool was drained completely. Replaying stops at
+        the first transient error, the batch is then replayed again next time.
+        Records InfluxDB rejects are moved to the quarantine file instead, as
+        resending the same data would fail again. The spool isn't locked while
+        sending, so appends don't wait for InfluxDB. Unless ``blocking`` is
+        enabled, False is returned right away when another replay is running.
+        """
+        if not self.replay_lock.acquire(blocking):
+            return False
+
+        try:
+            while True:
+                batch = self.next_batch(batch_size)
+                if batch is None:
+                    return True
+
+                segment, end, rp, records = batch
+                try:
+                    self.send_records(send, records, rp)
+                except Exception as e:
+                    if is_transient_error(e):
+                        return False
+                    raise
+
+                self.commit(segment, end)
+        finally:
+            self.replay_lock.release()
+
+    def close(self):
+        """ Closes the active segment. """
+        with self.lock:
+            self.file.close()
+
+
+class Replayer(object):
+    """ Replays a spool every ``interval`` seconds from a background thread,
+    so spooled data is written once InfluxDB is back, even when nothing new
+    is written. """
+
+    def __init__(self, spool, replay, interval):
+        self.spool = spool
+        self.replay = replay
+        self.interval = interval
+        self.stopped = threading.Event()
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            if not len(self.spool):
+                continue
+
+            try:
+                self.replay()
+            except Exception:
+                logger.exception('Failed to replay the spool.')
+
+    def stop(self):
+        """ Stops replaying. """
+        self.stopped.set()
+        self.thread.join()
@@ -0,0 +1,131 @@
+""" Templates for writing many points of the same series.
+
+A :class:`SeriesTemplate` renders its measurement name, tags and field keys
+to line protocol once. Writing a point then only formats its values and
+timestamp.
+"""
+from collections import namedtuple
+
+import six
+
+from .measurement import NANOSECONDS, time_ns, to_nanoseconds
+from .serializer import escape_key, format_value, series_key
+
+__all__ = ['SeriesTemplate', 'TemplatePoint']
+
+
+class TemplatePoint(namedtuple('TemplatePoint', ['template', 'values',
+                                                 'timestamp'])):
+    """ A point of a :class:`SeriesTemplate`. ``values`` holds a value for
+    every field key of the template, in order, and ``timestamp`` the
+    timestamp in nanoseconds. """
+
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return self.template.name
+
+    @property
+    def tags(self):
+        return self.template.tags
+
+    @property
+    def key(self):
+        return self.template.key
+
+    def get_timestamp(self, precision='s'):
+        """ Returns the timestamp as an integer in the given precision. """
+        return self.timestamp // NANOSECONDS[precision]
+
+    def append_line(self, parts, precision='s'):
+        self.template.append_line(parts, self, precision)
+
+    def to_line(self, precision='s'):
+        parts = []
+        self.template.append_line(parts, self, precision)
+        return ''.join(parts)
+
+
+class SeriesTemplate(object):
+    """ A measurement name and tag set, with a fixed list of field keys.
+
+    The escaped ``name,tag=value`` prefix and the ``key=`` fragment of every
+    field are rendered when the template is created, so writing a point only
+    formats its values and timestamp. Timestamps are converted like those of
+    a :class:`~inflow.Measurement`: they're datetimes, or numbers in the
+    ``epoch`` precision, seconds by default. Fields with a value of ``None``
+    are left out.
+    """
+
+    def __init__(self, name, tags=None, field_keys=None):
+        if not field_keys:
+            raise ValueError('Should specify at least one field key.')
+
+        self.name = name
+        """ The name of the measurement. """
+
+        self.tags = tags
+        """ The tags of every point. """
+
+        self.field_keys = list(field_keys)
+        """ The keys of the fields, in the order values are given in. """
+
+        self.key = series_key(self)
+        """ The escaped measurement name and tags. """
+
+        self.first_fields = [' ' + escape_key(k) + '=' for k in field_keys]
+        self.other_fields = [',' + escape_key(k) + '=' for k in field_keys]
+
+    def __repr__(self):
+        return 'SeriesTemplate({!r}, tags={!r}, field_keys={!r})'.format(
+            self.name, self.tags, self.field_keys)
+
+    def point(self, values, timestamp=None, epoch='s'):
+        """ Returns a point of this series. ``values`` is either a sequence
+        holding a value for every field key, or a dict of values. """
+        if isinstance(values, dict):
+            values = [values.get(k) for k in self.field_keys]
+        elif len(values) != len(self.field_keys):
+            raise ValueError('Expected {} values, got {}.'.format(
+                len(self.field_keys), len(values)))
+
+        timestamp = (time_ns() if timestamp is None
+                     else to_nanoseconds(timestamp, epoch))
+
+        return TemplatePoint(self, values, timestamp)
+
+    def append_line(self, parts, point, precision='s'):
+        """ Appends the line protocol fragments of a point to ``parts``. """
+        parts.append(self.key)
+
+        fields = self.first_fields
+        for i, value in enumerate(point.values):
+            if value is None:
+                continue
+
+            if isinstance(value, six.string_types):
+                value = format_value(value)
+            else:
+                value = str(value)
+
+            parts.append(fields[i] + value)
+            fields = self.other_fields
+
+        if fields is self.first_fields:
+            raise ValueError('A point should have at least one value.')
+
+        parts.append(' ' + str(point.timestamp // NANOSECONDS[precision]))
+
+    def line(self, values, timestamp=None, precision='s', epoch='s'):
+        """ Returns a line of line protocol for the given values. """
+        parts = []
+        self.append_line(parts, self.point(values, timestamp, epoch),
+                         precision)
+        return ''.join(parts)
+
+    def write(self, writer, values, timestamp=None, retention_policy=None,
+              epoch='s'):
+        """ Writes a point using a client or session. """
+        return writer.write(self, values, timestamp=timestamp,
+                            retention_policy=retention_policy, epoch=epoch)
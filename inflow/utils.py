@@ -1,7 +1,12 @@
+import os
 import six
 
 __all__ = ['to_comma_separated_string', 'escape']
 
+# Replaces a file atomically. Python 2 lacks os.replace, but os.rename
+# replaces files atomically on POSIX systems.
+replace = getattr(os, 'replace', os.rename)
+
 
 def to_comma_separated_string(data):
     """ Turns list of key value pairs into a comma separated string.
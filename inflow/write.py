@@ -1,5 +1,6 @@
 import six
 from .measurement import Measurement
+from .template import SeriesTemplate
 
 __all__ = ['WriteMixin']
 
@@ -16,6 +17,13 @@ class WriteMixin:
         if isinstance(first, Measurement):
             return self.write_func(first, retention_policy=retention_policy)
 
+        elif isinstance(first, SeriesTemplate):
+            return self.write_func(
+                first.point(args[1], kwargs.get('timestamp'),
+                            kwargs.get('epoch', 's')),
+                retention_policy=retention_policy
+            )
+
         elif type(first) is dict:
             measurements = []
             for measurement in args[1]:
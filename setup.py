@@ -16,7 +16,16 @@ setup(
     long_description=long_description,
     license="MPL",
     packages=["inflow"],
-    install_requires=["requests~=2.11", "six~=1.11", "pytz"],
+    install_requires=["requests~=2.11", "six~=1.11",
+                      "pytz; python_version < '3'",
+                      "futures; python_version < '3'"],
+    extras_require={
+        "async": ["aiohttp>=3.3"],
+        "fast": ["orjson; python_version >= '3.6'"],
+        "msgpack": ["msgpack"],
+        "numpy": ["numpy"],
+        "pandas": ["numpy", "pandas"],
+    },
     classifiers=[
         "Intended Audience :: Developers",
         "License :: OSI Approved :: Mozilla Public License 2.0 (MPL 2.0)",
@@ -0,0 +1,219 @@
+import asyncio
+import pytest
+
+from inflow import (AsyncClient, WriteFailedException, QueryFailedException,
+                    DatabaseNotFoundException, UnauthorizedException,
+                    ForbiddenException, PartialWriteException, RetryPolicy,
+                    StatsCollector, QueryCache)
+
+pytest.importorskip('aiohttp')
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def with_client(server, func, **kwargs):
+    """ Runs ``func`` with an async client connected to the local server. """
+    async def main():
+        async with AsyncClient(server.uri, **kwargs) as client:
+            return await func(client)
+
+    return run(main())
+
+
+class TestAsyncWrite:
+    def test_write(self, server):
+        async def write(client):
+            await client.write('temperature', value=21.3, timestamp=1476107241)
+
+        with_client(server, write)
+        assert server.points == 1
+
+    def test_measurement_template(self, server):
+        async def write(client):
+            await client.write({'name': 'temperature'}, [
+                {'value': 21.3, 'timestamp': 1476107241},
+                {'value': 21.9, 'timestamp': 1476107319}
+            ])
+
+        with_client(server, write)
+        assert server.points == 2
+        assert server.requests == 1
+
+    def test_concurrent_writes(self, server):
+        """ Should not send more than max_in_flight requests at once. """
+        server.latency = 0.02
+
+        async def write(client):
+            await asyncio.gather(*[
+                client.write('temperature', value=i, timestamp=1476107241)
+                for i in range(10)
+            ])
+
+        with_client(server, write, max_in_flight=3)
+        assert server.points == 10
+        assert server.max_in_flight == 3
+
+    def test_retry(self, server):
+        server.status = 503
+        server.failures = 2
+
+        async def write(client):
+            await client.write('temperature', value=21.3, timestamp=1476107241)
+
+        with_client(server, write,
+                    retry_policy=RetryPolicy(backoff=0.01, jitter=False))
+        assert server.points == 1
+        assert server.requests == 3
+
+    def test_hooks(self, server):
+        stats = StatsCollector()
+
+        async def write(client):
+            await client.write('temperature', value=21.3, timestamp=1476107241)
+            await client.query('SELECT * FROM "temperature"')
+
+        with_client(server, write, hooks=[stats],
+                    retry_policy=RetryPolicy(backoff=0.001))
+        snapshot = stats.snapshot()
+
+        assert snapshot['writes'] == 1
+        assert snapshot['points'] == 1
+        assert snapshot['queries'] == 1
+
+    def test_split(self, server):
+        server.reject = b'value=3'
+
+        async def write(client):
+            await client.write({'name': 'temperature'}, [
+                {'value': v, 'timestamp': 1476107241} for v in range(8)
+            ])
+
+        with pytest.raises(PartialWriteException) as exc:
+            with_client(server, write, retry_policy=RetryPolicy())
+
+        assert server.points == 7
+        assert exc.value.lines == ['temperature value=3 1476107241']
+
+    @pytest.mark.parametrize(('status_code', 'exception'), [
+        (400, WriteFailedException),
+        (404, DatabaseNotFoundException),
+        (500, WriteFailedException),
+        (401, UnauthorizedException),
+        (403, ForbiddenException)
+    ])
+    def test_exception(self, server, status_code, exception):
+        server.status = status_code
+
+        async def write(client):
+            await client.write('temperature', value=10)
+
+        with pytest.raises(exception):
+            with_client(server, write)
+
+
+class TestAsyncSession:
+    def test_session_as_context_manager(self, server):
+        async def write(client):
+            async with client.session() as session:
+                await session.write('temperature', value=23.1,
+                                    timestamp=1475848864)
+                await session.write('temperature', value=25.0,
+                                    timestamp=1475849823)
+
+            assert server.requests == 1
+
+        with_client(server, write)
+        assert server.points == 2
+
+    def test_session_autocommit_every(self, server):
+        async def write(client):
+            session = client.session(autocommit_every=2)
+            await session.write('temperature', value=23.1)
+            assert server.requests == 0
+
+            await session.write('temperature', value=25.0)
+            assert server.requests == 1
+            assert session.measurements == []
+
+        with_client(server, write)
+
+
+class TestAsyncQuery:
+    def test_query(self, server):
+        async def query(client):
+            return await client.query('SELECT * FROM "temperature"')
+
+        rv = with_client(server, query)
+        assert rv == [{
+            'name': 'temperature',
+            'values': [{'timestamp': 1476107241, 'value': 21.3,
+                        'humidity': 50, 'location': 'groningen'}]
+        }]
+
+    def test_csv(self, server):
+        async def query(client):
+            return await client.query('SELECT * FROM "temperature"')
+
+        rv = with_client(server, query, query_format='csv')
+        assert rv == [{
+            'name': 'temperature',
+            'values': [{'timestamp': 1476107241, 'value': 21.3,
+                        'humidity': 50, 'location': 'groningen'}]
+        }]
+
+    def test_cache(self, server):
+        cache = QueryCache(invalidate_on_write=True)
+
+        async def query(client):
+            for _ in range(3):
+                await client.query('SELECT * FROM "temperature"')
+            await client.write('temperature', value=21.3)
+            await client.query('SELECT * FROM "temperature"')
+
+        with_client(server, query, query_cache=cache)
+        assert server.requests == 3
+        assert (cache.hits, cache.misses) == (2, 2)
+
+    def test_coalesce(self, server):
+        stats = StatsCollector()
+        server.latency = 0.1
+
+        async def query(client):
+            return await asyncio.gather(*[
+                client.query('SELECT * FROM "temperature"')
+                for _ in range(5)
+            ])
+
+        results = with_client(server, query, coalesce_queries=True,
+                              hooks=[stats])
+        assert server.requests == 1
+        assert all(r is results[0] for r in results)
+        assert stats.coalesced == 4
+
+    @pytest.mark.parametrize(('status_code', 'exception'), [
+        (400, QueryFailedException),
+        (401, UnauthorizedException),
+        (403, ForbiddenException)
+    ])
+    def test_exception(self, server, status_code, exception):
+        server.status = status_code
+
+        async def query(client):
+            await client.query('SELECT * FROM "temperature"')
+
+        with pytest.raises(exception):
+            with_client(server, query)
+
+    @pytest.mark.parametrize('method', ['query_many', 'query_iter',
+                                        'query_range', 'query_range_iter'])
+    def test_not_supported(self, method):
+        connection = AsyncClient('http://localhost:8086/testdb').connection
+
+        with pytest.raises(NotImplementedError):
+            getattr(connection, method)(['SELECT 1'])
@@ -0,0 +1,198 @@
+import time
+import threading
+import pytest
+
+from inflow import BackgroundWriter, QueueFullException
+
+try:
+    from unittest.mock import DEFAULT
+except:
+    from mock import DEFAULT
+
+
+def posted_lines(post):
+    lines = []
+    for call in post.call_args_list:
+        lines.extend(call[1]['data'].split('\n'))
+    return lines
+
+
+class TestBackgroundWriter:
+    def test_session_background(self, client, post):
+        """ Should create a background writer from the client. """
+        with client.session(autocommit_every=3, background=True) as writer:
+            assert isinstance(writer, BackgroundWriter)
+            assert writer.batch_size == 3
+
+    def test_write_on_close(self, client, post):
+        with client.session(background=True, max_age=60) as writer:
+            writer.write('temperature', value=23.1, timestamp=1475848864)
+            writer.write('temperature', value=25.0, timestamp=1475849823)
+
+        post.assert_called_once_with(
+            'https://localhost:8086/write?precision=s&db=testdb',
+            auth=('user', 'pass'),
+            data='temperature value=23.1 1475848864\n'
+                 'temperature value=25.0 1475849823',
+            timeout=1,
+            headers={}
+        )
+
+    def test_flush_batch_size(self, client, post):
+        writer = client.session(background=True, batch_size=2, max_age=60)
+        writer.write({'name': 'temperature'}, [
+            {'value': v, 'timestamp': 1475848864} for v in range(5)
+        ])
+        writer.flush()
+
+        writer.close()
+
+        assert [len(c[1]['data'].split('\n'))
+                for c in post.call_args_list] == [2, 2, 1]
+
+    def test_flush_batch_bytes(self, client, post):
+        writer = client.session(background=True, batch_bytes=60, max_age=60)
+        writer.write({'name': 'temperature'}, [
+            {'value': v, 'timestamp': 1475848864} for v in range(4)
+        ])
+        writer.close()
+
+        # Every line takes 31 bytes, so every batch holds 2 lines.
+        assert post.call_count == 2
+        assert len(posted_lines(post)) == 4
+
+    def test_flush_batch_bytes_encoded(self, client, post):
+        """ Should count the bytes of lines, not their characters. """
+        writer = client.session(background=True, batch_bytes=64, max_age=60)
+        writer.write({'name': u't\xebmp\xebrat\xfcr\xeb'}, [
+            {'value': 0, 'timestamp': 1475848864} for _ in range(6)
+        ])
+        writer.close()
+
+        # Every line takes 31 characters, but 34 bytes.
+        assert post.call_count == 3
+
+    def test_flush_max_age(self, client, post):
+        writer = client.session(background=True, max_age=0.05)
+        writer.write('temperature', value=23.1, timestamp=1475848864)
+
+        deadline = time.time() + 2
+        while not post.called and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert post.called
+        writer.close()
+
+    def test_invalid_overflow(self, client):
+        with pytest.raises(ValueError):
+            client.session(background=True, overflow='ignore')
+
+    @pytest.fixture
+    def blocked_writer(self, client, post):
+        """ Creates writers whose worker blocks in its first write, until the
+        test is done. """
+        release = threading.Event()
+        post.side_effect = lambda *args, **kwargs: release.wait() and DEFAULT
+        writers = []
+
+        def create(**kwargs):
+            writer = client.session(background=True, batch_size=1,
+                                    queue_size=2, **kwargs)
+            writers.append(writer)
+
+            writer.write('temperature', value=-1, timestamp=1475848864)
+            while not post.called:
+                time.sleep(0.01)
+
+            return writer
+
+        create.release = release
+        yield create
+
+        release.set()
+        for writer in writers:
+            writer.close()
+
+    def fill(self, writer, count):
+        for i in range(count):
+            writer.write('temperature', value=i, timestamp=1475848864)
+
+    def test_overflow_raise(self, blocked_writer):
+        writer = blocked_writer(overflow='raise')
+        with pytest.raises(QueueFullException):
+            self.fill(writer, 3)
+
+    def test_overflow_raise_list(self, blocked_writer):
+        """ A list that doesn't fit should not be queued at all. """
+        writer = blocked_writer(overflow='raise')
+        self.fill(writer, 1)
+
+        with pytest.raises(QueueFullException):
+            writer.write({'name': 'temperature'}, [
+                {'value': v, 'timestamp': 1475848864} for v in range(2)
+            ])
+        assert len(writer.queue) == 1
+
+    def test_overflow_block(self, blocked_writer, post):
+        writer = blocked_writer(overflow='block')
+        self.fill(writer, 2)
+
+        thread = threading.Thread(target=self.fill, args=(writer, 3))
+        thread.start()
+        thread.join(0.1)
+        assert thread.is_alive()
+        assert len(writer.queue) == 2
+
+        blocked_writer.release.set()
+        thread.join(2)
+        assert not thread.is_alive()
+
+        writer.flush()
+        assert len(posted_lines(post)) == 6
+
+    def test_overflow_drop_oldest(self, blocked_writer):
+        writer = blocked_writer(overflow='drop_oldest')
+        self.fill(writer, 4)
+
+        assert writer.dropped == 2
+        assert [m.values['value'] for m in writer.queue] == [2, 3]
+
+    def test_on_error(self, client, post):
+        post.side_effect = IOError('connection refused')
+        errors = []
+
+        writer = client.session(background=True,
+                                on_error=lambda *args: errors.append(args))
+        writer.write('temperature', value=23.1, timestamp=1475848864)
+        writer.close()
+
+        assert len(errors) == 1
+        assert errors[0][1] == ['temperature value=23.1 1475848864']
+
+    def test_serialization_error(self, client, post):
+        """ A measurement that can't be serialized should be reported,
+        without stopping the worker. """
+        class Invalid(object):
+            def __str__(self):
+                raise ValueError('invalid value')
+            __repr__ = __str__
+
+        errors = []
+        writer = client.session(background=True, overflow='block',
+                                on_error=lambda *args: errors.append(args))
+        writer.write('temperature', value=Invalid(), timestamp=1475848864)
+        writer.write('temperature', value=23.1, timestamp=1475848864)
+        writer.flush()
+
+        assert writer.thread.is_alive()
+        assert isinstance(errors[0][0], ValueError)
+        assert errors[0][1][0].values['value'].__class__ is Invalid
+        assert posted_lines(post) == ['temperature value=23.1 1475848864']
+        writer.close()
+
+    def test_write_after_close(self, client, post):
+        writer = client.session(background=True)
+        writer.close()
+
+        with pytest.raises(ValueError):
+            writer.write('temperature', value=23.1)
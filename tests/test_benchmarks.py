@@ -0,0 +1,79 @@
+import json
+import pytest
+
+from inflow import Client, Measurement, WriteFailedException
+
+from benchmarks.__main__ import main
+from benchmarks.server import BenchmarkServer, parse_lines
+
+
+@pytest.mark.parametrize(('line', 'valid'), [
+    ('cpu value=1', True),
+    ('cpu,host=a,region=eu\\ west value=1.5,count=3i 1476107241', True),
+    ('cpu\\ load,host=a text="a \\"b\\", c",ok=true', True),
+    ('cpu value=-1e-3,flag=F -1', True),
+    ('cpu', False),
+    ('cpu value=', False),
+    ('cpu,host value=1', False),
+    ('cpu value=abc', False),
+    ('cpu value=1 12a', False)
+])
+def test_parse_lines(line, valid):
+    assert parse_lines(line) == ((1, None) if valid else (0, line))
+
+
+def test_parse_lines_batch():
+    assert parse_lines('# comment\na value=1\n\nb value=2\n') == (2, None)
+
+
+class TestServer:
+    @pytest.fixture
+    def server(self):
+        with BenchmarkServer(rows=25) as server:
+            yield server
+
+    def test_write(self, server):
+        client = Client(server.uri)
+        client.write([Measurement('cpu', value=i) for i in range(10)])
+
+        assert server.stats['points'] == 10
+        assert server.stats['writes'] == 1
+
+    def test_invalid_write(self, server):
+        client = Client(server.uri)
+        with pytest.raises(WriteFailedException):
+            client.connection.write_lines('cpu value=')
+
+    def test_query(self, server):
+        client = Client(server.uri)
+        assert len(client.query('SELECT * FROM cpu')[0]['values']) == 25
+
+    def test_chunked_query(self, server):
+        client = Client(server.uri)
+        series = list(client.query_iter('SELECT * FROM cpu', chunk_size=10))
+
+        assert [len(s['values']) for s in series] == [10, 10, 5]
+
+    def test_errors(self, server):
+        server.error_rate = 1
+        client = Client(server.uri)
+
+        with pytest.raises(WriteFailedException) as exc:
+            client.write('cpu', value=1)
+
+        assert exc.value.status_code == 503
+        assert server.stats['errors'] == 1
+
+
+@pytest.mark.benchmark
+def test_main(tmpdir):
+    output = str(tmpdir.join('results.json'))
+    main(['--scale', '0.001', '--output', output, 'to_line', 'errors'])
+
+    with open(output) as f:
+        report = json.load(f)
+
+    assert [r['scenario'] for r in report['results']] ==\
+        ['to_line'] * 2 + ['errors'] * 3
+    assert all(r['metrics']['points_per_second'] > 0
+               for r in report['results'])
@@ -0,0 +1,205 @@
+import threading
+import pytest
+
+from inflow import Client, QueryCache, QueryFailedException, StatsCollector
+from inflow.cache import MISSING, query_measurements, line_measurements
+
+
+@pytest.mark.parametrize(('query', 'expected'), [
+    ('SELECT * FROM temperature', {'temperature'}),
+    ('SELECT * FROM "my temperature" WHERE time > now() - 1h',
+     {'my temperature'}),
+    ('SELECT * FROM "db"."autogen"."temperature"', {'temperature'}),
+    ('SELECT * FROM db..temperature', {'temperature'}),
+    ('select * from cpu, "memory" limit 1', {'cpu', 'memory'}),
+    ('SELECT * FROM "a,b" WHERE host =~ /a/', {'a,b'}),
+    ('SELECT * FROM cpu, db.rp./mem.*/', None),
+    ('SELECT * FROM /cpu.*/', None),
+    ('SHOW DATABASES', None)
+])
+def test_query_measurements(query, expected):
+    assert query_measurements(query) == expected
+
+
+@pytest.mark.parametrize(('data', 'expected'), [
+    ('cpu value=1', {'cpu'}),
+    ('cpu,host=a value=1\nmemory value=2\n\ncpu value=3', {'cpu', 'memory'}),
+    (b'cpu\\ load,host=a value=1\ndisk\\,io value=2',
+     {'cpu load', 'disk,io'}),
+    ('', set())
+])
+def test_line_measurements(data, expected):
+    assert line_measurements(data) == expected
+
+
+class TestQueryCache:
+    def test_get(self):
+        cache = QueryCache()
+        assert cache.get('a') is MISSING
+
+        cache.set(('db', 'a'), [1], 10)
+        assert cache.get(('db', 'a')) == [1]
+        assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+    def test_ttl(self):
+        cache = QueryCache(ttl=0)
+        cache.set(('db', 'a'), [1], 10)
+
+        assert cache.get(('db', 'a')) is MISSING
+        assert cache.bytes == 0
+
+    def test_max_entries(self):
+        cache = QueryCache(max_entries=2)
+        cache.set(('db', 'a'), 1)
+        cache.set(('db', 'b'), 2)
+        cache.get(('db', 'a'))
+        cache.set(('db', 'c'), 3)
+
+        assert cache.get(('db', 'b')) is MISSING
+        assert cache.get(('db', 'a')) == 1
+        assert cache.evictions == 1
+
+    def test_max_bytes(self):
+        cache = QueryCache(max_bytes=100)
+        cache.set(('db', 'a'), 1, 60)
+        cache.set(('db', 'b'), 2, 60)
+        cache.set(('db', 'c'), 3, 200)
+
+        assert len(cache) == 1
+        assert cache.bytes == 60
+
+    def test_invalidate_lines(self):
+        cache = QueryCache(invalidate_on_write=True)
+        cache.set(('db', 'SELECT * FROM "cpu load"'), 1)
+        cache.set(('db', 'SELECT * FROM cpu'), 2)
+        cache.set(('db', 'SELECT * FROM /mem/'), 3)
+
+        cache.invalidate_lines(b'disk value=1\ncpu\\ load,host=a value=2')
+
+        assert [k[1] for k in cache.entries] == ['SELECT * FROM cpu']
+        assert cache.invalidations == 2
+
+    def test_stale_result(self):
+        cache = QueryCache(invalidate_on_write=True)
+        generation = cache.generation
+
+        cache.invalidate_lines('cpu value=1')
+        cache.set(('db', 'SELECT * FROM cpu'), 1, generation=generation)
+        cache.set(('db', 'SELECT * FROM memory'), 2, generation=generation)
+        cache.set(('db', 'SELECT * FROM /c/'), 3, generation=generation)
+        cache.set(('db', 'SELECT * FROM disk'), 4,
+                  generation=cache.generation)
+
+        assert [k[1] for k in cache.entries] == ['SELECT * FROM memory',
+                                                 'SELECT * FROM disk']
+
+    def test_stale_forgotten_writes(self):
+        cache = QueryCache(invalidate_on_write=True)
+        generation = cache.generation
+
+        for _ in range(cache.writes.maxlen + 1):
+            cache.invalidate_lines('cpu value=1')
+        cache.set(('db', 'SELECT * FROM memory'), 1, generation=generation)
+
+        assert len(cache) == 0
+
+
+class TestClient:
+    @pytest.fixture
+    def cache(self):
+        return QueryCache(invalidate_on_write=True)
+
+    @pytest.fixture
+    def client(self, server, cache):
+        return Client(server.uri, query_cache=cache)
+
+    def test_query(self, client, server, cache):
+        first = client.query('SELECT * FROM temperature')
+        second = client.query('SELECT * FROM temperature')
+
+        assert first is second
+        assert server.requests == 1
+        assert cache.bytes > 0
+
+    def test_key(self, client, server):
+        client.query('SELECT * FROM temperature')
+        client.query('SELECT * FROM temperature', epoch='ms')
+        client.query('SELECT * FROM temperature', format='columns')
+
+        assert server.requests == 3
+
+    def test_bypass(self, client, server):
+        client.query('SELECT * FROM temperature', cache_ttl=0)
+        client.query('SELECT * FROM temperature', cache_ttl=0)
+        client.query('DROP MEASUREMENT temperature')
+        client.query('DROP MEASUREMENT temperature')
+
+        assert server.requests == 4
+
+    def test_invalidate_on_write(self, client, server):
+        client.query('SELECT * FROM temperature')
+        client.query('SELECT * FROM humidity')
+        client.write('temperature', value=21.3)
+        client.query('SELECT * FROM temperature')
+        client.query('SELECT * FROM humidity')
+
+        assert server.requests == 4
+
+
+class TestCoalescing:
+    def run_concurrently(self, func, count=5):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(func()))
+                   for _ in range(count)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_query(self, server):
+        stats = StatsCollector()
+        client = Client(server.uri, coalesce_queries=True, hooks=[stats])
+        server.latency = 0.2
+
+        results = self.run_concurrently(
+            lambda: client.query('SELECT * FROM temperature'))
+
+        assert server.requests == 1
+        assert all(r is results[0] for r in results)
+        assert stats.coalesced == 4
+        assert client.connection.flights == {}
+
+    def test_different_queries(self, server):
+        client = Client(server.uri, coalesce_queries=True)
+        server.latency = 0.1
+
+        self.run_concurrently(lambda: client.query('SELECT * FROM a'), 2)
+        self.run_concurrently(
+            lambda: client.query('SELECT * FROM a', epoch='s'), 2)
+
+        assert server.requests == 2
+
+    def test_error(self, server):
+        client = Client(server.uri, coalesce_queries=True)
+        server.latency = 0.2
+        server.status = 400
+
+        def query():
+            try:
+                client.query('SELECT * FROM temperature')
+            except QueryFailedException as e:
+                return e
+
+        errors = self.run_concurrently(query, 3)
+        assert server.requests == 1
+        assert all(isinstance(e, QueryFailedException) for e in errors)
+
+    def test_disabled(self, server):
+        client = Client(server.uri)
+        server.latency = 0.1
+
+        self.run_concurrently(lambda: client.query('SELECT * FROM a'), 3)
+        assert server.requests == 3
@@ -0,0 +1,182 @@
+import pytest
+
+from datetime import datetime
+
+from inflow import columns
+from inflow.columns import column_lines
+
+try:
+    from datetime import timezone
+except:
+    import pytz as timezone
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    """ Runs a test with and without NumPy. """
+    if request.param == 'numpy':
+        np = pytest.importorskip('numpy')
+        return np.array
+
+    monkeypatch.setattr(columns, 'np', None)
+    return list
+
+
+class TestColumnLines:
+    def test_fields(self, backend):
+        lines = column_lines('temp erature', backend([1476107241, 1476107319]),
+                             fields={'value': backend([21.3, 21.9])})
+
+        assert list(lines) == [
+            'temp\\ erature value=21.3 1476107241\n'
+            'temp\\ erature value=21.9 1476107319'
+        ]
+
+    def test_value_types(self, backend):
+        lines = column_lines('temperature', backend([1476107241]), fields={
+            'count': backend([3]),
+            'valid': backend([True]),
+            'note': backend(['a "note"'])
+        })
+
+        assert list(lines) == [
+            'temperature count=3,valid=True,note="a \\"note\\"" 1476107241'
+        ]
+
+    def test_sorted_tags(self, backend):
+        """ Constant tags and tags with a value per row should be sorted. """
+        lines = column_lines('temperature', backend([1476107241, 1476107319]),
+                             tags={'c': 'x y', 'b': backend(['1', '2,3']),
+                                   'a': 'z'},
+                             fields={'value': backend([21.3, 21.9])})
+
+        assert list(lines) == [
+            'temperature,a=z,b=1,c=x\\ y value=21.3 1476107241\n'
+            'temperature,a=z,b=2\\,3,c=x\\ y value=21.9 1476107319'
+        ]
+
+    def test_missing_values(self, backend):
+        """ Missing values should be left out, and rows without any values
+        should be skipped. """
+        nan = float('nan')
+        lines = column_lines('temperature', backend([1, 2, 3]), fields={
+            'a': backend([1.5, nan, nan]),
+            'b': backend([nan, 2.5, nan])
+        })
+
+        assert list(lines) == ['temperature a=1.5 1\ntemperature b=2.5 2']
+
+    def test_missing_objects(self, backend):
+        """ None and NaN should be missing in columns of objects too. """
+        np = pytest.importorskip('numpy')
+        lines = column_lines('t', backend([1, 2, 3]), fields={
+            's': np.array(['a', float('nan'), None], dtype=object)
+        })
+
+        assert list(lines) == ['t s="a" 1']
+
+    def test_missing_mixed(self, backend):
+        """ Numbers and booleans mixed with None should keep their type. """
+        lines = column_lines('t', backend([1, 2, 3]), fields={
+            'v': backend([1.0, None, 2.5]),
+            'b': backend([True, None, False])
+        })
+
+        assert list(lines) == ['t v=1.0,b=True 1\nt v=2.5,b=False 3']
+
+    def test_missing_tags(self, backend):
+        """ Missing tag values should be left out of their row. """
+        nan = float('nan')
+        lines = column_lines('t', backend([1, 2, 3]),
+                             tags={'a': None,
+                                   'h': [None, 'x', nan],
+                                   'r': backend([nan, 1.5, 2.5])},
+                             fields={'v': backend([1, 2, 3])})
+
+        assert list(lines) == ['t v=1 1\nt,h=x,r=1.5 v=2 2\nt,r=2.5 v=3 3']
+
+    def test_chunks(self, backend):
+        lines = column_lines('temperature', backend([1, 2, 3]),
+                             fields={'value': backend([1, 2, 3])},
+                             chunk_size=2)
+
+        assert list(lines) == ['temperature value=1 1\ntemperature value=2 2',
+                               'temperature value=3 3']
+
+    def test_epoch(self, backend):
+        """ Integer timestamps should be converted to the precision. """
+        lines = column_lines('temperature', backend([1476107241000]),
+                             fields={'value': backend([1])}, precision='s',
+                             epoch='ms')
+
+        assert list(lines) == ['temperature value=1 1476107241']
+
+    def test_datetimes(self, backend):
+        timestamp = datetime.fromtimestamp(1476107241, timezone.utc)
+        lines = column_lines('temperature', [timestamp],
+                             fields={'value': backend([1])}, precision='ms')
+
+        assert list(lines) == ['temperature value=1 1476107241000']
+
+    def test_no_fields(self, backend):
+        with pytest.raises(ValueError):
+            list(column_lines('temperature', backend([1])))
+
+
+class TestClient:
+    def test_write_columns(self, client, post):
+        client.write_columns('temperature', [1476107241, 1476107319],
+                             tags={'location': 'groningen'},
+                             value=[21.3, 21.9])
+
+        post.assert_called_with(
+            'https://localhost:8086/write?precision=s&db=testdb',
+            auth=('user', 'pass'),
+            data='temperature,location=groningen value=21.3 1476107241\n'
+                 'temperature,location=groningen value=21.9 1476107319',
+            timeout=1,
+            headers={}
+        )
+
+    def test_write_columns_chunks(self, client, post):
+        client.write_columns('temperature', [1, 2, 3], value=[1, 2, 3],
+                             chunk_size=2)
+        assert post.call_count == 2
+
+    def test_write_dataframe(self, client, post):
+        pd = pytest.importorskip('pandas')
+        dataframe = pd.DataFrame(
+            {'value': [21.3, 21.9], 'location': ['groningen', 'assen']},
+            index=pd.to_datetime([1476107241, 1476107319], unit='s', utc=True)
+        )
+
+        client.write_dataframe('temperature', dataframe,
+                               tag_columns=['location'])
+
+        post.assert_called_with(
+            'https://localhost:8086/write?precision=s&db=testdb',
+            auth=('user', 'pass'),
+            data='temperature,location=groningen value=21.3 1476107241\n'
+                 'temperature,location=assen value=21.9 1476107319',
+            timeout=1,
+            headers={}
+        )
+
+    def test_write_dataframe_missing(self, client, post):
+        """ NaN in string columns should be missing, not written as "nan".
+        """
+        pd = pytest.importorskip('pandas')
+        dataframe = pd.DataFrame({
+            'note': ['a', float('nan'), 'c'],
+            'value': [1.5, 2.5, float('nan')],
+            'location': [None, 'assen', 'groningen']
+        }, index=[1476107241, 1476107319, 1476107400])
+
+        client.write_dataframe('temperature', dataframe,
+                               tag_columns=['location'])
+
+        assert post.call_args[1]['data'] == (
+            'temperature note="a",value=1.5 1476107241\n'
+            'temperature,location=assen value=2.5 1476107319\n'
+            'temperature,location=groningen note="c" 1476107400'
+        )
@@ -0,0 +1,104 @@
+import struct
+import pytest
+
+from inflow import Client
+from inflow.decoders import (decode_csv, decode_json, decode_msgpack,
+                             get_decoder)
+
+CSV = (b'name,tags,time,value,location\r\n'
+       b'temperature,"host=a\\,b,region=eu",1476107241,21.3,groningen\r\n'
+       b'temperature,"host=a\\,b,region=eu",1476107242,-2,\r\n'
+       b'temperature,host=c,1476107241,true,"a, b"\r\n'
+       b'\r\n'
+       b'name,tags,time,count\r\n'
+       b'humidity,,1476107241,7\r\n')
+
+
+def test_decode_json():
+    assert decode_json(b'{"results": [{"statement_id": 0}]}') ==\
+        {'results': [{'statement_id': 0}]}
+
+
+def test_decode_csv():
+    assert decode_csv(CSV) == {'results': [{'statement_id': 0, 'series': [{
+        'name': 'temperature',
+        'tags': {'host': 'a,b', 'region': 'eu'},
+        'columns': ['time', 'value', 'location'],
+        'values': [[1476107241, 21.3, 'groningen'], [1476107242, -2, None]]
+    }, {
+        'name': 'temperature',
+        'tags': {'host': 'c'},
+        'columns': ['time', 'value', 'location'],
+        'values': [[1476107241, True, 'a, b']]
+    }, {
+        'name': 'humidity',
+        'columns': ['time', 'count'],
+        'values': [[1476107241, 7]]
+    }]}]}
+
+
+def test_decode_csv_strings():
+    """ Columns holding values that aren't written as numbers, like tags and
+    string fields, should stay strings. """
+    body = (b'name,tags,time,zip,host,value\r\n'
+            b'temperature,,1476107241,00123,1,1.5\r\n'
+            b'temperature,,1476107242,4567,server,\r\n')
+
+    assert decode_csv(body)['results'][0]['series'][0]['values'] == [
+        [1476107241, '00123', '1', 1.5],
+        [1476107242, '4567', 'server', None]
+    ]
+
+
+def test_decode_csv_error():
+    assert decode_csv(b'error\r\nerror parsing query\r\n') ==\
+        {'error': 'error parsing query'}
+
+
+def test_decode_msgpack():
+    msgpack = pytest.importorskip('msgpack')
+    time = msgpack.ExtType(5, struct.pack('>QI', 1476107241, 500000000))
+    body = msgpack.packb({'results': [{'statement_id': 0, 'series': [{
+        'name': 'temperature',
+        'columns': ['time', 'value'],
+        'values': [[time, 21.3]]
+    }]}]})
+
+    series = decode_msgpack(body)['results'][0]['series'][0]
+    assert series['values'] == [['2016-10-10T13:47:21.5Z', 21.3]]
+
+
+@pytest.mark.parametrize(('content_type', 'expected'), [
+    ('application/json', decode_json),
+    ('application/csv; charset=utf-8', decode_csv),
+    ('application/x-msgpack', decode_msgpack),
+    ('text/plain', decode_json),
+    (None, decode_json)
+])
+def test_get_decoder(content_type, expected):
+    assert get_decoder(content_type) is expected
+
+
+class TestClient:
+    def test_csv(self, server):
+        client = Client(server.uri, query_format='csv')
+        assert client.query('SELECT * FROM temperature', epoch='s') == [{
+            'name': 'temperature',
+            'values': [{'timestamp': 1476107241, 'value': 21.3,
+                        'humidity': 50, 'location': 'groningen'}]
+        }]
+
+    def test_custom_decoder(self, server):
+        decoded = []
+
+        def decoder(body):
+            decoded.append(body)
+            return decode_json(body)
+
+        client = Client(server.uri, query_decoder=decoder)
+        client.query('SELECT * FROM temperature')
+        assert len(decoded) == 1
+
+    def test_invalid_format(self):
+        with pytest.raises(ValueError):
+            Client('http://localhost:8086/testdb', query_format='xml')
@@ -0,0 +1,165 @@
+import pytest
+
+from inflow import (Client, Hooks, StatsCollector, RetryPolicy, Measurement,
+                    WriteFailedException, QueryFailedException,
+                    UnauthorizedException)
+from inflow.hooks import Histogram
+
+
+class Recorder(Hooks):
+    """ Records the name and arguments of every event. """
+
+    def __init__(self):
+        self.events = []
+
+    def before_write(self, *args):
+        self.events.append(('before_write', args))
+
+    def after_write(self, *args):
+        self.events.append(('after_write', args))
+
+    def on_serialize(self, *args):
+        self.events.append(('on_serialize', args))
+
+    def on_retry(self, *args):
+        self.events.append(('on_retry', args))
+
+    def on_query(self, *args):
+        self.events.append(('on_query', args))
+
+    def names(self):
+        return [name for name, _ in self.events]
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+class TestHooks:
+    def test_write(self, server, recorder):
+        client = Client(server.uri, hooks=[recorder])
+        client.write([Measurement('temperature', value=21.3,
+                                  timestamp=1476107241)] * 2,
+                     retention_policy='rp_one')
+
+        assert recorder.names() ==\
+            ['on_serialize', 'before_write', 'after_write']
+        assert recorder.events[0][1][0] == 2
+
+        data, rp, duration, error = recorder.events[2][1]
+        assert data.count('\n') == 1
+        assert rp == 'rp_one'
+        assert duration > 0
+        assert error is None
+
+    def test_write_error(self, server, recorder):
+        client = Client(server.uri, hooks=[recorder])
+        server.status = 400
+
+        with pytest.raises(WriteFailedException):
+            client.write_columns('temperature', [1476107241], value=[21.3])
+
+        assert recorder.names() == ['before_write', 'after_write']
+        assert isinstance(recorder.events[1][1][3], WriteFailedException)
+
+    def test_retry(self, server, recorder):
+        policy = RetryPolicy(backoff=0.001, jitter=False)
+        client = Client(server.uri, hooks=[recorder], retry_policy=policy)
+        server.status = 503
+        server.failures = 1
+
+        client.write('temperature', value=21.3)
+
+        assert recorder.names() == ['on_serialize', 'before_write',
+                                    'after_write', 'on_retry',
+                                    'before_write', 'after_write']
+        assert recorder.events[3][1][:2] == (1, 0.001)
+
+    def test_query(self, server, recorder):
+        client = Client(server.uri, hooks=[recorder])
+        client.query('SELECT * FROM "temperature"')
+        client.query_many(['SELECT * FROM "a"', 'SELECT * FROM "b"'])
+        list(client.query_iter('SELECT * FROM "temperature"'))
+
+        assert [args[0] for _, args in recorder.events] == [
+            'SELECT * FROM "temperature"',
+            'SELECT * FROM "a";SELECT * FROM "b"',
+            'SELECT * FROM "temperature"'
+        ]
+
+    def test_query_error(self, server, recorder):
+        client = Client(server.uri, hooks=[recorder])
+        server.status = 400
+
+        with pytest.raises(QueryFailedException):
+            client.query('SELECT * FROM "temperature"')
+
+        assert isinstance(recorder.events[0][1][2], QueryFailedException)
+
+
+class TestHistogram:
+    def test_percentile(self):
+        histogram = Histogram([1, 2, 4])
+        for value in [0.5, 0.5, 1.5, 3, 10]:
+            histogram.add(value)
+
+        assert histogram.counts == [2, 1, 1, 1]
+        assert histogram.percentile(40) == 1
+        assert histogram.percentile(60) == 2
+        assert histogram.percentile(100) == 10
+        assert histogram.mean == 3.1
+
+    def test_empty(self):
+        assert Histogram().percentile(99) == 0
+
+
+class TestStatsCollector:
+    def test_stats(self, server):
+        stats = StatsCollector()
+        client = Client(server.uri, hooks=[stats],
+                        retry_policy=RetryPolicy(backoff=0.001))
+
+        client.write([Measurement('temperature', value=21.3)] * 3)
+        server.status = 503
+        server.failures = 1
+        client.write('temperature', value=21.3)
+        server.status = 401
+        server.failures = None
+        with pytest.raises(UnauthorizedException):
+            client.write('temperature', value=21.3)
+        server.status = None
+        client.query('SELECT * FROM "temperature"')
+
+        snapshot = stats.snapshot()
+        assert snapshot['writes'] == 4
+        assert snapshot['points'] == 4
+        assert snapshot['bytes'] > 0
+        assert snapshot['write_errors'] == 2
+        assert snapshot['retries'] == 1
+        assert snapshot['queries'] == 1
+        assert snapshot['errors'] == {'WriteFailedException': 1,
+                                      'UnauthorizedException': 1}
+        assert snapshot['points_per_second'] > 0
+        assert snapshot['serialize_time'] > 0
+        assert snapshot['network_time'] > 0
+        assert stats.write_latency.count == 4
+
+    def test_reset(self, client, post):
+        stats = StatsCollector()
+        client.connection.hooks.append(stats)
+        client.write('temperature', value=21.3)
+
+        stats.reset()
+        assert stats.snapshot()['writes'] == 0
+
+    def test_write_to(self, client, post):
+        stats = StatsCollector()
+        stats.after_write('temperature value=1 1', None, 0.01, None)
+
+        stats.write_to(client, tags={'host': 'server01'})
+
+        data = post.call_args[1]['data']
+        assert data.startswith('inflow,host=server01 ')
+        assert 'writes=1,' in data
+        assert 'points=1,' in data
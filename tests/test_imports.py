@@ -0,0 +1,67 @@
+import json
+import subprocess
+import sys
+import pytest
+
+import inflow
+
+# Modules that are slow to import, and shouldn't be imported until needed.
+HEAVY_MODULES = ['requests', 'urllib3', 'numpy', 'pandas', 'asyncio',
+                 'aiohttp', 'pytz', 'orjson', 'concurrent.futures.thread']
+
+lazy = pytest.mark.skipif(sys.version_info < (3, 7),
+                          reason='Lazy imports need Python 3.7+')
+
+
+def run(code):
+    """ Runs code in a fresh interpreter, and returns the heavy modules it
+    imported. The time imports take is measured by the import_time
+    benchmark. """
+    output = subprocess.check_output([sys.executable, '-c', '''
+import json, sys
+before = set(sys.modules)
+{}
+print(json.dumps(sorted(set(sys.modules) - before)))
+'''.format(code)])
+    modules = json.loads(output.decode('utf-8'))
+    return [m for m in HEAVY_MODULES if m in modules]
+
+
+@lazy
+def test_import():
+    assert run('import inflow') == []
+
+
+@lazy
+def test_measurement():
+    """ Serializing shouldn't import the HTTP stack. """
+    modules = run('''
+from inflow import Measurement
+from inflow.serializer import serialize_batch
+serialize_batch([Measurement('cpu', value=1)])
+''')
+    assert modules == []
+
+
+@lazy
+def test_client():
+    assert run('from inflow import Client') == []
+
+    modules = run('''
+from inflow import Client
+Client('http://localhost:8086/testdb')
+''')
+    assert modules == ['requests', 'urllib3']
+
+
+def test_exports():
+    for name in inflow.__all__:
+        assert getattr(inflow, name) is not None
+
+    assert 'Client' in dir(inflow)
+    assert inflow.Measurement.__module__ == 'inflow.measurement'
+
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError):
+        inflow.Unknown
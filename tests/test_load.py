@@ -0,0 +1,305 @@
+import os
+import pytest
+
+from inflow import Connection, RetryPolicy, WriteFailedException
+from inflow.__main__ import main
+from inflow.load import (Loader, Checkpoint, CSVConverter, iter_batches,
+                         count_lines, format_csv_value, parse_rfc3339)
+
+
+def lines(count, start=0):
+    return ''.join('cpu,host=server{} value={}.5 {}\n'.format(
+        i % 10, i, 1476107241 + i) for i in range(start, start + count))
+
+
+@pytest.fixture
+def connection(server):
+    connection = Connection(server.uri, pool_size=4)
+    yield connection
+    connection.close()
+
+
+@pytest.mark.parametrize('data,batch_size,expected', [
+    (b'a\nb\nc\n', 4, [(0, 4), (4, 6)]),
+    (b'a\nb\nc', 4, [(0, 4), (4, 5)]),
+    (b'a\nb\nc\n', 100, [(0, 6)]),
+    (b'aaaaaa\nb\n', 4, [(0, 7), (7, 9)]),
+    (b'aaaaaa', 4, [(0, 6)]),
+    (b'', 4, [])
+])
+def test_iter_batches(data, batch_size, expected):
+    assert list(iter_batches(data, 0, len(data), batch_size)) == expected
+
+
+def test_iter_batches_offset():
+    assert list(iter_batches(b'a\nb\nc\n', 2, 6, 2)) == [(2, 4), (4, 6)]
+
+
+@pytest.mark.parametrize('data,expected', [
+    (b'a\nb\nc', 3),
+    (b'a\nb\nc\n', 3),
+    (b'# comment\na\n# comment\nb', 2),
+    (b'', 0),
+    (b'\n', 0),
+    (b'a\n\nb\n\n', 2),
+    (b'\r\na\r\n \t\r\nb\r\n', 2),
+    (b'a\n  # comment\n', 1),
+    ('a\n\nb', 2)
+])
+def test_count_lines(data, expected):
+    assert count_lines(data) == expected
+
+
+@pytest.mark.parametrize('value,expected', [
+    ('2016-10-10T13:47:21Z', 1476107241000000000),
+    ('2016-10-10T13:47:21.5Z', 1476107241500000000),
+    ('2016-10-10T13:47:21.000000001Z', 1476107241000000001),
+    ('2016-10-10T15:47:21+02:00', 1476107241000000000),
+    ('2016-10-10T08:17:21.5-05:30', 1476107241500000000),
+    ('2016-10-10T13:47:21-00:00', 1476107241000000000)
+])
+def test_parse_rfc3339(value, expected):
+    assert parse_rfc3339(value) == expected
+
+
+@pytest.mark.parametrize('value', [
+    'yesterday',
+    '2016-10-10T13:47:21',
+    '2016-10-10T13:47:21+0200',
+    '2016-10-10T13:47:21Z\n'
+])
+def test_parse_rfc3339_invalid(value):
+    with pytest.raises(ValueError):
+        parse_rfc3339(value)
+
+
+@pytest.mark.parametrize('value,expected', [
+    ('21.3', '21.3'),
+    ('-1', '-1'),
+    ('.5', '.5'),
+    ('2e3', '2e3'),
+    ('1.5E-3', '1.5E-3'),
+    ('1_000', '"1_000"'),
+    ('1.5 ', '"1.5 "'),
+    ('1.5\n', '"1.5\n"'),
+    ('-inf', '"-inf"'),
+    ('-', '"-"'),
+    ('true', 'true')
+])
+def test_format_csv_value(value, expected):
+    assert format_csv_value(value) == expected
+
+
+class TestCSVConverter:
+    def test_convert(self):
+        converter = CSVConverter(['time', 'host', 'value', 'status', 'ok'],
+                                 measurement='cpu load', tags=['host'])
+
+        assert converter.convert([
+            ['1476107241', 'server 1', '21.3', 'fine', 'true'],
+            ['1476107242', '', '-1', 'say "hi"', ''],
+            ['1476107243', 'server01', '', '', ''],
+            ['1476107244', 'server01', '2e3']
+        ]) == [
+            'cpu\\ load,host=server\\ 1 value=21.3,status="fine",ok=true '
+            '1476107241',
+            'cpu\\ load value=-1,status="say \\"hi\\"" 1476107242',
+            'cpu\\ load,host=server01 value=2e3 1476107244'
+        ]
+
+    def test_influxdb_export(self):
+        converter = CSVConverter(['name', 'tags', 'time', 'value'],
+                                 precision='s')
+
+        assert converter.convert([
+            ['cpu', 'region=eu,host=server\\,01', '2016-10-10T13:47:21Z',
+             '0.5'],
+            ['memory', '', '2016-10-10T15:47:22+02:00', '2']
+        ]) == [
+            'cpu,host=server\\,01,region=eu value=0.5 1476107241',
+            'memory value=2 1476107242'
+        ]
+
+    def test_without_time(self):
+        converter = CSVConverter(['value'], measurement='cpu')
+        assert converter.convert([['1']]) == ['cpu value=1']
+
+    def test_missing_name(self):
+        with pytest.raises(ValueError):
+            CSVConverter(['time', 'value'])
+
+    def test_missing_tag(self):
+        with pytest.raises(ValueError):
+            CSVConverter(['time', 'value'], measurement='cpu', tags=['host'])
+
+
+class TestCheckpoint:
+    def test_checkpoint(self, tmpdir):
+        checkpoint = Checkpoint(str(tmpdir.join('data.txt.checkpoint')))
+        assert checkpoint.read() == 0
+
+        checkpoint.save(1024)
+        assert checkpoint.read() == 1024
+        assert tmpdir.listdir() == [tmpdir.join('data.txt.checkpoint')]
+
+        checkpoint.remove()
+        checkpoint.remove()
+        assert checkpoint.read() == 0
+
+
+class TestLoader:
+    def test_load(self, connection, server, tmpdir):
+        path = tmpdir.join('data.txt')
+        path.write(lines(1000))
+
+        stats = Loader(connection, batch_size=1000).load(str(path))
+
+        assert server.points == 1000
+        assert server.requests == stats.batches
+        assert stats.batches > 10
+        assert stats.points == 1000
+        assert stats.offset == stats.size == path.size()
+        assert stats.fraction == 1.0
+        assert stats.points_per_second > 0
+        assert stats.errors == []
+
+    def test_empty_file(self, connection, server, tmpdir):
+        path = tmpdir.join('data.txt')
+        path.write('')
+
+        stats = Loader(connection).load(str(path))
+
+        assert server.requests == 0
+        assert stats.points == 0
+
+    def test_concurrency(self, connection, server, tmpdir):
+        server.latency = 0.05
+        path = tmpdir.join('data.txt')
+        path.write(lines(1000))
+
+        Loader(connection, batch_size=1000, concurrency=4).load(str(path))
+
+        assert server.points == 1000
+        assert 1 < server.max_in_flight <= 4
+
+    def test_resume(self, connection, server, tmpdir):
+        path = tmpdir.join('data.txt')
+        path.write(lines(100) + lines(50, 100))
+        checkpoint = tmpdir.join('data.txt.checkpoint')
+        checkpoint.write(str(len(lines(100))))
+
+        stats = Loader(connection).load(str(path), checkpoint=str(checkpoint))
+
+        assert server.points == 50
+        assert stats.points == 50
+        assert stats.resumed_from == len(lines(100))
+        assert not checkpoint.exists()
+
+    def test_interrupted(self, connection, server, tmpdir):
+        path = tmpdir.join('data.txt')
+        path.write(lines(1000))
+        checkpoint = tmpdir.join('data.txt.checkpoint')
+        loader = Loader(connection, batch_size=1000, concurrency=1)
+
+        server.reject = b'value=500.5'
+        with pytest.raises(WriteFailedException):
+            loader.load(str(path), checkpoint=str(checkpoint))
+
+        offset = int(checkpoint.read())
+        assert 0 < offset <= len(lines(500))
+        written = server.points
+
+        server.reject = None
+        loader.load(str(path), checkpoint=str(checkpoint))
+
+        # Resuming writes everything after the checkpoint.
+        assert server.points - written == 1000 - lines(1000)[:offset].count(
+            '\n')
+        assert not checkpoint.exists()
+
+    def test_rejected_lines(self, server, tmpdir):
+        server.reject = b'value=13.5'
+        connection = Connection(server.uri, retry_policy=RetryPolicy())
+        path = tmpdir.join('data.txt')
+        path.write(lines(100))
+
+        stats = Loader(connection).load(str(path))
+        connection.close()
+
+        assert stats.points == 99
+        assert stats.failed_points == 1
+        assert server.points == 99
+
+    def test_progress(self, connection, tmpdir):
+        path = tmpdir.join('data.txt')
+        path.write(lines(1000))
+        reports = []
+
+        Loader(connection, batch_size=1000, concurrency=1,
+               progress=lambda stats: reports.append(stats.fraction),
+               progress_interval=0).load(str(path))
+
+        assert len(reports) > 1
+        assert reports == sorted(reports)
+        assert reports[0] < 1.0
+
+    def test_csv(self, connection, server, tmpdir):
+        path = tmpdir.join('data.csv')
+        path.write('time,host,value\n' + ''.join(
+            '{},server{},{}\n'.format(1476107241 + i, i % 10, i)
+            for i in range(1000)))
+
+        stats = Loader(connection, batch_size=1000).load(
+            str(path), measurement='cpu', tags=['host'])
+
+        assert server.points == 1000
+        assert stats.points == 1000
+        assert stats.batches > 10
+
+    def test_invalid_format(self, connection, tmpdir):
+        with pytest.raises(ValueError):
+            Loader(connection).load(str(tmpdir.join('data.txt')), 'json')
+
+
+class TestMain:
+    def test_load(self, server, tmpdir, capsys):
+        path = tmpdir.join('data.txt')
+        path.write(lines(1000))
+
+        assert main(['load', server.uri, str(path), '--batch-size', '1000',
+                     '--precision', 's']) == 0
+
+        assert server.points == 1000
+        assert not tmpdir.join('data.txt.checkpoint').exists()
+        assert '100.0%, 1000 points' in capsys.readouterr().err
+
+    def test_csv(self, server, tmpdir):
+        path = tmpdir.join('data.csv')
+        path.write('time,value\n1476107241,1\n1476107242,2\n')
+
+        assert main(['load', server.uri, str(path), '--measurement', 'cpu',
+                     '--quiet']) == 0
+        assert server.points == 2
+
+    def test_failure(self, server, tmpdir, capsys):
+        server.status = 500
+        path = tmpdir.join('data.txt')
+        path.write(lines(10))
+        checkpoint_dir = tmpdir.mkdir('checkpoints')
+
+        assert main(['load', server.uri, str(path), '--retries', '0',
+                     '--checkpoint-dir', str(checkpoint_dir)]) == 1
+        assert 'resume' in capsys.readouterr().err
+
+    def test_restart(self, server, tmpdir):
+        path = tmpdir.join('data.txt')
+        path.write(lines(10))
+        tmpdir.join('data.txt.checkpoint').write(str(path.size()))
+
+        assert main(['load', server.uri, str(path), '--quiet']) == 0
+        assert server.points == 0
+
+        assert main(['load', server.uri, str(path), '--quiet',
+                     '--restart']) == 0
+        assert server.points == 10
+        assert os.listdir(str(tmpdir)) == ['data.txt']
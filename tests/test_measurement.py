@@ -0,0 +1,121 @@
+import pytest
+import time
+
+from datetime import datetime
+
+from inflow import Measurement, Point
+from inflow.measurement import timezone, to_nanoseconds, to_point
+
+
+@pytest.mark.parametrize(('precision', 'expected'), [
+    ('ns', 1476107241123456789),
+    ('u', 1476107241123456),
+    ('ms', 1476107241123),
+    ('s', 1476107241),
+    ('m', 24601787),
+    ('h', 410029)
+])
+def test_precisions(precision, expected):
+    """ Should convert nanosecond timestamps exactly to every precision. """
+    measurement = Measurement('temperature', timestamp=1476107241123456789,
+                              timestamp_unit='ns', value=21.3)
+
+    assert measurement.get_timestamp(precision) == expected
+
+
+@pytest.mark.parametrize(('unit', 'timestamp'), [
+    ('ns', 1476107241000000000),
+    ('u', 1476107241000000),
+    ('ms', 1476107241000),
+    ('s', 1476107241),
+    ('s', 1476107241.0)
+])
+def test_timestamp_unit(unit, timestamp):
+    measurement = Measurement('temperature', timestamp=timestamp,
+                              timestamp_unit=unit, value=21.3)
+
+    assert measurement.timestamp == 1476107241 * 10**9
+    assert measurement.to_line('s') == 'temperature value=21.3 1476107241'
+
+
+def test_invalid_timestamp_unit():
+    with pytest.raises(ValueError):
+        Measurement('temperature', timestamp=1476107241, timestamp_unit='d',
+                    value=1)
+
+
+def test_epoch_field():
+    """ A field called epoch should be written as a field. """
+    measurement = Measurement('temperature', timestamp=1476107241, epoch=5)
+
+    assert measurement.to_line('s') == 'temperature epoch=5 1476107241'
+
+
+def test_datetime():
+    """ Should keep the microseconds of a datetime. """
+    timestamp = datetime(2016, 10, 10, 13, 47, 21, 123456, timezone.utc)
+
+    assert to_nanoseconds(timestamp) == 1476107241123456000
+
+
+def test_default_timestamp():
+    measurement = Measurement('temperature', value=21.3)
+
+    assert abs(measurement.get_timestamp('s') - time.time()) <= 1
+
+
+def test_client_timestamp_unit(client, post):
+    client.write('temperature', value=21.3, timestamp=1476107241000,
+                 timestamp_unit='ms')
+
+    assert post.call_args[1]['data'] == 'temperature value=21.3 1476107241'
+
+
+def test_client_epoch_field(client, post):
+    client.write('temperature', timestamp=1476107241, epoch=5)
+    client.write({'name': 'temperature', 'timestamp': 1476107241},
+                 [{'epoch': 6}])
+
+    assert [c[1]['data'] for c in post.call_args_list] == [
+        'temperature epoch=5 1476107241', 'temperature epoch=6 1476107241'
+    ]
+
+
+def test_slots():
+    measurement = Measurement('temperature', value=21.3)
+
+    with pytest.raises(AttributeError):
+        measurement.unknown = 1
+
+
+class TestPoint:
+    def test_to_point(self):
+        measurement = Measurement('cpu load', timestamp=1476107241,
+                                  tags={'region': 'eu west', 'host': 'a'},
+                                  idle=90.5, state='ok')
+        point = to_point(measurement)
+
+        assert isinstance(point, Point)
+        assert point.key == 'cpu\\ load,host=a,region=eu\\ west'
+        assert point.to_line('ms') == measurement.to_line('ms')
+        assert to_point(point) is point
+
+    def test_shared_key(self):
+        """ Points of the same series should share their key. """
+        first = to_point(Measurement('temperature', tags={'a': 'b'}, value=1))
+        second = to_point(Measurement('temperature', tags={'a': 'b'}, value=2))
+
+        assert first.key is second.key
+
+    def test_session(self, client, post):
+        session = client.session()
+        session.write('temperature', value=21.3, timestamp=1476107241)
+        session.write([Measurement('temperature', value=21.9,
+                                   timestamp=1476107319)])
+
+        assert all(isinstance(p, Point) for p in session.measurements)
+
+        session.commit()
+        assert post.call_args[1]['data'] ==\
+            'temperature value=21.3 1476107241\n' \
+            'temperature value=21.9 1476107319'
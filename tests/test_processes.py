@@ -0,0 +1,147 @@
+import pickle
+import time
+import pytest
+
+from inflow import (ProcessPoolWriter, Measurement, SeriesTemplate,
+                    WriteFailedException, PartialWriteException)
+from inflow.processes import pack_chunk, unpack_chunk
+from inflow.serializer import serialize_batch
+
+
+def measurements(count):
+    for i in range(count):
+        yield Measurement('temperature', tags={'sensor': str(i % 10)},
+                          timestamp=1476107241 + i, value=i * 0.5)
+
+
+def generate(offset):
+    """ Produces measurements in a worker process. """
+    return list(measurements(100))[offset:]
+
+
+def cpu_time(func):
+    """ Returns the least CPU time of a few calls of ``func``. """
+    times = []
+    for _ in range(3):
+        start = time.process_time()
+        func()
+        times.append(time.process_time() - start)
+
+    return min(times)
+
+
+@pytest.fixture
+def writer(server):
+    writer = ProcessPoolWriter(server.uri, processes=2, chunk_size=100)
+    yield writer
+    writer.close()
+
+
+class TestProcessPoolWriter:
+    def test_write_iter(self, writer, server):
+        writer.write_iter(measurements(1050))
+        stats = writer.flush()
+
+        assert server.points == 1050
+        assert server.requests == 11
+        assert stats.points == 1050
+        assert stats.chunks == 11
+        assert stats.bytes > 0
+        assert stats.points_per_second > 0
+        assert stats.errors == []
+
+    def test_write(self, writer, server):
+        writer.write('temperature', value=21.3, timestamp=1476107241)
+        writer.write(list(measurements(10)))
+        template = SeriesTemplate('cpu', field_keys=['idle'])
+        writer.write(template, [90.5], timestamp=1476107241)
+        writer.flush()
+
+        assert server.points == 12
+
+    def test_write_columns(self, writer, server):
+        writer.write_columns('temperature', list(range(250)),
+                             tags={'sensor': 'a', 'floor': ['1', '2'] * 125},
+                             value=[i * 0.5 for i in range(250)])
+        stats = writer.flush()
+
+        assert server.points == 250
+        assert stats.chunks == 3
+
+    def test_map(self, writer, server):
+        writer.map(generate, [0, 50, 90])
+        stats = writer.flush()
+
+        assert server.points == 160
+        assert stats.chunks == 3
+
+    def test_errors(self, writer, server):
+        """ Should report failed chunks, instead of raising. """
+        server.status = 400
+        writer.write_iter(measurements(150))
+        stats = writer.flush()
+
+        assert stats.points == 0
+        assert stats.failed_points == 150
+        assert len(stats.errors) == 2
+        assert isinstance(stats.errors[0][0], WriteFailedException)
+        assert stats.errors[0][0].status_code == 400
+
+    def test_max_pending(self, server):
+        with ProcessPoolWriter(server.uri, processes=1, chunk_size=10,
+                               max_pending=1) as writer:
+            writer.write_iter(measurements(50))
+            assert len(writer.pending) == 1
+
+        assert server.points == 50
+
+    def test_invalid_uri(self):
+        with pytest.raises(ValueError):
+            ProcessPoolWriter('http://localhost:8086')
+
+
+def test_pickle_exceptions():
+    """ Exceptions should survive being sent from a worker process. """
+    error = WriteFailedException({'error': 'bad'}, 400, 1.5)
+    partial = PartialWriteException([('a value=1 1', error)])
+
+    error = pickle.loads(pickle.dumps(error))
+    partial = pickle.loads(pickle.dumps(partial))
+
+    assert (error.message, error.status_code, error.retry_after) ==\
+        ({'error': 'bad'}, 400, 1.5)
+    assert partial.lines == ['a value=1 1']
+
+
+def test_pack_chunk():
+    """ Packed chunks should serialize to the same lines. """
+    template = SeriesTemplate('cpu', tags={'host': 'a'}, field_keys=['idle'])
+    chunk = list(measurements(20)) + [
+        Measurement('temperature', timestamp=1476107241, value=1, unit='C'),
+        Measurement('temperature', timestamp=1476107242, unit='C', value=2),
+        template.point([90.5], 1476107241),
+        Measurement('temperature', timestamp=1476107243, value=3).to_point()
+    ]
+
+    series, others = pack_chunk(chunk)
+
+    assert len(series) == 23
+    assert len(others) == 1
+    assert serialize_batch(unpack_chunk(series, others)) ==\
+        serialize_batch(chunk)
+
+
+@pytest.mark.skipif(not hasattr(time, 'process_time'),
+                    reason='Needs time.process_time.')
+def test_pack_chunk_cost():
+    """ Packing and pickling a chunk in the parent process should take far
+    less CPU time than serializing it, otherwise the workers can't scale. """
+    tags = {'host': 'server01', 'region': 'eu west'}
+    chunk = [Measurement('cpu load', tags=dict(tags), timestamp=1476107241 + i,
+                         **{'field_{}'.format(f): f * 1.5 for f in range(10)})
+             for i in range(20000)]
+
+    packed = cpu_time(lambda: pickle.dumps(pack_chunk(chunk), -1))
+    serialized = cpu_time(lambda: serialize_batch(chunk))
+
+    assert packed < serialized / 3
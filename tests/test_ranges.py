@@ -0,0 +1,165 @@
+import random
+import time
+import pytest
+
+from datetime import datetime, timedelta
+from inflow import Client, QueryFailedException, RetryPolicy, Series
+from inflow.connection import parse_query_data
+from inflow.ranges import merge_series, split_range, window_queries
+
+try:
+    from datetime import timezone
+except:
+    import pytz as timezone
+
+TEMPLATE = 'SELECT * FROM temperature WHERE time >= {start} AND time < {end}'
+
+
+@pytest.mark.parametrize(('start', 'end', 'window', 'expected'), [
+    (0, 10, 5, [(0, 5 * 10**9), (5 * 10**9, 10 * 10**9)]),
+    (0, 7, 5, [(0, 5 * 10**9), (5 * 10**9, 7 * 10**9)]),
+    (0, 5, timedelta(seconds=10), [(0, 5 * 10**9)]),
+    (datetime(2016, 1, 1, tzinfo=timezone.utc),
+     datetime(2016, 1, 3, tzinfo=timezone.utc), timedelta(days=1), [
+        (1451606400 * 10**9, 1451692800 * 10**9),
+        (1451692800 * 10**9, 1451779200 * 10**9)
+    ]),
+    (5, 5, 1, [])
+])
+def test_split_range(start, end, window, expected):
+    assert split_range(start, end, window) == expected
+
+
+def test_split_range_epoch():
+    assert split_range(0, 2000, 1, epoch='ms') ==\
+        [(0, 10**9), (10**9, 2 * 10**9)]
+
+
+def test_invalid_window():
+    with pytest.raises(ValueError):
+        split_range(0, 10, 0)
+
+
+def test_window_queries():
+    assert window_queries('{start}-{end}', 0, 2, 1) ==\
+        ['0-1000000000', '1000000000-2000000000']
+
+
+def test_merge_dicts():
+    first = {'name': 'a', 'values': [{'value': 1}]}
+    series = [first, {'name': 'b', 'values': [{'value': 2}]},
+              {'name': 'a', 'values': [{'value': 3}]}]
+
+    assert merge_series(series) == [
+        {'name': 'a', 'values': [{'value': 1}, {'value': 3}]},
+        {'name': 'b', 'values': [{'value': 2}]}
+    ]
+    assert first['values'] == [{'value': 1}]
+
+
+def test_merge_columns():
+    first = Series('a', ['timestamp', 'value'], [[1, 1.5]])
+    merged = merge_series([first, Series('a', ['timestamp', 'value'],
+                                         [[2, 2]])])
+
+    assert len(merged) == 1
+    assert list(merged[0]) == [{'timestamp': 1, 'value': 1.5},
+                               {'timestamp': 2, 'value': 2}]
+    assert len(first) == 1
+
+
+def test_merge_groups():
+    """ Series of different groups should stay separate. """
+    def window(t):
+        return [{'name': 'cpu', 'tags': {'host': 'a'},
+                 'values': [{'value': 'a' + t}]},
+                {'name': 'cpu', 'tags': {'host': 'b'},
+                 'values': [{'value': 'b' + t}]}]
+
+    assert merge_series(window('1') + window('2')) == [
+        {'name': 'cpu', 'tags': {'host': 'a'},
+         'values': [{'value': 'a1'}, {'value': 'a2'}]},
+        {'name': 'cpu', 'tags': {'host': 'b'},
+         'values': [{'value': 'b1'}, {'value': 'b2'}]}
+    ]
+
+
+def test_merge_groups_columns():
+    def window(t):
+        return [Series('cpu', ['value'], [[host + t]], tags={'host': host})
+                for host in ['a', 'b']]
+
+    merged = merge_series(window('1') + window('2'))
+
+    assert [(s.tags, s['value']) for s in merged] ==\
+        [({'host': 'a'}, ['a1', 'a2']), ({'host': 'b'}, ['b1', 'b2'])]
+
+
+class TestQueryRange:
+    def test_order(self, client, monkeypatch):
+        """ Should return the series of all windows in order, even when they
+        complete out of order. """
+        def query(query, epoch=None, format='dicts'):
+            time.sleep(random.random() * 0.01)
+            return [{'name': 'temperature', 'values': [{'query': query}]}]
+
+        monkeypatch.setattr(client.connection, 'query', query)
+        result = client.query_range('{start}', 0, 20, window=1, workers=4)
+
+        assert [v['query'] for v in result[0]['values']] ==\
+            [str(i * 10**9) for i in range(20)]
+
+    def test_stream(self, client, monkeypatch):
+        monkeypatch.setattr(client.connection, 'query',
+                            lambda q, e, f: [{'name': q, 'values': []}])
+
+        names = [s['name'] for s in client.query_range_iter(
+            '{start}', 0, 10, window=1, workers=2)]
+        assert names == [str(i * 10**9) for i in range(10)]
+
+    def test_retry_window(self, server):
+        client = Client(server.uri)
+        server.status = 503
+        server.failures = 2
+
+        result = client.query_range(TEMPLATE, 0, 5, window=1,
+                                    retry_policy=RetryPolicy(backoff=0))
+
+        assert server.requests == 7
+        assert len(result[0]['values']) == 5
+
+    def test_group_by(self, client, monkeypatch):
+        """ The groups of a GROUP BY query should be returned separately,
+        as by a single query. """
+        def query(query, epoch=None, format='dicts'):
+            return parse_query_data({'results': [{'series': [
+                {'name': 'cpu', 'tags': {'host': host},
+                 'columns': ['time', 'value'], 'values': [[int(query), 1]]}
+                for host in ['a', 'b']
+            ]}]}, format)
+
+        monkeypatch.setattr(client.connection, 'query', query)
+        result = client.query_range('{start}', 0, 2, window=1)
+
+        assert result == [
+            {'name': 'cpu', 'tags': {'host': host}, 'values': [
+                {'timestamp': 0, 'value': 1},
+                {'timestamp': 10**9, 'value': 1}
+            ]} for host in ['a', 'b']
+        ]
+
+    def test_failed_window(self, server):
+        client = Client(server.uri)
+        server.status = 400
+
+        with pytest.raises(QueryFailedException):
+            client.query_range(TEMPLATE, 0, 5, window=1)
+
+        assert server.requests <= 5
+
+    def test_concurrency(self, server):
+        client = Client(server.uri)
+        server.latency = 0.05
+
+        client.query_range(TEMPLATE, 0, 8, window=1, workers=4)
+        assert 1 < server.max_in_flight <= 4
@@ -0,0 +1,217 @@
+import pytest
+
+from inflow import (Client, RetryPolicy, Measurement, WriteFailedException,
+                    PartialWriteException, RequestTooLargeException,
+                    UnauthorizedException)
+from inflow.retry import is_transient_error, parse_retry_after, split_lines
+from requests import ConnectionError
+
+try:
+    from unittest.mock import Mock
+except:
+    from mock import Mock
+
+
+class NoSleepPolicy(RetryPolicy):
+    """ Records the delays instead of sleeping. """
+
+    def __init__(self, *args, **kwargs):
+        RetryPolicy.__init__(self, *args, **kwargs)
+        self.delays = []
+
+    def sleep(self, seconds):
+        self.delays.append(seconds)
+
+
+@pytest.fixture
+def policy():
+    return NoSleepPolicy(retries=3)
+
+
+def test_transient_errors():
+    assert is_transient_error(ConnectionError())
+    assert is_transient_error(WriteFailedException({}, 500))
+    assert is_transient_error(WriteFailedException({}, 503))
+    assert not is_transient_error(WriteFailedException({}, 400))
+    assert not is_transient_error(ValueError())
+
+
+@pytest.mark.parametrize(('value', 'expected'), [
+    ('120', 120),
+    ('0.5', 0.5),
+    ('Thu, 01 Jan 1970 00:00:00 GMT', 0),
+    ('tomorrow', None),
+    (None, None)
+])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+@pytest.mark.parametrize(('data', 'expected'), [
+    ('a\nb', ('a', 'b')),
+    ('a\nb\nc\nd', ('a\nb', 'c\nd')),
+    ('aaaa\nb', ('aaaa', 'b')),
+    (b'a\nb', (b'a', b'b')),
+    ('a', None)
+])
+def test_split_lines(data, expected):
+    assert split_lines(data) == expected
+
+
+class TestRetryPolicy:
+    def test_backoff(self):
+        policy = RetryPolicy(retries=5, backoff=1, max_backoff=5,
+                             jitter=False)
+        error = ConnectionError()
+
+        assert [policy.get_delay(i, error) for i in range(6)] ==\
+            [1, 2, 4, 5, 5, None]
+
+    def test_jitter(self):
+        policy = RetryPolicy(backoff=1)
+        delays = set(policy.get_delay(2, ConnectionError())
+                     for _ in range(10))
+
+        assert len(delays) > 1
+        assert all(0 <= d <= 4 for d in delays)
+
+    def test_retry_after(self, policy):
+        assert policy.get_delay(0, WriteFailedException({}, 503, 5)) == 5
+
+    def test_retry_after_capped(self, policy):
+        assert policy.get_delay(0, WriteFailedException({}, 503, 30)) == 10
+
+    def test_permanent_error(self, policy):
+        assert policy.get_delay(0, WriteFailedException({}, 400)) is None
+
+    def test_call(self, policy):
+        func = Mock(side_effect=[ConnectionError(), ConnectionError(), 'ok'])
+        on_retry = Mock()
+
+        assert policy.call(func, ('a',), on_retry) == 'ok'
+        assert func.call_count == 3
+        assert len(policy.delays) == 2
+        assert [c[0][0] for c in on_retry.call_args_list] == [1, 2]
+
+    def test_attempts(self, policy):
+        on_retry = Mock()
+        attempts = policy.attempts(on_retry)
+        error = ConnectionError()
+
+        for _ in range(3):
+            try:
+                raise error
+            except ConnectionError as e:
+                attempts.failed(e)
+
+        with pytest.raises(ConnectionError):
+            try:
+                raise error
+            except ConnectionError as e:
+                attempts.failed(e)
+
+        assert attempts.attempt == 3
+        assert [c[0][0] for c in on_retry.call_args_list] == [1, 2, 3]
+
+    def test_call_gives_up(self, policy):
+        func = Mock(side_effect=ConnectionError())
+
+        with pytest.raises(ConnectionError):
+            policy.call(func)
+
+        assert func.call_count == 4
+
+
+class TestConnection:
+    @pytest.fixture
+    def client(self, server, policy):
+        return Client(server.uri, retry_policy=policy)
+
+    def write_batch(self, client, values):
+        client.write([Measurement('temperature', timestamp=1476107241,
+                                  value=v) for v in values])
+
+    def test_retry(self, client, server, policy):
+        server.status = 503
+        server.failures = 2
+        server.retry_after = '0.25'
+
+        client.write('temperature', value=21.3)
+
+        assert server.points == 1
+        assert server.requests == 3
+        assert policy.delays == [0.25, 0.25]
+
+    def test_retries_exhausted(self, client, server):
+        server.status = 500
+
+        with pytest.raises(WriteFailedException):
+            client.write('temperature', value=21.3)
+
+        assert server.requests == 4
+
+    def test_unauthorized_not_retried(self, client, server):
+        server.status = 401
+
+        with pytest.raises(UnauthorizedException):
+            client.write('temperature', value=21.3)
+
+        assert server.requests == 1
+
+    def test_connection_error(self, policy):
+        client = Client('http://127.0.0.1:1/testdb', retry_policy=policy)
+
+        with pytest.raises(ConnectionError):
+            client.write('temperature', value=21.3)
+
+        assert len(policy.delays) == 3
+
+    def test_split_invalid(self, client, server):
+        """ Should write all valid lines, and report the invalid one. """
+        server.reject = b'value=13'
+        with pytest.raises(PartialWriteException) as exc:
+            self.write_batch(client, range(20))
+
+        assert server.points == 19
+        assert exc.value.lines == ['temperature value=13 1476107241']
+        assert exc.value.status_code == 400
+
+    def test_split_too_large(self, client, server):
+        server.max_body_size = 200
+        self.write_batch(client, range(40))
+
+        assert server.points == 40
+        assert server.requests > 4
+
+    def test_line_too_large(self, client, server):
+        server.max_body_size = 10
+        with pytest.raises(PartialWriteException) as exc:
+            self.write_batch(client, range(2))
+
+        assert len(exc.value.lines) == 2
+        assert all(isinstance(e, RequestTooLargeException)
+                   for _, e in exc.value.failures)
+
+    def test_no_split(self, server, policy):
+        policy.split_batches = False
+        client = Client(server.uri, retry_policy=policy)
+        server.reject = b'value=13'
+
+        with pytest.raises(WriteFailedException) as exc:
+            self.write_batch(client, range(20))
+
+        assert not isinstance(exc.value, PartialWriteException)
+        assert server.points == 0
+
+    def test_session(self, client, server):
+        """ Should drop the rejected measurements from the session. """
+        server.reject = b'value=3'
+        session = client.session()
+        for v in range(5):
+            session.write('temperature', value=v)
+
+        with pytest.raises(PartialWriteException):
+            session.commit()
+
+        assert server.points == 4
+        assert session.measurements == []
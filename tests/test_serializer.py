@@ -0,0 +1,66 @@
+from inflow import Measurement
+from inflow import serializer
+from inflow.serializer import (serialize, serialize_batch, escape_measurement,
+                               escape_key, escape_tag_value, format_value)
+
+
+def test_escape_measurement():
+    assert escape_measurement('temperature') == 'temperature'
+    assert escape_measurement('temp er,ature=') == 'temp\\ er\\,ature='
+
+
+def test_escape_key():
+    assert escape_key('location') == 'location'
+    assert escape_key('a,=b ') == 'a\\,\\=b\\ '
+
+
+def test_escape_cache():
+    """ Escaped measurements and keys should be cached. """
+    escape_measurement('cached measurement')
+    escape_key('cached key')
+
+    assert serializer._measurement_cache['cached measurement'] ==\
+        'cached\\ measurement'
+    assert serializer._key_cache['cached key'] == 'cached\\ key'
+
+
+def test_escape_cache_bounded(monkeypatch):
+    monkeypatch.setattr(serializer, '_key_cache', {})
+    monkeypatch.setattr(serializer, 'MAX_CACHE_SIZE', 2)
+    for key in ['a', 'b', 'c']:
+        escape_key(key)
+
+    assert len(serializer._key_cache) <= 2
+
+
+def test_escape_non_string_tag_value():
+    assert escape_tag_value(10) == '10'
+
+
+def test_format_value():
+    assert format_value(21.3) == '21.3'
+    assert format_value(True) == 'True'
+    assert format_value('a "quoted" string') == '"a \\"quoted\\" string"'
+
+
+def test_serialize():
+    measurement = Measurement('temperature', tags={'b': 'tag', 'a': 1},
+                              value=21.3, timestamp=1476107241)
+    assert serialize(measurement) ==\
+        'temperature,a=1,b=tag value=21.3 1476107241'
+    assert serialize(measurement, 'ms') ==\
+        'temperature,a=1,b=tag value=21.3 1476107241000'
+
+
+def test_serialize_batch():
+    measurements = [
+        Measurement('temperature', value=21.3, timestamp=1476107241),
+        Measurement('temperature', value=21.9, timestamp=1476107319)
+    ]
+    assert serialize_batch(measurements) ==\
+        'temperature value=21.3 1476107241\n' \
+        'temperature value=21.9 1476107319'
+
+
+def test_serialize_empty_batch():
+    assert serialize_batch([]) == ''
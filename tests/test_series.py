@@ -0,0 +1,66 @@
+import pytest
+
+from array import array
+
+from inflow import Series
+
+
+@pytest.fixture
+def series():
+    return Series('temperatures', ['timestamp', 'value', 'location'], [
+        ['2016-01-01T00:01:00Z', 20.1, 'groningen'],
+        ['2016-01-01T00:02:00Z', 23.0, 'assen']
+    ])
+
+
+def test_columns(series):
+    assert len(series) == 2
+    assert series['location'] == ['groningen', 'assen']
+    assert series['value'] == array('d', [20.1, 23.0])
+
+
+def test_unknown_column(series):
+    with pytest.raises(KeyError):
+        series['unknown']
+
+
+def test_float_columns_with_nulls():
+    """ Columns that aren't only floats should be kept as lists. """
+    series = Series('temperatures', ['value'], [[20.1], [None], [21]])
+    assert series['value'] == [20.1, None, 21]
+
+
+def test_rows(series):
+    assert list(series) == [
+        {'timestamp': '2016-01-01T00:01:00Z', 'value': 20.1,
+         'location': 'groningen'},
+        {'timestamp': '2016-01-01T00:02:00Z', 'value': 23.0,
+         'location': 'assen'}
+    ]
+    assert series.row(1)['location'] == 'assen'
+
+
+def test_to_dict(series):
+    assert series.to_dict()['name'] == 'temperatures'
+    assert series.to_dict()['values'][0]['value'] == 20.1
+
+
+def test_empty():
+    series = Series('temperatures', ['timestamp', 'value'], None)
+    assert len(series) == 0
+    assert list(series) == []
+    assert series['value'] == []
+
+
+def test_query_columns(client, get):
+    rv = client.query('SELECT * FROM "temperatures"', format='columns')
+
+    assert isinstance(rv[0], Series)
+    assert rv[0].name == 'temperatures'
+    assert rv[0].columns == ['timestamp', 'value', 'location']
+    assert list(rv[0]['value']) == [20.1, 23.0]
+
+
+def test_query_invalid_format(client, get):
+    with pytest.raises(ValueError):
+        client.query('SELECT * FROM "temperatures"', format='rows')
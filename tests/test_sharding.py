@@ -0,0 +1,108 @@
+import pytest
+
+from inflow import ShardedClient, ShardedWriteException, Measurement
+from inflow.sharding import HashRing
+
+from benchmarks.server import BenchmarkServer
+
+
+@pytest.fixture
+def servers():
+    servers = [BenchmarkServer(rows=1, database='testdb') for _ in range(3)]
+    for server in servers:
+        server.__enter__()
+
+    yield servers
+
+    for server in servers:
+        server.__exit__()
+
+
+@pytest.fixture
+def client(servers):
+    client = ShardedClient([s.uri for s in servers])
+    yield client
+    client.close()
+
+
+def measurements(count):
+    return [Measurement('temperature', tags={'sensor': str(i)}, value=i,
+                        timestamp=1476107241)
+            for i in range(count)]
+
+
+class TestHashRing:
+    def test_get(self):
+        ring = HashRing(['a', 'b', 'c'])
+        assert ring.get('temperature') == ring.get('temperature')
+        assert ring.get('temperature') in ['a', 'b', 'c']
+
+    def test_empty(self):
+        with pytest.raises(ValueError):
+            HashRing().get('temperature')
+
+    def test_distribution(self):
+        ring = HashRing(['a', 'b', 'c'])
+        counts = {'a': 0, 'b': 0, 'c': 0}
+        for i in range(3000):
+            counts[ring.get(str(i))] += 1
+
+        assert all(count > 500 for count in counts.values())
+
+    def test_add_node(self):
+        """ Adding a node should only move keys to the new node. """
+        ring = HashRing(['a', 'b', 'c'])
+        before = {str(i): ring.get(str(i)) for i in range(3000)}
+
+        ring.add('d')
+        moved = [k for k, node in before.items() if ring.get(k) != node]
+
+        assert all(ring.get(k) == 'd' for k in moved)
+        assert len(moved) < 3000 / 3
+
+    def test_remove_node(self):
+        ring = HashRing(['a', 'b'])
+        ring.remove('b')
+        assert ring.get('temperature') == 'a'
+
+
+class TestShardedClient:
+    def test_no_uris(self):
+        with pytest.raises(ValueError):
+            ShardedClient([])
+
+    def test_write(self, client, servers):
+        client.write(measurements(300))
+
+        assert sum(s.points for s in servers) == 300
+        assert all(s.requests == 1 for s in servers)
+
+    def test_same_series_same_shard(self, client, servers):
+        for _ in range(3):
+            client.write('temperature', tags={'sensor': '1'}, value=1)
+
+        assert sorted(s.points for s in servers) == [0, 0, 3]
+
+    def test_session(self, client, servers):
+        with client.session() as session:
+            session.write(measurements(30))
+
+        assert sum(s.points for s in servers) == 30
+
+    def test_partial_failure(self, client, servers):
+        """ Should write to all shards, and report the failed ones. """
+        servers[0].status = 500
+
+        with pytest.raises(ShardedWriteException) as exc:
+            client.write(measurements(300))
+
+        assert list(exc.value.errors) == [servers[0].uri]
+        assert servers[1].points + servers[2].points > 0
+
+    def test_add_shard(self, client, servers):
+        with BenchmarkServer(rows=1, database='testdb') as server:
+            client.connection.add_shard(server.uri)
+            client.write(measurements(300))
+
+            assert server.points > 0
+            assert sum(s.points for s in servers) + server.points == 300
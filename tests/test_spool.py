@@ -0,0 +1,296 @@
+import os
+import threading
+import time
+import pytest
+
+from inflow import (AsyncConnection, Client, PartialWriteException,
+                    ProcessPoolWriter, ShardedClient, WriteFailedException)
+from inflow.spool import HEADER, QUARANTINE_FILE, Spool
+from requests import ConnectionError
+
+
+@pytest.fixture
+def spool(tmpdir):
+    spool = Spool(str(tmpdir.join('spool')))
+    yield spool
+    spool.close()
+
+
+class Sender(object):
+    """ Records everything sent, or raises the given error. """
+
+    def __init__(self, fail_after=None, reject=None):
+        self.sent = []
+        self.error = None
+        self.fail_after = fail_after
+        self.reject = reject
+
+    def __call__(self, data, retention_policy):
+        if len(self.sent) == self.fail_after:
+            self.error = ConnectionError()
+        if self.error is not None:
+            raise self.error
+        if self.reject is not None and self.reject in data:
+            raise WriteFailedException({'error': 'bad'}, 400)
+        self.sent.append((data, retention_policy))
+
+
+class TestSpool:
+    def test_replay(self, spool):
+        sender = Sender()
+        spool.append('temperature value=21.3 1476107241')
+        spool.append(b'temperature value=21.9 1476107319')
+
+        assert spool.replay(sender)
+        assert sender.sent == [(b'temperature value=21.3 1476107241\n'
+                                b'temperature value=21.9 1476107319', None)]
+        assert len(spool) == 0
+
+    def test_retention_policies(self, spool):
+        """ Should batch records with the same retention policy. """
+        sender = Sender()
+        spool.append('a', 'rp_one')
+        spool.append('b', 'rp_one')
+        spool.append('c')
+
+        spool.replay(sender)
+        assert sender.sent == [(b'a\nb', 'rp_one'), (b'c', None)]
+
+    def test_batch_size(self, spool):
+        sender = Sender()
+        for i in range(5):
+            spool.append('temperature value={} 1476107241'.format(i))
+
+        spool.replay(sender, batch_size=60)
+        assert len(sender.sent) == 3
+
+    def test_transient_error(self, spool):
+        """ Should keep the data when InfluxDB is unavailable. """
+        sender = Sender()
+        sender.error = ConnectionError()
+        spool.append('temperature value=21.3 1476107241')
+
+        assert not spool.replay(sender)
+        assert len(spool) > 0
+
+        sender.error = None
+        assert spool.replay(sender)
+        assert len(sender.sent) == 1
+
+    def test_permanent_error(self, spool):
+        """ Should quarantine records InfluxDB rejects, and write the records
+        batched with them. """
+        sender = Sender(reject=b'value=\n')
+        spool.append('temperature value=1')
+        spool.append('temperature value=\n')
+        spool.append('temperature value=3')
+
+        assert spool.replay(sender)
+
+        assert sender.sent == [(b'temperature value=1', None),
+                               (b'temperature value=3', None)]
+        assert len(spool) == 0
+        assert spool.rejected == len('temperature value=\n')
+        assert os.path.getsize(os.path.join(
+            spool.directory, QUARANTINE_FILE)) == HEADER.size + spool.rejected
+
+    def test_partial_write(self, spool):
+        """ Should only quarantine the lines InfluxDB rejected. """
+        def send(data, retention_policy):
+            raise PartialWriteException([(b'b', WriteFailedException())])
+
+        spool.append('a\nb')
+        assert spool.replay(send)
+        assert spool.rejected == 1
+
+    def test_append_while_replaying(self, spool):
+        """ Appending shouldn't wait for a replay to finish. """
+        release = threading.Event()
+        spool.append('a')
+
+        thread = threading.Thread(
+            target=spool.replay, args=(lambda *args: release.wait(),))
+        thread.start()
+        time.sleep(0.05)
+
+        appended = threading.Thread(target=spool.append, args=('b',))
+        appended.start()
+        appended.join(1)
+        assert not appended.is_alive()
+
+        release.set()
+        thread.join()
+        assert len(spool) == 0
+
+    def test_size(self, tmpdir):
+        """ Should track the size of the segments without reading them. """
+        directory = str(tmpdir)
+        spool = Spool(directory, segment_size=100)
+        for i in range(10):
+            spool.append('temperature value={} 1476107241'.format(i))
+
+        assert spool.size() == sum(os.path.getsize(spool.segment_path(s))
+                                   for s in spool.segments)
+        spool.close()
+
+        reopened = Spool(directory, segment_size=100)
+        assert reopened.size() == spool.size()
+        reopened.replay(Sender())
+        assert reopened.size() == 0
+        reopened.close()
+
+    def test_restart(self, tmpdir):
+        """ Should replay data spooled by an earlier process. """
+        directory = str(tmpdir.join('spool'))
+        spool = Spool(directory)
+        spool.append('temperature value=21.3 1476107241')
+        spool.append('temperature value=21.9 1476107319')
+
+        # InfluxDB goes down after replaying the first record.
+        spool.replay(Sender(fail_after=1), batch_size=1)
+        spool.close()
+
+        # Simulate a crash in the middle of an append.
+        with open(spool.segment_path(spool.segments[-1]), 'ab') as f:
+            f.write(b'\x00\x00\x01')
+
+        sender = Sender()
+        spool = Spool(directory)
+        spool.append('temperature value=22.0 1476107400')
+        spool.replay(sender)
+        spool.close()
+
+        assert sender.sent == [(b'temperature value=21.9 1476107319\n'
+                                b'temperature value=22.0 1476107400', None)]
+
+    def test_segments(self, tmpdir):
+        spool = Spool(str(tmpdir), segment_size=100)
+        for i in range(10):
+            spool.append('temperature value={} 1476107241'.format(i))
+
+        assert len(spool.segments) > 1
+
+        sender = Sender()
+        spool.replay(sender)
+
+        assert b''.join(d for d, _ in sender.sent).count(b'temperature') == 10
+        assert len([f for f in os.listdir(str(tmpdir))
+                    if f.endswith('.spool')]) == 1
+        spool.close()
+
+    def test_max_size(self, tmpdir):
+        """ Should drop the oldest segments when the spool is full. """
+        spool = Spool(str(tmpdir), segment_size=100, max_size=300)
+        for i in range(30):
+            spool.append('temperature value={} 1476107241'.format(i))
+
+        assert spool.size() <= 300
+        assert spool.dropped > 0
+
+        sender = Sender()
+        spool.replay(sender)
+        assert b'value=29' in sender.sent[-1][0]
+        spool.close()
+
+
+class TestConnection:
+    def test_write(self, tmpdir, server):
+        client = Client(server.uri, spool=str(tmpdir))
+        client.write('temperature', value=21.3)
+
+        assert server.points == 1
+        assert len(client.connection.spool) == 0
+
+    def test_outage(self, tmpdir, server):
+        """ Should buffer writes while InfluxDB is down, and write them once
+        it's back. """
+        client = Client(server.uri, spool=str(tmpdir), replay_interval=0)
+
+        server.status = 500
+        client.write('temperature', value=21.3)
+        client.write('temperature', value=21.9)
+        assert server.points == 0
+
+        server.status = None
+        client.write('temperature', value=22.0)
+
+        assert server.points == 3
+        assert server.requests == 4
+
+    def test_spooled_order(self, tmpdir, server):
+        """ Should append writes after spooled data, and leave replaying it
+        to the replayer. """
+        client = Client(server.uri, spool=str(tmpdir))
+
+        server.status = 500
+        client.write('temperature', value=21.3)
+        server.status = None
+        client.write('temperature', value=21.9)
+
+        assert server.points == 0
+        assert server.requests == 1
+
+        client.connection.replay_spool()
+        assert server.points == 2
+        client.close()
+
+    def test_replay_running(self, tmpdir, server):
+        """ Shouldn't wait for a replay that's already running. """
+        client = Client(server.uri, spool=str(tmpdir), replay_interval=0)
+        spool = client.connection.spool
+
+        server.status = 500
+        client.write('temperature', value=21.3)
+        server.status = None
+
+        with spool.replay_lock:
+            client.write('temperature', value=21.9)
+
+        assert server.points == 0
+        assert len(spool) > 0
+
+        client.write('temperature', value=22.0)
+        assert server.points == 3
+
+    def test_rejected(self, tmpdir, server):
+        """ Should raise when InfluxDB rejects the data being written. """
+        client = Client(server.uri, spool=str(tmpdir))
+        server.reject = b'value='
+
+        with pytest.raises(WriteFailedException):
+            client.write('temperature', value=21.3)
+
+        assert len(client.connection.spool) == 0
+
+    def test_replayer(self, tmpdir, server):
+        """ Should replay the spool without new writes. """
+        client = Client(server.uri, spool=str(tmpdir), replay_interval=0.01)
+
+        server.status = 500
+        client.write('temperature', value=21.3)
+        server.status = None
+
+        deadline = time.time() + 2
+        while server.points == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert server.points == 1
+        client.close()
+        assert not client.connection.replayer.thread.is_alive()
+
+    def test_async_connection(self, tmpdir):
+        with pytest.raises(ValueError):
+            AsyncConnection('http://localhost:8086/testdb', spool=str(tmpdir))
+
+    def test_sharded_client(self, tmpdir):
+        with pytest.raises(ValueError):
+            ShardedClient(['http://localhost:8086/testdb',
+                           'http://localhost:8087/testdb'],
+                          spool=str(tmpdir))
+        assert tmpdir.listdir() == []
+
+    def test_process_pool(self, tmpdir):
+        with pytest.raises(ValueError):
+            ProcessPoolWriter('http://localhost:8086/testdb',
+                              spool=str(tmpdir))
+        assert tmpdir.listdir() == []
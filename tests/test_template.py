@@ -0,0 +1,126 @@
+import pytest
+
+from datetime import datetime
+
+from inflow import Client, SeriesTemplate, Measurement
+from inflow.serializer import serialize_batch, series_key
+from inflow.measurement import timezone
+
+
+@pytest.fixture
+def template():
+    return SeriesTemplate('cpu load', tags={'region': 'eu west',
+                                            'host': 'server01'},
+                          field_keys=['idle', 'user', 'state'])
+
+
+class TestSeriesTemplate:
+    def test_line(self, template):
+        assert template.line([90.5, 2.5, 'ok'], 1476107241) ==\
+            'cpu\\ load,host=server01,region=eu\\ west ' \
+            'idle=90.5,user=2.5,state="ok" 1476107241'
+
+    def test_same_as_measurement(self, template):
+        """ Should render the same line as an equal measurement. """
+        measurement = Measurement('cpu load', tags=template.tags,
+                                  timestamp=1476107241, idle=90.5, user=2.5,
+                                  state='ok')
+
+        assert template.line([90.5, 2.5, 'ok'], 1476107241) ==\
+            measurement.to_line()
+        assert series_key(template.point([1, 2, 3])) ==\
+            series_key(measurement)
+
+    def test_dict_values(self, template):
+        assert template.line({'user': 2.5}, 1476107241) ==\
+            'cpu\\ load,host=server01,region=eu\\ west user=2.5 1476107241'
+
+    def test_missing_values(self, template):
+        assert template.line([None, None, '"quoted"'], 1) ==\
+            'cpu\\ load,host=server01,region=eu\\ west state="\\"quoted\\"" 1'
+
+        with pytest.raises(ValueError):
+            template.line([None, None, None], 1)
+
+    def test_wrong_value_count(self, template):
+        with pytest.raises(ValueError):
+            template.line([1, 2], 1)
+
+    def test_no_field_keys(self):
+        with pytest.raises(ValueError):
+            SeriesTemplate('cpu', field_keys=[])
+
+    def test_datetime(self, template):
+        timestamp = datetime(2016, 10, 10, 13, 47, 21, tzinfo=timezone.utc)
+
+        assert template.line([1, 2, 3], timestamp, precision='ms')\
+            .endswith(' 1476107241000')
+
+    def test_epoch(self, template):
+        assert template.line([1, 2, 3], 1476107241, precision='ms')\
+            .endswith(' 1476107241000')
+        assert template.line([1, 2, 3], 1476107241500, precision='s',
+                             epoch='ms').endswith(' 1476107241')
+        assert template.line([1, 2, 3], 1476107241.5, precision='ms')\
+            .endswith(' 1476107241500')
+
+    def test_no_tags(self):
+        template = SeriesTemplate('temperature', field_keys=['value'])
+        assert template.line([21.3], 1476107241) ==\
+            'temperature value=21.3 1476107241'
+
+    def test_serialize_batch(self, template):
+        """ Should serialize template points mixed with measurements. """
+        data = serialize_batch([
+            template.point([1, 2, 'ok'], 1476107241),
+            Measurement('temperature', timestamp=1476107241, value=21.3)
+        ])
+
+        assert data.splitlines() == [
+            'cpu\\ load,host=server01,region=eu\\ west '
+            'idle=1,user=2,state="ok" 1476107241',
+            'temperature value=21.3 1476107241'
+        ]
+
+
+class TestWrite:
+    def test_client(self, client, post, template):
+        client.write(template, [90.5, 2.5, 'ok'], timestamp=1476107241)
+
+        assert post.call_args[1]['data'] ==\
+            'cpu\\ load,host=server01,region=eu\\ west ' \
+            'idle=90.5,user=2.5,state="ok" 1476107241'
+
+    def test_precision(self, post, template):
+        """ A template timestamp should mean the same as the timestamp of
+        a measurement. """
+        client = Client('http://localhost:8086/testdb', precision='ms')
+        client.write(template, [90.5, 2.5, 'ok'], timestamp=1476107241)
+        client.write('cpu', value=1, timestamp=1476107241)
+        client.write(template, [90.5, 2.5, 'ok'], timestamp=1476107241500,
+                     epoch='ms')
+
+        assert [c[1]['data'].split()[-1] for c in post.call_args_list] ==\
+            ['1476107241000', '1476107241000', '1476107241500']
+
+    def test_template_write(self, client, post, template):
+        template.write(client, {'idle': 90.5}, 1476107241,
+                       retention_policy='rp_one')
+
+        assert post.call_args[0][0].endswith('&rp=rp_one')
+        assert post.call_args[1]['data'].endswith(' idle=90.5 1476107241')
+
+    def test_session(self, client, post, template):
+        with client.session() as session:
+            for i in range(3):
+                template.write(session, [i, i, 'ok'], 1476107241 + i)
+
+        assert post.call_count == 1
+        assert post.call_args[1]['data'].count('\n') == 2
+
+    def test_background(self, server, template):
+        client = Client(server.uri)
+        with client.session(background=True) as writer:
+            template.write(writer, [1, 2, 'ok'], 1476107241)
+
+        assert server.points == 1